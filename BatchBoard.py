@@ -0,0 +1,265 @@
+
+import numpy as np
+
+from Board import TicTacToeBoard, TicTacToeBitBoard
+from Symmetry import newIndex
+from TableBase import TableBaseLookupError
+from StateTable import getWinnerArray, getTerminalArray
+
+
+#              Batch Concept
+#########################################################
+# A TicTacToeBoardBatch holds many games at once, which are all played in lock-step
+#   ... from the empty board: each call to move() makes one move in every game that
+#   ... is not yet over, so the player to move ('nextTurn') is the same for all of them.
+# The boards are the rows of 'boards', an array of shape (B,9) of np.uint8.
+# Alongside each board, the batch keeps (as arrays of shape (B,)):
+#       codes   : the encoding of the board (see Encode.py)
+#       xbits   : bit 'i' is set if the cell at 'i' is marked by X (as in TicTacToeBitBoard)
+#       ybits   : bit 'i' is set if the cell at 'i' is marked by Y
+#       winner  : the mark of the winner of the game, or 0 if there is none (yet)
+#       done    : True once a game has been won or its board has been filled
+# Games are referred to by their index in the batch.
+# Policies pick moves for many games of a batch at once, with array look-ups only.
+# The winner of a game, and whether it is over, are looked up by its code in the 
+#   ... precomputed tables of StateTable.py.
+
+
+
+
+#       Module-Scope Tables
+#########################################################
+_FullMask = (1<<9) - 1
+
+# The weight of each cell in the encoding (see Encode.py)
+_CellWeightsArray = 3**np.arange(9, dtype=np.int64)
+_CellWeightsArray.flags.writeable = False
+
+_CellBitsArray = np.array(TicTacToeBitBoard.CellBits, dtype=np.uint16)
+_CellBitsArray.flags.writeable = False
+
+# _PopCount[bits] is the number of bits set in 'bits' (0 <= bits < 512)
+_PopCount = np.array([bin(bits).count('1') for bits in range(1<<9)], dtype=np.int8)
+_PopCount.flags.writeable = False
+
+# _KthBit[bits,k] is the index of the k-th lowest bit set in 'bits', or -1 if
+#   ... 'bits' has no more than k bits set
+_KthBit = np.full((1<<9, 9), -1, dtype=np.int8)
+for _bits in range(1<<9):
+    _idxs = [i for i in range(9) if(_bits>>i)&1]
+    _KthBit[_bits, :len(_idxs)] = _idxs
+_KthBit.flags.writeable = False
+del _bits, _idxs
+
+# _MaskTransform[op,bits] has bit newIndex(i,op) set for each bit 'i' set in 'bits'
+# That is, it applies the D8 operation 'op' (see Symmetry.py) to a mask of cells.
+_MaskTransform = np.zeros((8, 1<<9), dtype=np.uint16)
+for _op in range(8):
+    for _i in range(9):
+        _MaskTransform[_op, (np.arange(1<<9)>>_i)&1 == 1] |= 1 << newIndex(_i, _op)
+_MaskTransform.flags.writeable = False
+del _op, _i
+#########################################################
+
+
+
+
+class TicTacToeBoardBatch:
+
+    Xmark = TicTacToeBoard.Xmark
+    Ymark = TicTacToeBoard.Ymark
+
+    def __init__(self, numGames):
+        if(numGames < 0):
+            msg = "In call to TicTacToeBoardBatch(), numGames must not be negative. " + \
+                    "Received '{}'".format(numGames)
+            raise ValueError(msg)
+        self.boards = np.zeros((numGames, 9), dtype=np.uint8)
+        self.codes = np.zeros(numGames, dtype=np.int64)
+        self.xbits = np.zeros(numGames, dtype=np.uint16)
+        self.ybits = np.zeros(numGames, dtype=np.uint16)
+        self.winner = np.zeros(numGames, dtype=np.uint8)
+        self.done = np.zeros(numGames, dtype=bool)
+        self.nextTurn = self.Xmark
+        self.numMoves = 0
+
+    def __len__(self):
+        return len(self.boards)
+
+    # Indices of the games that are not over yet
+    def activeGames(self):
+        return np.flatnonzero(~self.done)
+
+    def isOver(self):
+        return bool(self.done.all())
+
+    # Bits of the empty cells of the boards of 'games' (all games if None)
+    def emptyBits(self, games=None):
+        if(games is None):
+            return _FullMask & ~(self.xbits | self.ybits)
+        return _FullMask & ~(self.xbits[games] | self.ybits[games])
+
+    # Array of shape (B,9) that is True at each cell where a move can be played
+    # Games that are over have no legal moves.
+    def legalMoveMask(self):
+        return (self.boards == 0) & ~self.done[:,None]
+
+    # Play the move 'moves[j]' (a cell index) in the game 'games[j]' for each j
+    # If 'games' is None, moves are played in all the games that are not over
+    #   ... (in the order of activeGames()).
+    # Every game that isn't over must get a move, since the games move in lock-step.
+    def move(self, moves, games=None):
+        if(games is None):
+            games = self.activeGames()
+        else:
+            games = np.asarray(games, dtype=np.intp)
+            seen = np.zeros(len(self), dtype=bool)
+            seen[games] = True
+            if(len(games) != np.count_nonzero(seen) or (seen == self.done).any()):
+                msg = "In call to TicTacToeBoardBatch.move(), 'games' must have every " + \
+                        "game that is not over exactly once"
+                raise ValueError(msg)
+        moves = np.asarray(moves, dtype=np.intp)
+        if(moves.shape != games.shape):
+            msg = "In call to TicTacToeBoardBatch.move(), got {} moves for {} games".format(
+                    moves.shape, games.shape)
+            raise ValueError(msg)
+        if(len(moves) > 0 and (moves.min() < 0 or moves.max() > 8)):
+            msg = "In call to TicTacToeBoardBatch.move(), moves must be cell indices in [0,8]"
+            raise ValueError(msg)
+        if(self.boards[games, moves].any()):
+            msg = "In call to TicTacToeBoardBatch.move(), tried to play on a filled cell " + \
+                    "in games {}".format(games[self.boards[games, moves] != 0])
+            raise ValueError(msg)
+
+        mark = self.nextTurn
+        self.boards[games, moves] = mark
+        codes = self.codes[games] + mark * _CellWeightsArray[moves]
+        self.codes[games] = codes
+        if(mark == self.Xmark):
+            self.xbits[games] |= _CellBitsArray[moves]
+        else:
+            self.ybits[games] |= _CellBitsArray[moves]
+
+        self.winner[games] = getWinnerArray()[codes]
+        self.done[games] = getTerminalArray()[codes]
+        self.numMoves += 1
+        self.nextTurn = (self.Ymark if(mark==self.Xmark) else self.Xmark)
+
+    # Check all the boards for a line of 3 of the same mark (like TicTacToeBoard.checkWin())
+    # Returns an array of shape (B,) with the mark of the winner, or 0 for no winner.
+    def checkWin(self):
+        return getWinnerArray()[self.codes]
+
+    # The results of the games as 1/0/-1 for a win for X, draw (or not over), or a win for Y
+    def results(self):
+        ret = np.zeros(len(self), dtype=np.int8)
+        ret[self.winner == self.Xmark] = 1
+        ret[self.winner == self.Ymark] = -1
+        return ret
+
+    # Return the game at index 'g' as a T-Board (of the class 'boardClass')
+    def getBoard(self, g, boardClass=TicTacToeBoard):
+        from Helper import makeBoardFromPosition
+        tb = makeBoardFromPosition(self.boards[g].copy())
+        return boardClass(copyFrom=tb)
+###############################################################################
+
+
+
+
+#        Base Class for all policies that pick moves for a batch
+###############################################################################
+class BatchPolicy:
+    # Constuctor accepts either an RNG or a seed value (like TicTacToeEngine)
+    def __init__(self, randomSeed=None, rng=None):
+        if(rng is not None):
+            self.rng = rng
+        else:
+            self.rng = np.random.default_rng(seed=randomSeed)
+
+    # Return the masks (as np.uint16) of the candidate moves in each of 'games'
+    # Every subclass must override this: chooseMoves() only picks among the
+    #   ... moves it returns.
+    def candidateMasks(self, batch:TicTacToeBoardBatch, games):
+        msg = "{} must override BatchPolicy.candidateMasks() to return the masks " + \
+                "of the candidate moves in each game"
+        raise NotImplementedError(msg.format(type(self).__name__))
+
+    # Pick one of the candidate moves for each of 'games' (all active games if None)
+    # Ties are resolved as either the first, the last or a random candidate.
+    # Returns an array of cell indices, one for each game
+    def chooseMoves(self, batch:TicTacToeBoardBatch, games=None, separateEqualsBy='random'):
+        if(games is None):
+            games = batch.activeGames()
+        masks = self.candidateMasks(batch, games)
+        counts = _PopCount[masks]
+        if((counts == 0).any()):
+            msg = "In call to {}.chooseMoves(), there were no candidate moves in the games {}"
+            msg = msg.format(type(self).__name__, np.asarray(games)[counts == 0])
+            raise ValueError(msg)
+
+        if(separateEqualsBy == 'random'):
+            k = self.rng.integers(counts)
+        elif(separateEqualsBy == 'leftmost'):
+            k = 0
+        elif(separateEqualsBy == 'rightmost'):
+            k = counts - 1
+        else:
+            msg = "Argument 'separateEqualsBy' in call to BatchPolicy.chooseMoves() must " + \
+                    "either be left out or be one of " + \
+                    "['random', 'leftmost', 'rightmost']. " + \
+                    "Received '{}'".format(separateEqualsBy)
+            raise ValueError(msg)
+        return _KthBit[masks, k]
+###############################################################################
+
+
+
+
+#        Policy that plays any legal move at random
+###############################################################################
+class RandomBatchPolicy(BatchPolicy):
+
+    def candidateMasks(self, batch:TicTacToeBoardBatch, games):
+        return batch.emptyBits(games)
+###############################################################################
+
+
+
+
+#        Policy that plays the best moves from a tablebase
+###############################################################################
+# The tablebase only has the canonical positions, so looking up a position takes
+#   ... the SymTable's (r,op) for its code, the best moves of 'r' and the operation
+#   ... 'op' to map those moves back onto the position (see TableBaseEngine).
+# All of that is done once for all 3**9 codes when the policy is made, so that
+#   ... choosing moves is a single look-up of 'moveMasks[codes]'.
+class TableBaseBatchPolicy(BatchPolicy):
+
+    # 'tableBase' is a BinaryTableBase, or a TableBase which gets converted to one
+    def __init__(self, tableBase, randomSeed=None, rng=None):
+        super().__init__(randomSeed, rng)
+        from Encode import getSymmetryTable
+        from TableBase import BinaryTableBase
+
+        if(not isinstance(tableBase, BinaryTableBase)):
+            btbase = BinaryTableBase()
+            btbase.setTable(tableBase.getTable())
+            tableBase = btbase
+
+        symTable = getSymmetryTable()
+        reps = symTable[:,0].astype(np.intp)
+        ops = symTable[:,1].astype(np.intp)
+        repMasks = np.asarray(tableBase.getTable())[reps] & _FullMask
+        self.moveMasks = _MaskTransform[ops, repMasks]
+        self.moveMasks.flags.writeable = False
+
+    def candidateMasks(self, batch:TicTacToeBoardBatch, games):
+        ret = self.moveMasks[batch.codes[games]]
+        if(not ret.all()):
+            msg = "In call to TableBaseBatchPolicy.candidateMasks(), the positions of " + \
+                    "the games {} were not found in the tablebase."
+            raise TableBaseLookupError(msg.format(np.asarray(games)[ret == 0]))
+        return ret
+###############################################################################
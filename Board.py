@@ -9,16 +9,25 @@ import numpy as np
 
 # Every move is represented by an index from 0 to 8 where it should be played (use row-major linearization)
 
+# The integer encoding of a board is sum(board[i] * 3**i) (see Encode.py)
+# Every T-Board keeps its encoding in 'code', updated on each move() and undoLastMove().
+# If created with trackSymmetries=True, it also keeps 'symCodes', such that 
+#   ... symCodes[op] is the encoding of the board after the D8 operation 'op' (see Symmetry.py)
+
 class TicTacToeBoard:
     
     def __init__(self, **kwargs):
         if('copyFrom' in kwargs.keys()):
             other = kwargs['copyFrom']
-            self.board = other.board.copy()
+            self.trackSymmetries = kwargs.get('trackSymmetries', 
+                                              getattr(other, 'trackSymmetries', False))
+            self.board = other.board
             self.nextTurn = other.nextTurn
             self.moveHistory = other.moveHistory[:]
             return    
         
+        self.trackSymmetries = kwargs.get('trackSymmetries', False)
+        
         self.board = np.zeros(shape=(9,), dtype=np.uint8)
         
         self.nextTurn = self.Xmark
@@ -45,33 +54,87 @@ class TicTacToeBoard:
 #######################################################
     
     
+    # The board vector, as a read-only view (so that in-place writes, which would 
+    #   ... leave the encodings stale, raise a ValueError).
+    # Assigning a new vector copies it and recalculates the encodings.
+    @property
+    def board(self):
+        return self._boardView
+    
+    @board.setter
+    def board(self, vec):
+        self._board = np.array(vec, dtype=np.uint8)
+        self._makeBoardView()
+        self._recalcCodes()
+    
+    def _makeBoardView(self):
+        self._boardView = self._board.view()
+        self._boardView.flags.writeable = False
+    
+    # The view is pickled as an array of its own, so it's made anew from '_board'
+    # T-Boards pickled before 'board' became a property have it in their state
+    #   ... instead (and no encodings), so it is assigned like a new vector.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_boardView', None)
+        return state
+    
+    def __setstate__(self, state):
+        state = dict(state)
+        vec = state.pop('board', None)
+        self.__dict__.update(state)
+        if('trackSymmetries' not in state):
+            self.trackSymmetries = False
+        if(vec is not None):
+            self.board = vec
+        elif('_board' in state):
+            self._makeBoardView()
+    
+    
+    # Calculate 'code' (and 'symCodes') from scratch from the board vector
+    def _recalcCodes(self):
+        vec = np.asarray(self.board, dtype=np.int64)
+        self.code = int(vec @ _CellWeightsArray)
+        if(self.trackSymmetries):
+            self.symCodes = (vec @ np.array(_getSymmetricCellWeights())).tolist()
+        else:
+            self.symCodes = None
+            
+    # Add (or subtract, when 'mark' is negative) a mark at 'pos' to 'symCodes'
+    # 'code' is updated by the callers themselves, since that's on the hot path.
+    def _updateSymCodes(self, pos, mark):
+        self.symCodes = [c + mark*w for c,w in zip(self.symCodes, _getSymmetricCellWeights()[pos])]
+            
+    # The smallest encoding among the board's symmetric variants (as in Encode.encode())
+    # Needs trackSymmetries=True
+    def canonicalCode(self):
+        if(not self.trackSymmetries):
+            msg = "canonicalCode() needs a T-Board created with trackSymmetries=True"
+            raise RuntimeError(msg)
+        return min(self.symCodes)
+    
+    
     # Checks if anyone has won the game.
     # Returns Xmark/Ymark if either player won, otherwise returns 0.
     # If the position is illegal with more than 1 instance of a 3-in-a-row, then
     #   ... the output may be either player depending on whose 3-in-a-row is found first
+    # The winner of every encoding is precomputed (see StateTable.py), so this is a single look-up.
     def checkWin(self):
-        
-        # If less than 5 moves have been made => no winner.
-        if(np.sum(self.board > 0) < 5):
-            return 0
-        
-        for idxs in self.WinPatterns:
-            if((self.board[idxs]==self.Xmark).all()):
-                return self.Xmark
-            if((self.board[idxs]==self.Ymark).all()):
-                return self.Ymark
-        
-        return 0
+        return _getStateLists()[0][self.code]
             
         
     # Makes a move for the player 'self.nextTurn' at the position 'pos'
     def move(self, pos):
         try:
-            assert self.board[pos] == 0
-            self.board[pos] = self.nextTurn
+            assert self._board[pos] == 0
+            self._board[pos] = self.nextTurn
             #assert self.board[pos//3,pos%3] == 0
             #self.board[pos//3, pos%3] = self.nextTurn
             
+            self.code += self.nextTurn*_CellWeights[pos]
+            if(self.trackSymmetries):
+                self._updateSymCodes(pos, self.nextTurn)
+            
             self.changeTurn()
             self.moveHistory.append(pos)
             
@@ -89,14 +152,18 @@ class TicTacToeBoard:
     # Uses self.moveHistory to reset the board to its state before the most recent move.
     def undoLastMove(self):
         lpos = self.moveHistory.pop()
-        self.board[lpos] = 0
+        mark = int(self._board[lpos])
+        self.code -= mark*_CellWeights[lpos]
+        if(self.trackSymmetries):
+            self._updateSymCodes(lpos, -mark)
+        self._board[lpos] = 0
         self.changeTurn()
         
         
-    # Returns a list of all possible next moves
+    # Returns an array of all possible next moves
+    # The returned array is shared between calls, so it is read-only.
     def possibleNextMoves(self):
-        ret = np.nonzero(self.board==0)[0]
-        return ret
+        return _MovesOfMask[_getStateLists()[1][self.code]]
         
     # Updates whose turn it is
     def changeTurn(self):
@@ -146,3 +213,209 @@ class TicTacToeBoard:
     
 
 
+
+
+
+#        Weights of each cell in the encodings
+###############################################################################
+# _CellWeights[i] is the weight of the cell at index 'i' in the encoding
+_CellWeights = tuple(3**i for i in range(9))
+_CellWeightsArray = np.array(_CellWeights)
+
+# _SymmetricCellWeights[i][op] is the weight of the cell at index 'i' in the 
+#   ... encoding of the board after the D8 operation 'op'
+_SymmetricCellWeights = None
+
+# Getter method for the module-scoped '_SymmetricCellWeights'
+# The D8 operations are defined in Symmetry.py, which imports this module.
+#   ... Hence, Symmetry is imported here only when the weights are first needed.
+def _getSymmetricCellWeights():
+    global _SymmetricCellWeights
+    if(_SymmetricCellWeights is None):
+        from Symmetry import newIndex
+        _SymmetricCellWeights = tuple(tuple(3**newIndex(i,op) for op in range(8)) 
+                                        for i in range(9))
+    return _SymmetricCellWeights
+###############################################################################
+
+
+
+
+#        State of every position, by its encoding
+###############################################################################
+# (winners, emptyMasks) such that winners[N] is the winner of the board with the 
+#   ... encoding 'N' (or 0), and emptyMasks[N] has bit 'i' set if its cell at 'i' is empty.
+# These are python lists made from the arrays of StateTable.py, since indexing a 
+#   ... list with an int is the fastest look-up of a single position.
+_StateLists = None
+
+# Getter method for the module-scoped '_StateLists'
+# StateTable imports this module, hence it is imported here only when first needed.
+def _getStateLists():
+    global _StateLists
+    if(_StateLists is None):
+        from StateTable import getWinnerArray, getEmptyMaskArray
+        _StateLists = (getWinnerArray().tolist(), getEmptyMaskArray().tolist())
+    return _StateLists
+###############################################################################
+
+
+
+
+#        T-Board backed by a pair of 9-bit integers (a.k.a bitboard)
+###############################################################################
+# Lookup tables for the bitboard, built once when this module is imported
+#######################################################
+_CellBits = tuple(1<<i for i in range(9))
+
+_WinMasks = tuple(sum(_CellBits[i] for i in np.arange(9)[idxs]) 
+                    for idxs in TicTacToeBoard.WinPatterns)
+
+# _IsWinning[bits] is True if 'bits' contains any of the _WinMasks
+_IsWinning = tuple(any((bits & m) == m for m in _WinMasks) 
+                    for bits in range(1<<9))
+
+# _MovesOfMask[bits] is the (read-only) array of the indices of ...
+#   ... all the cells whose bits are set in 'bits'
+_MovesOfMask = tuple(np.nonzero((bits >> np.arange(9)) & 1)[0]
+                        for bits in range(1<<9))
+for _arr in _MovesOfMask:
+    _arr.flags.writeable = False
+del _arr
+#######################################################
+
+
+# Bit 'i' of xbits/ybits is set when the cell at index 'i' is marked by X/Y.
+# Has the same public API as TicTacToeBoard, so it can be used wherever a
+#   ... TicTacToeBoard is expected. The 'board' attribute is still available,
+#   ... but it is built from the bits on every access, as a read-only array
+#   ... (assign to 'board' to change the T-Board).
+class TicTacToeBitBoard(TicTacToeBoard):
+    
+    def __init__(self, **kwargs):
+        if('copyFrom' in kwargs.keys()):
+            other = kwargs['copyFrom']
+            self.trackSymmetries = kwargs.get('trackSymmetries', 
+                                              getattr(other, 'trackSymmetries', False))
+            if(isinstance(other, TicTacToeBitBoard) and 
+               self.trackSymmetries == other.trackSymmetries):
+                self.xbits = other.xbits
+                self.ybits = other.ybits
+                self.code = other.code
+                self.symCodes = (other.symCodes[:] if(self.trackSymmetries) else None)
+            else:
+                self.board = other.board
+            self.nextTurn = other.nextTurn
+            self.moveHistory = other.moveHistory[:]
+            return
+        
+        self.trackSymmetries = kwargs.get('trackSymmetries', False)
+        
+        self.xbits = 0
+        self.ybits = 0
+        
+        self.code = 0
+        self.symCodes = ([0]*8 if(self.trackSymmetries) else None)
+        
+        self.nextTurn = self.Xmark
+        
+        self.moveHistory = list()
+        
+        
+
+#                CLASS PROPETIES
+#######################################################
+    # CellBits[i] is the bit that represents the cell at index 'i'
+    CellBits = _CellBits
+    
+    FullMask = (1<<9) - 1
+    
+    # WinMasks[k] has the bits set for the cells of WinPatterns[k]
+    WinMasks = _WinMasks
+#######################################################
+    
+    
+    # The board vector with Xmark/Ymark/0 in each cell, made from the bits
+    @property
+    def board(self):
+        cells = np.arange(9)
+        ret = self.Xmark*((self.xbits >> cells) & 1) + \
+                self.Ymark*((self.ybits >> cells) & 1)
+        ret = ret.astype(np.uint8)
+        ret.flags.writeable = False
+        return ret
+    
+    # Set the bits from a board vector with Xmark/Ymark/0 in each cell
+    @board.setter
+    def board(self, vec):
+        vec = np.asarray(vec)
+        self.xbits = sum(self.CellBits[i] for i in np.nonzero(vec == self.Xmark)[0])
+        self.ybits = sum(self.CellBits[i] for i in np.nonzero(vec == self.Ymark)[0])
+        self._recalcCodes()
+        
+    
+    # Checks if anyone has won the game.
+    # Returns Xmark/Ymark if either player won, otherwise returns 0.
+    # If the position is illegal with 3-in-a-rows for both players, then the
+    #   ... output is the same as TicTacToeBoard.checkWin() on that position
+    def checkWin(self):
+        xwin = _IsWinning[self.xbits]
+        ywin = _IsWinning[self.ybits]
+        if(not ywin):
+            return (self.Xmark if xwin else 0)
+        if(not xwin):
+            return self.Ymark
+        
+        for m in _WinMasks:
+            if((self.xbits & m) == m):
+                return self.Xmark
+            if((self.ybits & m) == m):
+                return self.Ymark
+    
+    
+    # Makes a move for the player 'self.nextTurn' at the position 'pos'
+    def move(self, pos):
+        try:
+            bit = self.CellBits[pos]
+        except (TypeError,IndexError):
+            msg = "In call to move(), pos must be an integer in [0,8]. Received '{}'"
+            msg = msg.format(pos)
+            raise ValueError(msg)
+        
+        if((self.xbits | self.ybits) & bit):
+            msg = "In call to move({}), the board is already marked {} at position {}"
+            val = (self.Xmark if(self.xbits & bit) else self.Ymark)
+            msg = msg.format(pos, val, pos)
+            raise ValueError(msg)
+        
+        if(self.nextTurn == self.Xmark):
+            self.xbits |= bit
+        else:
+            self.ybits |= bit
+        
+        self.code += self.nextTurn*_CellWeights[pos]
+        if(self.trackSymmetries):
+            self._updateSymCodes(pos, self.nextTurn)
+        
+        self.changeTurn()
+        self.moveHistory.append(pos)
+        
+    
+    # Uses self.moveHistory to reset the board to its state before the most recent move.
+    def undoLastMove(self):
+        lpos = self.moveHistory.pop()
+        mark = (self.Xmark if(self.xbits & self.CellBits[lpos]) else self.Ymark)
+        self.code -= mark*_CellWeights[lpos]
+        if(self.trackSymmetries):
+            self._updateSymCodes(lpos, -mark)
+        clear = self.FullMask ^ self.CellBits[lpos]
+        self.xbits &= clear
+        self.ybits &= clear
+        self.changeTurn()
+        
+        
+    # Returns an array of all possible next moves
+    # The returned array is shared between calls, so it is read-only.
+    def possibleNextMoves(self):
+        return _MovesOfMask[self.FullMask ^ (self.xbits | self.ybits)]
+###############################################################################
@@ -1,15 +1,21 @@
 
+import os
 import numpy as np
 
 from Board import TicTacToeBoard
-from Symmetry import transformVec, allVectorVariants
+from Symmetry import allVectorVariantsArray
 from Helper import makeBoardFromPosition, makeBoardFromIllegalPosition, extendRootPath
 
 
 #       Simple Encoding/Decoding functions
 ######################################################
+# _powersOf3[i] is the weight of the cell at index 'i' in the encoding
+_powersOf3 = 3**np.arange(9)
+_powersOf3.flags.writeable = False
+
+# Every T-Board keeps its encoding up-to-date in 'tb.code', so no calculation is needed
 def _encodeBoardAsInteger(tb : TicTacToeBoard) -> int:
-    return np.sum(tb.board*(3**np.arange(9)))
+    return tb.code
 
 def _decodeBoardFromInteger(N : int, allowIllegal=False) -> TicTacToeBoard:
     if(allowIllegal is True):
@@ -17,11 +23,13 @@ def _decodeBoardFromInteger(N : int, allowIllegal=False) -> TicTacToeBoard:
     else:
         return makeBoardFromPosition(_decodeVectorFromInteger(N))
 
+# Also works on an array of board-vectors of shape (...,9), returning an array of shape (...)
 def _encodeVectorAsInteger(vec):
-    return np.sum(vec*(3**np.arange(9)))
+    return np.sum(vec*_powersOf3, axis=-1)
 
+# Also works on an array of integers of shape (...), returning an array of shape (...,9)
 def _decodeVectorFromInteger(N):
-    return (N//3**(np.arange(9)))%3
+    return (np.asarray(N)[...,None]//_powersOf3)%3
 ######################################################
 
 
@@ -35,6 +43,11 @@ def _decodeVectorFromInteger(N):
 #         ... cannot access/modify this variable.
 _SymTable = None
 _dataPathToSymTable = None
+_dataPathToCompactSymTable = None
+
+# When True, the SymTable file is memory-mapped (read-only) instead of read into memory.
+# Then all processes on a system share a single copy of it through the page cache.
+_useMemoryMap = False
 
 
 
@@ -63,12 +76,16 @@ _dataPathToSymTable = None
 
 # Encode a T-Board to an int
 # When useSymmetry=True, encodes all symmetrically same boards to the same value.
+# Both cases take O(1) time, since the T-Board keeps its encoding up-to-date.
 def encode(tb : TicTacToeBoard, useSymmetry=True) -> int:
     N = _encodeBoardAsInteger(tb)
     if(useSymmetry is False):
         return N
     
-    return tuple(lookUpSymTable(N))
+    if(_SymTable is None):
+        loadSymmetryTable()
+    row = _SymTable[N]
+    return int(row[0]), int(row[1])
 
 # Decode a T-Board from an int
 def decode(N : int) -> TicTacToeBoard:
@@ -76,21 +93,46 @@ def decode(N : int) -> TicTacToeBoard:
 
 
 # Perform a look-up of the SymTable
+# Returns the pair (r,op) as python ints (see SYMMETRY TABLE CONCEPT above)
 def lookUpSymTable(idx : int):
     global _SymTable
     if(_SymTable is None):
         loadSymmetryTable()
+    if(idx < 0):
+        raise ValueError("Invalid index {} in lookUpSymTable()".format(idx))
     try:
-        return _SymTable[idx,:].copy()
-    except IndexError:
+        row = _SymTable[idx]
+    except (IndexError, TypeError):
         raise ValueError("Invalid index {} in lookUpSymTable()".format(idx))
+    return int(row[0]), int(row[1])
+
+# Perform a look-up of the SymTable for an array of indices
+# Returns the arrays (r,op) with the same shape as 'idxs' and the dtype np.intp
+def lookUpSymTableBatch(idxs):
+    global _SymTable
+    if(_SymTable is None):
+        loadSymmetryTable()
+    idxs = np.asarray(idxs)
+    if(idxs.size > 0 and (idxs.min() < 0 or idxs.max() >= _SymTable.shape[0])):
+        raise ValueError("Invalid indices in lookUpSymTableBatch()")
+    return _SymTable[idxs,0].astype(np.intp), _SymTable[idxs,1].astype(np.intp)
         
-# Return a copy of the SymTable
+# Return a read-only view of the SymTable (no copy is made)
 def getSymmetryTable():
     global _SymTable
     if(_SymTable is None):
         loadSymmetryTable()
-    return _SymTable.copy()
+    ret = _SymTable.view()
+    ret.flags.writeable = False
+    return ret
+
+# Choose whether the SymTable file is memory-mapped when it is loaded
+# Drops the currently loaded table, if that was loaded the other way.
+def useMemoryMap(flag=True):
+    global _useMemoryMap, _SymTable
+    if(flag != _useMemoryMap):
+        _useMemoryMap = flag
+        _SymTable = None
         
 
     
@@ -108,48 +150,63 @@ def _getDataPathToSymTable():
         _dataPathToSymTable = extendRootPath('data', 'SymTable.npy')
     return _dataPathToSymTable
 
+# Getter method for the module-scoped variable _dataPathToCompactSymTable.
+# The compact SymTable stores the same table with 2 bytes per entry instead of 4.
+def _getDataPathToCompactSymTable():
+    global _dataPathToCompactSymTable
+    
+    if(_dataPathToCompactSymTable is None):
+        _dataPathToCompactSymTable = extendRootPath('data', 'SymTable-uint16.npy')
+    return _dataPathToCompactSymTable
+
         
-# Calculate the symmetry table by generating all possible moves
+# Calculate the symmetry table for all the 3**9 integer encodings at once
+#   1. Decode all the integers into an array of board-vectors of shape (3**9, 9)
+#   2. Encode all 8 variants of every board-vector into an array of shape (8, 3**9)
+#   3. The representative of each integer is the minimum of its 8 variants
+#   4. Its 'op' is the first operation (in order of op-index) that takes its 
+#       ... representative back to that integer
 def calcSymmetryTable():
     global _SymTable
-    _SymTable = np.zeros(shape=(3**9,2), dtype=np.int32)
-    _SymTable -= 1
+    allN = np.arange(3**9)
+    allVecs = _decodeVectorFromInteger(allN)
     
-    for N in range(3**9):
-        if(_SymTable[N,0] != -1):
-            continue
-        
-        b = _decodeVectorFromInteger(N)
-        
-        Bvecs = allVectorVariants(b)
-        encodings = np.array([_encodeVectorAsInteger(b) for b in Bvecs])
-        
-        repEncoding = np.min(encodings)
-        repVector = Bvecs[np.argmin(encodings)]
-        
-        for op in range(8):
-            bt = transformVec(repVector, op)
-            nbt = _encodeVectorAsInteger(bt)
-            if(_SymTable[nbt,0]==-1):
-                _SymTable[nbt,0] = repEncoding
-                _SymTable[nbt,1] = op
+    encodings = _encodeVectorAsInteger(allVectorVariantsArray(allVecs))
+    repEncodings = np.min(encodings, axis=0)
+    
+    repVariants = _encodeVectorAsInteger(allVectorVariantsArray(allVecs[repEncodings]))
+    ops = np.argmax(repVariants == allN, axis=0)
+    
+    _SymTable = np.stack([repEncodings, ops], axis=1).astype(np.int32)
     
 
-# Save the symmetry table as a numpy file
-def saveSymmetryTable():
+# Save the symmetry table as numpy files
+# By default, saves it to both the SymTable file and the compact SymTable file
+#   ... (with the dtype np.uint16), so that loadSymmetryTable(), which prefers the
+#   ... compact file, never loads a stale copy of the table.
+# If compact=True/False, saves it only to the compact/full SymTable file.
+def saveSymmetryTable(compact=None):
     global _SymTable
-    savePath = _getDataPathToSymTable()
-    np.save(savePath, _SymTable, allow_pickle=False)
+    if(compact is not False):
+        savePath = _getDataPathToCompactSymTable()
+        np.save(savePath, _SymTable.astype(np.uint16), allow_pickle=False)
+    if(compact is not True):
+        savePath = _getDataPathToSymTable()
+        np.save(savePath, _SymTable, allow_pickle=False)
 
 # Load the symmetry table from a numpy file
+# Prefers the compact file if it exists. Memory-maps the file if useMemoryMap() was set.
 def loadSymmetryTable():
     global _SymTable
-    loadPath = _getDataPathToSymTable()
+    loadPath = _getDataPathToCompactSymTable()
+    if(not os.path.exists(loadPath)):
+        loadPath = _getDataPathToSymTable()
     try:
-        _SymTable = np.load(loadPath, allow_pickle=False)
+        _SymTable = np.load(loadPath, mmap_mode=('r' if _useMemoryMap else None), 
+                            allow_pickle=False)
     except OSError:
         msg = "File does not exist while trying to " +\
                 "load the Symmetry Table from path: {}".format(loadPath)
         raise ValueError(msg)
     
-    
\ No newline at end of file
+    
@@ -1,16 +1,26 @@
 
+import time
 import numpy as np
 
 from Board import TicTacToeBoard
-from MiniMax import minimaxEvalsForNextMoves
 from Encode import encode
 from Symmetry import newIndex
 from TableBase import TableBaseLookupError
 
 
+# NOTE: MiniMax and MachineCode (with ctypes) are imported inside the methods of 
+#   ... MiniMaxEngine, so that programs which only use a TableBaseEngine start faster.
+#   ... Likewise, asyncio is only imported by the async methods, and Telemetry by enableStats().
+
+
 #        Base Class for all TicTacToe engines
 ###############################################################################
 class TicTacToeEngine:
+    
+    # Whether listBestMovesAsync() runs listBestMoves() in an executor, instead of
+    #   ... right away in the event loop (for engines that answer in microseconds)
+    offloadSearch = False
+    
     # Constuctor accepts either an RNG or a seed value
     def __init__(self, randomSeed=None, rng=None):
         if(rng is not None):
@@ -20,8 +30,38 @@ class TicTacToeEngine:
                 self.rng = np.random.default_rng(seed=randomSeed)
             else:
                 self.rng = np.random.default_rng()
+        
+        # The Telemetry.EngineStats that records every call to listBestMoves(), if any
+        self.stats = None
              
     
+    # Record every call to listBestMoves() in 'stats' (a Telemetry.EngineStats), 
+    #   ... or in a new collector named 'name' (the class name if None) 
+    # Returns the collector, which may also be shared with other engines.
+    def enableStats(self, stats=None, name=None):
+        if(stats is None):
+            from Telemetry import EngineStats
+            stats = EngineStats(name if(name is not None) else type(self).__name__)
+        self.stats = stats
+        return stats
+    
+    def disableStats(self):
+        self.stats = None
+    
+    # Call fn(tb, info) and record it in self.stats, along with the dict 'info' 
+    #   ... that it fills in (see Telemetry.py)
+    def _recordedCall(self, fn, tb):
+        info = {}
+        t0 = time.perf_counter()
+        try:
+            ret = fn(tb, info)
+        except Exception:
+            self.stats.recordCall(time.perf_counter() - t0, info, error=True)
+            raise
+        self.stats.recordCall(time.perf_counter() - t0, info)
+        return ret
+    
+    
     # Generate a random next move
     def randomMove(self, tb : TicTacToeBoard):
         candidateMoves = tb.possibleNextMoves()
@@ -57,6 +97,47 @@ class TicTacToeEngine:
     def bestMove(self, tb:TicTacToeBoard, separateEqualsBy='random'):            
         candidateMoves = self.listBestMoves(tb)
         return self.chooseAmongCandidates(candidateMoves, separateEqualsBy)            
+    
+    
+    # Same as listBestMoves(), but gives up with a TimeoutError once 'timeLimit' seconds 
+    #   ... have passed (None for no limit), for engines whose searches can take long.
+    # Engines that answer in microseconds just return listBestMoves().
+    def listBestMovesWithin(self, tb:TicTacToeBoard, timeLimit=None):
+        return self.listBestMoves(tb)
+    
+    
+    # Same as listBestMoves(), but can be awaited in an event loop without blocking it.
+    # If the engine has 'offloadSearch' set, the search runs on a copy of the board 
+    #   ... in 'executor' (the event loop's default thread pool if None). A 
+    #   ... ProcessPoolExecutor gets a pickled copy of the engine.
+    # Raises asyncio.TimeoutError if no result is ready within 'timeout' seconds (None for no limit).
+    # With a timeout, the search runs with listBestMovesWithin(), so that it stops 
+    #   ... by itself in the executor at about the same time.
+    # On a cancellation, a search that hasn't started yet is dropped, but one that
+    #   ... has started still runs to its end in the executor (its result is ignored).
+    async def listBestMovesAsync(self, tb:TicTacToeBoard, executor=None, timeout=None):
+        import asyncio
+        if(not self.offloadSearch):
+            return self.listBestMoves(tb)
+        
+        tb = type(tb)(copyFrom=tb)
+        loop = asyncio.get_running_loop()
+        if(timeout is None):
+            fut = loop.run_in_executor(executor, self.listBestMoves, tb)
+        else:
+            fut = loop.run_in_executor(executor, self.listBestMovesWithin, tb, timeout)
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        except TimeoutError as e:       # the search gave up before wait_for() did
+            raise asyncio.TimeoutError() from e
+    
+    # Same as bestMove(), but can be awaited (see listBestMovesAsync())
+    # Ties are resolved here with self.rng, and not in the executor, so that the 
+    #   ... moves are the same as those of bestMove() for the same state of the RNG.
+    async def bestMoveAsync(self, tb:TicTacToeBoard, separateEqualsBy='random', 
+                            executor=None, timeout=None):
+        candidateMoves = await self.listBestMovesAsync(tb, executor, timeout)
+        return self.chooseAmongCandidates(candidateMoves, separateEqualsBy)
 ###############################################################################
           
 
@@ -66,28 +147,120 @@ class TicTacToeEngine:
 ###############################################################################
 class MiniMaxEngine(TicTacToeEngine):
     
-    def __init__(self, randomSeed=None, rng=None, pruning=True, useMachineCode=True, forceMachineCode=False):
+    # Searches can take long in python. The machine code releases the GIL while 
+    #   ... it runs (as all ctypes calls do), so threads search in parallel with it.
+    offloadSearch = True
+    
+    # 'pruning' may also be 'negamax', for the fastest search (see MiniMax.minimax_Negamax())
+    # If memoize=True, evaluations are cached in 'transpositionTable' (a MiniMax.TranspositionTable)
+    #   ... or in the default table shared by all engines, if it is None
+    # If any of maxNodes, timeLimit (in seconds) or maxDepth (in moves) are given, the 
+    #   ... engine searches with iterative deepening within that budget, in python
+    #   ... (see MiniMax.minimaxEvalsIterativeDeepening()), and the other options are ignored.
+    def __init__(self, randomSeed=None, rng=None, pruning=True, useMachineCode=True, forceMachineCode=False,
+                 memoize=False, transpositionTable=None, maxNodes=None, timeLimit=None, maxDepth=None):
         super().__init__(randomSeed, rng)        
         self.pruning = pruning
         self.useMachineCode = useMachineCode
         self.forceMachineCode = forceMachineCode
+        self.memoize = memoize
+        self.transpositionTable = transpositionTable
+        self.maxNodes = maxNodes
+        self.timeLimit = timeLimit
+        self.maxDepth = maxDepth
+        
+        # Details of the latest search: a dict with 'depth', 'nodes' and 'exact'
+        #   ... (only set by budgeted searches)
+        self.lastSearch = None
+    
+    
+    def isBudgeted(self):
+        return (self.maxNodes is not None or self.timeLimit is not None or self.maxDepth is not None)
+    
+    
+    # Which implementation of minimax this engine runs: 'native' or 'python'
+    def getBackend(self):
+        if(self.useMachineCode is False or self.memoize is True or self.isBudgeted()):
+            return 'python'
+        from MachineCode import getBackendInfo
+        return getBackendInfo()['backend']
       
         
     # Use the minimax algorithm (w/ or w/o pruning) to find all the moves
     #   ... that lead to the best possible result for the next player
+    # A budgeted search lists the moves that were best at the deepest depth it reached.
     def listBestMoves(self, tb):
+        if(self.stats is not None):
+            return self._recordedCall(self._listBestMoves, tb)
+        return self._listBestMoves(tb)
+    
+    # 'info' is a dict for the details of the search, or None (see Telemetry.py)
+    def _listBestMoves(self, tb, info=None):
+        if(self.isBudgeted()):
+            ret = self.listBestMovesWithDepth(tb)[0]
+            if(info is not None):
+                info['nodes'] = self.lastSearch['nodes']
+                info['backend'] = 'python'
+            return ret
+        
+        from MiniMax import minimaxEvalsForNextMoves
         
         orig = tb
-        tb = TicTacToeBoard(copyFrom=orig)
+        tb = type(orig)(copyFrom=orig)
         
         scores = minimaxEvalsForNextMoves(
                                             tb,
                                             pruning=self.pruning,
                                             tryNative = self.useMachineCode,
-                                            forceNative = self.forceMachineCode
+                                            forceNative = self.forceMachineCode,
+                                            memoize = self.memoize,
+                                            table = self.transpositionTable,
+                                            info = info
                                           )
+        return self._bestOfScores(tb, scores)
+    
+    
+    # Searches in python (see getBackend()) stop once 'timeLimit' seconds have passed:
+    #   ... a budgeted search returns its best moves so far (with its own timeLimit
+    #   ... lowered to 'timeLimit'), and any other search raises a TimeoutError.
+    # Searches in machine code take milliseconds, and always run to the end.
+    # Searches with a time limit always prune (see MiniMax.minimaxEvalsWithinBudget()),
+    #   ... so the engine's 'pruning' only changes the number of nodes they search.
+    def listBestMovesWithin(self, tb, timeLimit=None):
+        if(timeLimit is None or self.getBackend() != 'python'):
+            return self.listBestMoves(tb)
+        if(self.stats is not None):
+            return self._recordedCall(lambda tb, info: self._listBestMovesWithin(tb, timeLimit, info), tb)
+        return self._listBestMovesWithin(tb, timeLimit)
+    
+    def _listBestMovesWithin(self, tb, timeLimit, info=None):
+        if(self.isBudgeted()):
+            ret = self.listBestMovesWithDepth(tb, timeLimit)[0]
+            if(info is not None):
+                info['nodes'] = self.lastSearch['nodes']
+                info['backend'] = 'python'
+            return ret
         
-        
+        from MiniMax import minimaxEvalsWithinBudget, SearchBudget, SearchBudgetExceeded
+        tb = type(tb)(copyFrom=tb)
+        budget = SearchBudget(timeLimit=timeLimit)
+        try:
+            scores,cnt = minimaxEvalsWithinBudget(tb, budget)
+        except SearchBudgetExceeded:
+            if(info is not None):
+                info['nodes'] = budget.nodes
+                info['backend'] = 'python'
+            msg = "The search ran out of its time limit of {}s".format(timeLimit)
+            raise TimeoutError(msg)
+        if(info is not None):
+            info['nodes'] = cnt
+            info['backend'] = 'python'
+        return self._bestOfScores(tb, scores)
+    
+    
+    # The moves with the best of the minimax 'scores' (see MiniMax.minimaxEvalsForNextMoves())
+    #   ... for the player to move on 'tb'
+    def _bestOfScores(self, tb, scores):
         winningScore = (1 if(tb.nextTurn==tb.Xmark) else -1)
         losingScore = (-1 if(tb.nextTurn==tb.Xmark) else 1)
         # drawingScore is always 0
@@ -104,6 +277,39 @@ class MiniMaxEngine(TicTacToeEngine):
             raise RuntimeError(msg)
         
         return bestCandidates
+    
+    
+    # Search within the engine's budget (which must be set; see the constructor)
+    # 'timeLimit' (in seconds), if given, lowers the engine's own timeLimit for this search.
+    # Returns (bestCandidates, depth), where 'depth' is the depth (in moves) the search 
+    #   ... reached. Also sets self.lastSearch.
+    def listBestMovesWithDepth(self, tb, timeLimit=None):
+        if(not self.isBudgeted()):
+            msg = "MiniMaxEngine.listBestMovesWithDepth() needs one of maxNodes, " + \
+                    "timeLimit or maxDepth to be set"
+            raise ValueError(msg)
+        from Board import TicTacToeBitBoard
+        from MiniMax import minimaxEvalsIterativeDeepening
+        
+        tb = TicTacToeBitBoard(copyFrom=tb)
+        if(timeLimit is None or (self.timeLimit is not None and self.timeLimit < timeLimit)):
+            timeLimit = self.timeLimit
+        scores,depth,cnt,exact = minimaxEvalsIterativeDeepening(tb, self.maxNodes, 
+                                                                timeLimit, self.maxDepth)
+        self.lastSearch = {'depth': depth, 'nodes': cnt, 'exact': exact}
+        
+        legal = (scores != 8)
+        if(not legal.any()):
+            msg = ("The engine found no valid moves. Board: {}, " + \
+                    "Minimax scores: {}").format(tb.board, scores)
+            raise RuntimeError(msg)
+        best = (scores[legal].max() if(tb.nextTurn==tb.Xmark) else scores[legal].min())
+        return np.nonzero(legal & (scores == best))[0], depth
+    
+    # Same as bestMove(), but also returns the depth reached by the search: (move, depth)
+    def bestMoveWithDepth(self, tb, separateEqualsBy='random'):
+        candidateMoves,depth = self.listBestMovesWithDepth(tb)
+        return self.chooseAmongCandidates(candidateMoves, separateEqualsBy), depth
 ###############################################################################
 
 
@@ -120,18 +326,48 @@ class TableBaseEngine(TicTacToeEngine):
     # Use the tablebase and the appropriate transformation fn. to lookup 
     #   ... all the moves for the next player that lead to the best result
     def listBestMoves(self, tb:TicTacToeBoard):
+        if(self.stats is not None):
+            return self._recordedCall(self._listBestMoves, tb)
+        return self._listBestMoves(tb)
+        
+    def _listBestMoves(self, tb:TicTacToeBoard, info=None):
         
         N,op = encode(tb, useSymmetry=True)
         try:
             ls = self.tbase.lookup(N)
         except TableBaseLookupError:
+            if(info is not None):
+                info['backend'] = 'tablebase'
+                info['tablebaseMisses'] = 1
             msg = "In call to TableBaseEngine.bestMove(), the position " +\
                     "{}, encoded as {}, was not found in the tablebase."
             msg = msg.format(tb.board, N)
             raise TableBaseLookupError(msg)
         
+        if(info is not None):
+            info['backend'] = 'tablebase'
+            info['tablebaseHits'] = 1
         candidateMoves = [newIndex(i, op) for i in ls[1:]]
         
         candidateMoves = np.array(candidateMoves, dtype=np.uint8)
         return candidateMoves
 ###############################################################################                         
+
+
+
+
+#        Engine that plays any legal move at random
+###############################################################################
+class RandomEngine(TicTacToeEngine):
+    
+    # Every move that can be played counts as a best move
+    def listBestMoves(self, tb:TicTacToeBoard):
+        if(self.stats is not None):
+            return self._recordedCall(self._listBestMoves, tb)
+        return tb.possibleNextMoves()
+    
+    def _listBestMoves(self, tb:TicTacToeBoard, info=None):
+        if(info is not None):
+            info['backend'] = 'random'
+        return tb.possibleNextMoves()
+###############################################################################
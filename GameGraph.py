@@ -0,0 +1,218 @@
+
+import numpy as np
+
+from Board import TicTacToeBoard
+from Rank import NumLegalPositions, getLegalCodes, legalRank
+from StateTable import getWinnerArray, getTerminalArray
+
+
+#              Game Graph Concept
+#########################################################
+# The 5478 legal positions (see Rank.py) and the moves between them form a
+#   ... directed acyclic graph, with the empty board as its root. Positions are
+#   ... the nodes, referred to by their legal rank, and each move is an edge.
+# The graph is built once, with array operations only, and is kept in:
+#       Successor table : array of shape (5478,9) of np.int16 such that
+#                         ... succ[r,mv] is the rank of the position after playing 'mv'
+#                         ... in the position 'r', or -1 if 'mv' can't be played there
+#                         ... (a filled cell, or a game that is already over)
+#       Parent lists    : the edges reversed, in the CSR (compressed sparse row) format:
+#                         ... the parents of the position 'r' are parents[ptr[r]:ptr[r+1]]
+#                         ... and the moves from each of them to 'r' are in parentMoves
+#       Depths/Layers   : the depth of a position is its number of marks, which
+#                         ... is the same along every path to it. Layer 'd' has the
+#                         ... ranks of all positions at depth 'd' (d = 0..9), sorted.
+# Every edge goes from a layer to the next one, so algorithms over the whole tree
+#   ... (solving the game, counting games, ...) can handle a layer at a time
+#   ... with array operations, instead of recursing through the game tree.
+NumMoves = 9
+
+
+
+
+#       Module-Scope Variables (a.k.a globals)
+#########################################################
+_Successors = None
+_ParentPtr = None
+_Parents = None
+_ParentMoves = None
+_Depths = None
+_Layers = None
+_Values = None
+#########################################################
+
+
+# Build the tables of the graph (see Game Graph Concept above). Called once, when first needed.
+def _buildGameGraph():
+    global _Successors, _ParentPtr, _Parents, _ParentMoves, _Depths, _Layers
+
+    codes = getLegalCodes().astype(np.int64)
+    weights = 3**np.arange(NumMoves)
+    vecs = (codes[:,None] // weights) % 3
+
+    depths = np.count_nonzero(vecs, axis=1).astype(np.int8)
+    marks = np.where(depths % 2 == 0, TicTacToeBoard.Xmark, TicTacToeBoard.Ymark)
+
+    canMove = (vecs == 0) & ~getTerminalArray()[codes][:,None]
+    succ = np.full((NumLegalPositions, NumMoves), -1, dtype=np.int16)
+    succ[canMove] = legalRank((codes[:,None] + marks[:,None]*weights)[canMove])
+
+    # Parent lists, by sorting the edges on their child
+    edgeFrom,edgeMove = np.nonzero(canMove)
+    edgeTo = succ[edgeFrom, edgeMove]
+    order = np.argsort(edgeTo, kind='stable')
+    parentPtr = np.zeros(NumLegalPositions+1, dtype=np.int32)
+    parentPtr[1:] = np.cumsum(np.bincount(edgeTo, minlength=NumLegalPositions))
+    parents = edgeFrom[order].astype(np.int16)
+    parentMoves = edgeMove[order].astype(np.int8)
+
+    layers = [np.flatnonzero(depths == d).astype(np.int16) for d in range(NumMoves+1)]
+
+    for arr in [succ, parentPtr, parents, parentMoves, depths] + layers:
+        arr.flags.writeable = False
+    _Successors,_Depths,_Layers = succ,depths,layers
+    _ParentPtr,_Parents,_ParentMoves = parentPtr,parents,parentMoves
+
+
+def _getGraphTables():
+    if(_Successors is None):
+        _buildGameGraph()
+
+
+# Returns the (read-only) successor table (see Game Graph Concept above)
+def getSuccessorTable():
+    _getGraphTables()
+    return _Successors
+
+# Returns (ptr, parents, parentMoves), the parent lists in the CSR format (see Game Graph Concept above)
+def getParentTable():
+    _getGraphTables()
+    return _ParentPtr, _Parents, _ParentMoves
+
+# Returns (parents, moves), the ranks of the positions that lead to the position
+#   ... with rank 'r', and the move played in each of them to get there
+def getParents(r):
+    ptr,parents,moves = getParentTable()
+    return parents[ptr[r]:ptr[r+1]], moves[ptr[r]:ptr[r+1]]
+
+# Returns the depth (the number of marks) of each position, indexed by rank
+def getDepths():
+    _getGraphTables()
+    return _Depths
+
+# Returns a list of 10 arrays, where the d'th array has the ranks of all positions at depth 'd'
+def getLayers():
+    _getGraphTables()
+    return _Layers
+
+
+
+
+#        Algorithms over the whole game tree
+###############################################################################
+# Solve every legal position by going back from the last layer to the root.
+# Returns a read-only int8 array of shape (5478,) with the minimax() evaluation
+#   ... of each position (1/0/-1 if it is won for X, drawn, or won for Y with best play)
+def solveAllPositions():
+    global _Values
+    if(_Values is not None):
+        return _Values
+
+    succ = getSuccessorTable()
+    codes = getLegalCodes()
+    winners = getWinnerArray()[codes]
+    vals = np.zeros(NumLegalPositions, dtype=np.int8)
+    vals[winners == TicTacToeBoard.Xmark] = 1
+    vals[winners == TicTacToeBoard.Ymark] = -1
+
+    # Games that are over (won or full) keep the evaluations set above
+    for d,layer in reversed(list(enumerate(getLayers()))):
+        notOver = (succ[layer] >= 0).any(axis=1)
+        layer = layer[notOver]
+        children = succ[layer]
+        legal = (children >= 0)
+        if(d % 2 == 0):         # X to move picks the highest evaluation
+            vals[layer] = np.where(legal, vals[children], -2).max(axis=1)
+        else:
+            vals[layer] = np.where(legal, vals[children], 2).min(axis=1)
+
+    vals.flags.writeable = False
+    _Values = vals
+    return vals
+
+
+# Returns a uint16 array of shape (5478,) where bit 'mv' of arr[r] is set if the
+#   ... move 'mv' is one of the best moves in the position 'r' (0 if the game is over)
+def getBestMoveMasks():
+    succ = getSuccessorTable()
+    vals = solveAllPositions()
+    legal = (succ >= 0)
+    childVals = np.where(legal, vals[succ], 0)
+
+    xToMove = (getDepths() % 2 == 0)[:,None]
+    best = np.where(xToMove, np.where(legal, childVals, -2).max(axis=1, keepdims=True),
+                             np.where(legal, childVals, 2).min(axis=1, keepdims=True))
+    isBest = legal & (childVals == best)
+    return (isBest << np.arange(NumMoves)).sum(axis=1).astype(np.uint16)
+
+
+# Count the games (i.e. the sequences of moves until a win or a full board)
+#   ... that pass through each position, by going forward from the root.
+# Returns an int64 array of shape (5478,), which is 1 for the empty board.
+def countPathsToPositions():
+    succ = getSuccessorTable()
+    paths = np.zeros(NumLegalPositions, dtype=np.int64)
+    paths[legalRank(0)] = 1
+    for layer in getLayers():
+        children = succ[layer]
+        legal = (children >= 0)
+        np.add.at(paths, children[legal], np.broadcast_to(paths[layer][:,None], children.shape)[legal])
+    return paths
+
+
+# Statistics of the positions that can be reached from the empty board, per depth
+# Returns a dict of lists with one entry per depth (0..9):
+#       'positions' : number of positions
+#       'xWins'     : number of positions won by X    (likewise 'yWins' for Y)
+#       'draws'     : number of full boards without a winner
+#       'games'     : number of games that end at this depth
+#       'xWinGames' : number of those games won by X  (likewise 'yWinGames' for Y)
+def reachabilityStats():
+    codes = getLegalCodes()
+    winners = getWinnerArray()[codes]
+    terminal = getTerminalArray()[codes]
+    paths = countPathsToPositions()
+
+    ret = {key:[] for key in ('positions', 'xWins', 'yWins', 'draws', 'games', 'xWinGames', 'yWinGames')}
+    for layer in getLayers():
+        w,t,p = winners[layer],terminal[layer],paths[layer]
+        ret['positions'].append(len(layer))
+        ret['xWins'].append(int(np.count_nonzero(w == TicTacToeBoard.Xmark)))
+        ret['yWins'].append(int(np.count_nonzero(w == TicTacToeBoard.Ymark)))
+        ret['draws'].append(int(np.count_nonzero(t & (w == 0))))
+        ret['games'].append(int(p[t].sum()))
+        ret['xWinGames'].append(int(p[w == TicTacToeBoard.Xmark].sum()))
+        ret['yWinGames'].append(int(p[w == TicTacToeBoard.Ymark].sum()))
+    return ret
+
+
+# Play 'numGames' games of random moves at once, by walking the successor table
+# Returns an array of shape (numGames,) with the legal rank of the final position of each game
+def playRandomGames(numGames, rng=None):
+    if(rng is None):
+        rng = np.random.default_rng()
+    succ = getSuccessorTable()
+    pos = np.full(numGames, legalRank(0), dtype=np.int16)
+    active = np.arange(numGames)
+    while(len(active) > 0):
+        children = succ[pos[active]]
+        legal = (children >= 0)
+        counts = legal.sum(axis=1)
+        over = (counts == 0)
+        active,children,legal,counts = active[~over],children[~over],legal[~over],counts[~over]
+        # Pick the k-th legal move of each game, for a random 'k'
+        k = rng.integers(counts)
+        col = np.argmax(np.cumsum(legal, axis=1) > k[:,None], axis=1)
+        pos[active] = children[np.arange(len(active)), col]
+    return pos
+###############################################################################
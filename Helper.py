@@ -2,23 +2,23 @@
 import numpy as np
 import os
 
-from Board import TicTacToeBoard
+from Board import TicTacToeBoard, TicTacToeBitBoard
 ## Contains misc. functions that don't belong in other files
 
 
 # Construct a T-Board object from a given board vector
 # The move history is also valid for the returned T-Board
 def makeBoardFromPosition(vec):
-    tb = TicTacToeBoard()
-    xpos = np.nonzero(vec==tb.Xmark)[0]
-    ypos = np.nonzero(vec==tb.Ymark)[0]
+    xpos = np.nonzero(vec==TicTacToeBoard.Xmark)[0]
+    ypos = np.nonzero(vec==TicTacToeBoard.Ymark)[0]
     
     lx,ly = len(xpos),len(ypos)
     if(lx>9 or ly>9 or lx<ly or lx>(ly+1)):
         msg = "In makeBoardFromPosition({}), this board cannot ".format(vec) + \
                 " arise from any legal sequence of moves in TicTacToe"
         raise ValueError(msg)
-        
+    
+    tb = TicTacToeBoard()
     i = -1 # for boards with only 1 move played (which will be for X). See the if-condition below.
     for i in range(len(ypos)):
         tb.move(xpos[i])
@@ -52,6 +52,18 @@ def generateAllPossibleContinuations(tb : TicTacToeBoard):
         tb.undoLastMove()
         
 
+# Same as generateAllPossibleContinuations(), but doesn't play on after a player has won.
+# Hence, every generated position can arise in a legal game.
+def generateAllLegalContinuations(tb : TicTacToeBoard):
+    for mv in tb.possibleNextMoves():
+        tb.move(mv)
+        yield tb
+        if(tb.checkWin() == 0):
+            for nxt in generateAllLegalContinuations(tb):
+                yield nxt
+        tb.undoLastMove()
+        
+
 # Generate all possible T-Board positions (there are 3**9=19683 of them)
 def generateAllPossiblePositions():
     for N in range(3**9):
@@ -59,6 +71,11 @@ def generateAllPossiblePositions():
         for i in range(9):
             l.append(N%3)
             N //= 3
+        # Skip the boards with invalid numbers of X's and O's right away, since 
+        #   ... the error raised by makeBoardFromPosition() is costly to make
+        lx,ly = l.count(TicTacToeBoard.Xmark),l.count(TicTacToeBoard.Ymark)
+        if(lx<ly or lx>(ly+1)):
+            continue
         try:
             ret = makeBoardFromPosition(np.array(l, dtype=np.uint8))
             yield ret
@@ -66,6 +83,36 @@ def generateAllPossiblePositions():
             continue
         
         
+# Check whether the position of a T-Board can arise in a legal game, i.e. in a game
+#   ... where nobody plays on after a player has won. (5478 positions are legal)
+# The T-Board must be one made by makeBoardFromPosition(), so that the number of
+#   ... X's and O's on it is already valid.
+def isLegalPosition(tb : TicTacToeBoard):
+    bb = TicTacToeBitBoard(copyFrom=tb)
+    if(tb.nextTurn == tb.Xmark):
+        lastBits,otherBits = bb.ybits,bb.xbits
+    else:
+        lastBits,otherBits = bb.xbits,bb.ybits
+    
+    def hasLine(bits):
+        return any((bits & m) == m for m in bb.WinMasks)
+    
+    # Only the player who moved last can have a 3-in-a-row ...
+    if(hasLine(otherBits)):
+        return False
+    if(not hasLine(lastBits)):
+        return True
+    # ... and then the last move must have made all of that player's 3-in-a-rows
+    return any(not hasLine(lastBits & ~bit) for bit in bb.CellBits if(lastBits & bit))
+
+
+# Generate all T-Board positions that can arise in a legal game (there are 5478 of them)
+def generateAllLegalPositions():
+    for tb in generateAllPossiblePositions():
+        if(isLegalPosition(tb)):
+            yield tb
+        
+        
 #   Helper fns related to project folder paths
 ########################################################
     
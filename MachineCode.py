@@ -2,6 +2,16 @@
 import ctypes
 import platform
 import os
+import sys
+import re
+import hashlib
+import shutil
+import subprocess
+import sysconfig
+import tempfile
+import threading
+
+import numpy as np
 
 from Helper import extendRootPath
 
@@ -30,9 +40,36 @@ class MachineCodeRuntimeError(RuntimeError):
 #########################################################
 _platform = None
 
+# Set this to the path of a compatible library file to skip the build step
 _minimax_DLL_FileName = None
 
 _minimax_DLL = None
+
+# The error raised by the first failed attempt to load the library, unless it
+#   ... came from an OSError (e.g. a file that was being replaced), which may
+#   ... pass on a later attempt.
+# Re-raised by later attempts instead of compiling/loading all over again.
+_minimax_DLL_Error = None
+
+# Held while the library is built and loaded, so that threads doing their first
+#   ... native search at the same time build it only once
+_minimax_DLL_Lock = threading.Lock()
+
+_minimax_SourceVersion = None
+#########################################################
+
+
+#       Symbols that the library must export to be usable
+#########################################################
+_requiredSymbols = (
+                    'minimax_LibVersion',
+                    'checkWin',
+                    'run_Minimax',
+                    'run_Minimax_Pruning',
+                    'run_Negamax',
+                    'run_MinimaxEvals',
+                    'run_MinimaxBatch'
+                   )
 #########################################################
 
     
@@ -47,88 +84,342 @@ def _getPlatform():
         
     return _platform
 
+
+def _getMinimax_SourceFileName():
+    return extendRootPath("cforspeed", "minimax.c")
+
+# The library file compiled from minimax.c for this python version and ABI.
+# The name includes a hash of the source, so editing minimax.c triggers a rebuild.
+def _getMinimax_BuildFileName():
+    abiTag = sysconfig.get_config_var('SOABI')
+    if(abiTag is None):
+        abiTag = "py{}{}-{}".format(sys.version_info[0], sys.version_info[1], 
+                                    platform.machine().lower())
+    ext = ('.dll' if(_getPlatform().lower()=='windows') else '.so')
+    
+    try:
+        with open(_getMinimax_SourceFileName(), "rb") as cfile:
+            srcHash = hashlib.sha1(cfile.read()).hexdigest()[:12]
+    except OSError as e:
+        msg = "The source file 'minimax.c' was not found in {}.".format(
+                    os.path.dirname(_getMinimax_SourceFileName()))
+        raise MachineCodeMissingError(msg) from e
+    
+    fname = "minimax-{}-{}{}".format(abiTag, srcHash, ext)
+    return extendRootPath("cforspeed", "build", fname)
+
+# The version of the library that the python code expects, read from minimax.c
+def _getMinimax_SourceVersion():
+    global _minimax_SourceVersion
+    if(_minimax_SourceVersion is None):
+        try:
+            with open(_getMinimax_SourceFileName(), "r") as cfile:
+                found = re.search(r"#define\s+MINIMAX_LIB_VERSION\s+(\d+)", cfile.read())
+        except OSError:
+            found = None
+        if(found is None):
+            msg = "Could not find MINIMAX_LIB_VERSION in {}".format(_getMinimax_SourceFileName())
+            raise MachineCodeLoadingError(msg)
+        _minimax_SourceVersion = int(found.group(1))
+    return _minimax_SourceVersion
+
 def _getMinimax_DLL_FileName():
     global _minimax_DLL_FileName
     if(_minimax_DLL_FileName is None):
-        pf = _getPlatform()
-        if(pf.lower() == 'windows'):
-            _minimax_DLL_FileName = extendRootPath("cforspeed", "minimax.dll")
-        elif(pf.lower() == 'linux'):
-            _minimax_DLL_FileName = extendRootPath("cforspeed", "minimax.so")
-        else:         # Leave it as None if _platform is not an expected one
-            _minimax_DLL_FileName = None 
+        _minimax_DLL_FileName = _getMinimax_BuildFileName()
     return _minimax_DLL_FileName
+
+
+# Find a C compiler on this system. Honours the CC environment variable.
+def _findCompiler():
+    candidates = [os.environ['CC']] if('CC' in os.environ) else []
+    candidates += ['cc', 'gcc', 'clang']
+    for cc in candidates:
+        path = shutil.which(cc)
+        if(path is not None):
+            return path
+    return None
+
+
+# Compile minimax.c into a shared library at the path _getMinimax_BuildFileName()
+# Does nothing if that library already exists, unless force=True.
+# Returns the path to the library.
+def buildMinimaxLibrary(force=False):
+    fname = _getMinimax_BuildFileName()
+    if(os.path.exists(fname) and not force):
+        return fname
+    
+    cc = _findCompiler()
+    if(cc is None):
+        msg = "No C compiler was found to build '{}'. ".format(os.path.basename(fname)) + \
+                "Install one (or set the CC environment variable) and try again."
+        raise MachineCodeMissingError(msg)
+    
+    os.makedirs(os.path.dirname(fname), exist_ok=True)
+    
+    # Compile to a temporary file of its own first, so that other processes 
+    #   ... (or threads) never load a partially written library
+    fd,tmpName = tempfile.mkstemp(dir=os.path.dirname(fname), 
+                                  prefix=os.path.basename(fname) + ".", suffix=".tmp")
+    os.close(fd)
+    cmd = [cc, '-O2', '-shared', '-o', tmpName, _getMinimax_SourceFileName()]
+    if(_getPlatform().lower() != 'windows'):
+        cmd.insert(2, '-fPIC')
+    
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        os.replace(tmpName, fname)
+    except (OSError, subprocess.CalledProcessError) as e:
+        msg = "Failed to compile 'minimax.c' with the command: {}".format(' '.join(cmd))
+        if(isinstance(e, subprocess.CalledProcessError)):
+            msg += "\n" + e.stderr
+        raise MachineCodeMissingError(msg) from e
+    finally:
+        if(os.path.exists(tmpName)):
+            os.remove(tmpName)
+    
+    return fname
+
+
+# Check that a loaded library exports all the required symbols and that it 
+#   ... was compiled from the current version of minimax.c
+def _checkMinimax_CDLL(mdl, fname):
+    missing = [sym for sym in _requiredSymbols if not hasattr(mdl, sym)]
+    if(len(missing) > 0):
+        msg = "The shared library file '{}' does not export {}.".format(fname, missing) + \
+                "\nRecompile it from 'minimax.c' using an appropriate C compiler."
+        raise MachineCodeLoadingError(msg)
+    
+    libVersion = mdl.minimax_LibVersion()
+    if(libVersion != _getMinimax_SourceVersion()):
+        msg = "The shared library file '{}' has version {}, ".format(fname, libVersion) + \
+                "but 'minimax.c' has version {}.".format(_getMinimax_SourceVersion()) + \
+                "\nRecompile it from 'minimax.c' using an appropriate C compiler."
+        raise MachineCodeLoadingError(msg)
+
+
+def _loadMinimax_CDLL(fname):
+    try:
+        mdl = ctypes.CDLL(fname)
+    except FileNotFoundError as e:
+        msg = "The required shared library file '{}' ".format(os.path.basename(fname)) + \
+                "was not found in {}.".format(os.path.dirname(fname)) + \
+                "\nCompile it from 'minimax.c' using an appropriate C compiler."
+        raise MachineCodeMissingError(msg) from e
+    except OSError as e:
+        msg = "The shared library file '{}' is not compatible.".format(fname) + \
+                "\nRecompile it from 'minimax.c' using an appropriate C compiler."
+        raise MachineCodeLoadingError(msg) from e
+    
+    _checkMinimax_CDLL(mdl, fname)
+    _declareMinimax_Signatures(mdl)
+    return mdl
+
+
+# Declare the C types of the arguments and return values of the functions in
+#   ... the library, so that ctypes converts (and checks) them correctly.
+def _declareMinimax_Signatures(mdl):
+    boardPtr = ctypes.POINTER(ctypes.c_ubyte)
+    countPtr = ctypes.POINTER(ctypes.c_uint64)
+    
+    mdl.minimax_LibVersion.argtypes = []
+    mdl.minimax_LibVersion.restype = ctypes.c_int
+    
+    mdl.checkWin.argtypes = [ctypes.POINTER(ctypes.c_int)]
+    mdl.checkWin.restype = ctypes.c_int
+    
+    for fn in (mdl.run_Minimax, mdl.run_Minimax_Pruning, mdl.run_Negamax):
+        fn.argtypes = [boardPtr, ctypes.c_int, ctypes.c_int, ctypes.c_int, countPtr]
+        fn.restype = ctypes.c_int
     
+    mdl.run_MinimaxEvals.argtypes = [boardPtr, ctypes.c_int, ctypes.c_int, ctypes.c_int, 
+                                     ctypes.c_int, ctypes.POINTER(ctypes.c_byte), countPtr]
+    mdl.run_MinimaxEvals.restype = None
+    
+    mdl.run_MinimaxBatch.argtypes = [
+                                     np.ctypeslib.ndpointer(np.uint8, ndim=2, flags='C_CONTIGUOUS'),
+                                     np.ctypeslib.ndpointer(np.intc, ndim=1, flags='C_CONTIGUOUS'),
+                                     ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                     np.ctypeslib.ndpointer(np.int8, ndim=1, flags='C_CONTIGUOUS'),
+                                     np.ctypeslib.ndpointer(np.uint64, ndim=1, flags='C_CONTIGUOUS')
+                                    ]
+    mdl.run_MinimaxBatch.restype = None
+
+
+# Load the library, building it from minimax.c on first use if needed.
+# If no compiler is available, raises a MachineCodeMissingError (and the callers
+#   ... fall back to the python code). To use a library built elsewhere, set 
+#   ... _minimax_DLL_FileName to its path.
+# Threads that call this at the same time wait for a single build and load.
 def _get_Minimax_CDLL():
-    global _minimax_DLL
-    if(_minimax_DLL is None):
-        fname = _getMinimax_DLL_FileName()
-        if(fname is None):
-            msg = "Could not recognize the library file for the current"  + \
-                   "platform: \'{}'.\nYou can specify the path to ".format(_getPlatform()) + \
-                    "a compatible library file by setting the variable " + \
-                    "'_minimax_DLL_FileName' in MachineCode.py"
-            raise MachineCodeMissingError(msg)
+    global _minimax_DLL, _minimax_DLL_FileName, _minimax_DLL_Error
+    if(_minimax_DLL is not None):
+        return _minimax_DLL
+    
+    with _minimax_DLL_Lock:
+        if(_minimax_DLL is not None):
+            return _minimax_DLL
+        if(_minimax_DLL_Error is not None):
+            raise _minimax_DLL_Error
         
         try:
-            mdl = ctypes.CDLL(fname)
-        except FileNotFoundError:
-            msg = "The required shared library file '{}' ".format(os.path.basename(fname)) + \
-                    "was not found in {}.".format(os.path.dirname(fname)) + \
-                    "\nCompile it from 'minimax.c' using an appropriate C compiler."
-            raise MachineCodeMissingError(msg)
-        except OSError as e:
-            msg = "The shared library file '{}' is not compatible.".format(fname) + \
-                    "\nRecompile it from 'minimax.c' using an appropriate C compiler."
-            raise MachineCodeLoadingError(msg) from e
+            if(_minimax_DLL_FileName is None):
+                _minimax_DLL_FileName = buildMinimaxLibrary()
             
-    return mdl
+            _minimax_DLL = _loadMinimax_CDLL(_minimax_DLL_FileName)
+        except (MachineCodeMissingError, MachineCodeLoadingError) as e:
+            if(not isinstance(e.__cause__, OSError)):
+                _minimax_DLL_Error = e
+            raise
+            
+    return _minimax_DLL
+
+
+# Report which minimax backend is active: machine code ('native') or 'python'
+# Returns a dict with the keys:
+#       'backend' : 'native' if the library can be used, otherwise 'python'
+#       'library' : path to the loaded library (None for 'python')
+#       'version' : version of the loaded library (None for 'python')
+#       'error'   : why the library could not be used (None for 'native')
+def getBackendInfo():
+    try:
+        mdl = _get_Minimax_CDLL()
+    except (MachineCodeMissingError, MachineCodeLoadingError) as e:
+        return {'backend': 'python', 'library': None, 'version': None, 'error': str(e)}
+    return {
+            'backend' : 'native',
+            'library' : _minimax_DLL_FileName,
+            'version' : mdl.minimax_LibVersion(),
+            'error'   : None
+           }
 
 
 
 
 #               Functions that call machine code
 ###############################################################################
+# In all of these, 'pruning' chooses the search:
+#       False     : minimax without pruning
+#       True      : minimax with pruning (MiniMax.minimax_AlphaBetaPruning())
+#       'negamax' : negamax with alpha-beta bounds and move ordering (MiniMax.minimax_Negamax())
+# The evaluations are the same for all of them; only the number of nodes searched differs.
+
+# The search mode passed to the machine code for each value of 'pruning'
+def _searchMode(pruning):
+    if(pruning == 'negamax'):
+        return 2
+    return (1 if(pruning is True) else 0)
+
 # Run the minimax algorithm, compiled to native machine code.
-# Approx. 1000X faster than the python version of minimax.
+# Approx. 40X faster than the python version with pruning from the same position (see the 
+#   ... 'minimax.*' benchmarks of 'python -m bench').
+# Returns (Z, cnt) where Z is the evaluation of the position (same as MiniMax.minimax())
+#   ... and cnt is the number of nodes searched
 def run_minimax(tb, pruning=True):
     mdl = _get_Minimax_CDLL()
     
-    count = bytes([0,0])
-    brd = bytes(tb.board)
+    count = ctypes.c_uint64(0)
+    brd = (ctypes.c_ubyte * 9)(*tb.board)
     
-    if(pruning is True):
-        try:
-            Z = mdl.run_Minimax_Pruning(brd, tb.nextTurn, tb.Xmark, tb.Ymark, count)
-        except (OSError, RuntimeError) as e:
-            fname = _getMinimax_DLL_FileName()
-            msg = "Error while running machine code from '{}' ".format(os.path.basename(fname)) + \
-                  "in {}.\n Check the source code, compiler options ".format(os.path.dirname(fname)) + \
-                  "and the bit-version of python.exe, then recompile it from minimax.c"
-            raise MachineCodeRuntimeError(msg) from e
-    else:
-        try:
-            Z = mdl.run_Minimax(brd, tb.nextTurn, tb.Xmark, tb.Ymark, count)
-        except (OSError, RuntimeError) as e:
-            fname = _getMinimax_DLL_FileName()
-            msg = "Error while running machine code from '{}' ".format(os.path.basename(fname)) + \
-                  "in {}.\n Check the source code, compiler options ".format(os.path.dirname(fname)) + \
-                  "and the bit-version of python.exe, then recompile it from minimax.c"
-            raise MachineCodeRuntimeError(msg) from e
-    cnt = count[1]*256+count[0]
+    fn = [mdl.run_Minimax, mdl.run_Minimax_Pruning, mdl.run_Negamax][_searchMode(pruning)]
+    try:
+        Z = fn(brd, tb.nextTurn, tb.Xmark, tb.Ymark, count)
+    except (OSError, RuntimeError, ctypes.ArgumentError) as e:
+        raise _runtimeError() from e
+    
+    return Z, count.value
+
+
+# Buffers passed to the machine code by run_minimaxEvals()
+# Create one and pass it in each call to avoid allocating them again and again.
+# A buffer must not be shared between threads.
+class NativeSearchBuffer:
+    def __init__(self):
+        self.board = (ctypes.c_ubyte * 9)()
+        self.scores = (ctypes.c_byte * 9)()
+        self.count = ctypes.c_uint64(0)
+
+# One NativeSearchBuffer per thread, used when the caller doesn't give one
+_threadBuffers = threading.local()
+
+def _getThreadBuffer():
+    buf = getattr(_threadBuffers, 'buf', None)
+    if(buf is None):
+        buf = _threadBuffers.buf = NativeSearchBuffer()
+    return buf
+
+
+# Evaluate every next move of the board with a single call to machine code
+# Returns (scores, cnt) where cnt is the total number of nodes searched and 
+#   ... 'scores' is an int8 array like the one of MiniMax.minimaxEvalsForNextMoves()
+def run_minimaxEvals(tb, pruning=True, buf=None):
+    mdl = _get_Minimax_CDLL()
+    if(buf is None):
+        buf = _getThreadBuffer()
+    
+    buf.board[:] = tb.board
+    try:
+        mdl.run_MinimaxEvals(buf.board, tb.nextTurn, tb.Xmark, tb.Ymark, 
+                             _searchMode(pruning), buf.scores, buf.count)
+    except (OSError, RuntimeError, ctypes.ArgumentError, TypeError) as e:
+        raise _runtimeError() from e
     
-    return Z,cnt
+    return np.frombuffer(buf.scores, dtype=np.int8).copy(), buf.count.value
+
+
+# Evaluate many positions with a single call to machine code
+#   boards    : array of shape (N,9), each row is a board vector
+#   nextTurns : array of shape (N,) with whose turn it is on each board, or a single mark for all
+# 'boards' is not copied if it is already a C-contiguous array of np.uint8
+# Returns (evals, counts), arrays of shape (N,) with the evaluation of each 
+#   ... position (same as run_minimax()) and the number of nodes searched for it
+def run_minimaxBatch(boards, nextTurns, Xmark, Ymark, pruning=True):
+    mdl = _get_Minimax_CDLL()
+    
+    boards = np.ascontiguousarray(boards, dtype=np.uint8)
+    if(boards.ndim != 2 or boards.shape[1] != 9):
+        msg = "In call to run_minimaxBatch(), boards must have the shape (N,9). " + \
+                "Received the shape {}".format(boards.shape)
+        raise ValueError(msg)
+    N = boards.shape[0]
+    
+    nextTurns = np.ascontiguousarray(np.broadcast_to(nextTurns, (N,)), dtype=np.intc)
+    evals = np.zeros(N, dtype=np.int8)
+    counts = np.zeros(N, dtype=np.uint64)
+    
+    try:
+        mdl.run_MinimaxBatch(boards, nextTurns, N, Xmark, Ymark, 
+                             _searchMode(pruning), evals, counts)
+    except (OSError, RuntimeError, ctypes.ArgumentError) as e:
+        raise _runtimeError() from e
+    
+    return evals, counts
 
 
 # Run the checkWin algorithm, written in C code and compiled
+# Returns 1 if either player has a 3-in-a-row, otherwise returns 0
 def checkWin(tb):
     mdl = _get_Minimax_CDLL()
     try:
-        return mdl.checkWin(bytes(tb.board))
-    except (OSError, RuntimeError) as e:
-        fname = _getMinimax_DLL_FileName()
-        msg = "Error while running machine code from '{}' ".format(os.path.basename(fname)) + \
-              "in {}.\n Check the source code, compiler options ".format(os.path.dirname(fname)) + \
-              "and the bit-version of python.exe, then recompile it from minimax.c"
-        raise MachineCodeRuntimeError(msg) from e
-###############################################################################
\ No newline at end of file
+        return mdl.checkWin((ctypes.c_int * 9)(*tb.board))
+    except (OSError, RuntimeError, ctypes.ArgumentError) as e:
+        raise _runtimeError() from e
+
+
+# Make the exception raised when running machine code fails
+def _runtimeError():
+    fname = _getMinimax_DLL_FileName()
+    msg = "Error while running machine code from '{}' ".format(os.path.basename(fname)) + \
+          "in {}.\n Check the source code, compiler options ".format(os.path.dirname(fname)) + \
+          "and the bit-version of python.exe, then recompile it from minimax.c"
+    return MachineCodeRuntimeError(msg)
+###############################################################################
+
+
+
+# Build the library ahead of time (for eg. while installing the project) with:
+#       python MachineCode.py --build
+if __name__ == '__main__':
+    if('--build' in sys.argv[1:]):
+        print("Built:", buildMinimaxLibrary(force=('--force' in sys.argv[1:])))
+    print(getBackendInfo())
@@ -1,8 +1,13 @@
 
+import threading
+import time
 import numpy as np
+from collections import OrderedDict
 
 from Board import TicTacToeBoard
-from MachineCode import run_minimax, MachineCodeLoadingError, MachineCodeMissingError, MachineCodeRuntimeError
+from Encode import encode
+from Helper import makeBoardFromIllegalPosition
+from MachineCode import run_minimaxEvals, run_minimaxBatch, MachineCodeLoadingError, MachineCodeMissingError, MachineCodeRuntimeError
 
 
 # Returns the evaluation of the current position 
@@ -11,34 +16,49 @@ from MachineCode import run_minimax, MachineCodeLoadingError, MachineCodeMissing
 #       Return -1, if the position is winning for Y (i.e. who played the second move)
 #       Return  0, if it's a draw
 def minimax(tb : TicTacToeBoard):
+    return minimax_Counted(tb)[0]
+        
+
+# Same as minimax(), but also counts the nodes visited
+# Returns (Z, cnt), like minimax_AlphaBetaPruning()
+#
+# Nodes are counted like the machine code does (see cforspeed/minimax.c):
+#   Every position that the search recurses into counts as a node. A move that 
+#   ... completes a 3-in-a-row is a win for the player who plays it, so it is 
+#   ... not searched (nor counted), and none of the other moves are searched either.
+#   Hence minimax_Counted(tb, cnt=1), which also counts 'tb' itself, gives the same
+#   ... count as MachineCode.run_minimax(tb, pruning=False).
+def minimax_Counted(tb : TicTacToeBoard, cnt=0):
     cW = tb.checkWin()
     if(cW == tb.Xmark):
-        return 1
+        return 1,cnt
     elif(cW == tb.Ymark):
-        return -1
+        return -1,cnt
+    
+    # The evaluation if the player to move wins
+    winScore = (1 if(tb.nextTurn == tb.Xmark) else -1)
     nextMoves = tb.possibleNextMoves()
-    vals = list()
+    foundDraw = False
     for mv in nextMoves:
         tb.move(mv)
-        
-        Z = minimax(tb)
-        
+        if(tb.checkWin() != 0):
+            tb.undoLastMove()
+            return winScore,cnt
+        Z,cnt = minimax_Counted(tb, cnt+1)
         tb.undoLastMove()
-        vals.append(Z)
-    
-    if(tb.nextTurn == tb.Xmark and (1 in vals)):
-        return 1
-    if(tb.nextTurn == tb.Ymark and (-1 in vals)):
-        return -1
-    if(len(nextMoves)==0 or (0 in vals)):
-        return 0
-    if(tb.nextTurn == tb.Xmark):
-        return -1
-    if(tb.nextTurn == tb.Ymark):
-        return 1
         
+        if(Z == winScore):
+            return winScore,cnt
+        if(Z == 0):
+            foundDraw = True
+    
+    if(len(nextMoves)==0 or foundDraw):
+        return 0,cnt
+    return -winScore,cnt
+
 
 # Same output as the minimax() function but faster because it prunes the recursion tree
+# Returns (Z, cnt) where nodes are counted like minimax_Counted() does
 def minimax_AlphaBetaPruning(tb : TicTacToeBoard, XfoundADraw=False, YfoundADraw=False, cnt=0):
     cW = tb.checkWin()
     if(cW == tb.Xmark):
@@ -52,6 +72,9 @@ def minimax_AlphaBetaPruning(tb : TicTacToeBoard, XfoundADraw=False, YfoundADraw
     
     for mv in nextMoves:
         tb.move(mv)
+        if(tb.checkWin() != 0):     # A win for the player to move, as in minimax_Counted()
+            tb.undoLastMove()
+            return (1 if(tb.nextTurn == tb.Xmark) else -1),cnt
         Z,cnt = minimax_AlphaBetaPruning(tb, XfoundADraw = XfoundADraw, 
                                           YfoundADraw = YfoundADraw, cnt=cnt+1)
         tb.undoLastMove()
@@ -81,39 +104,450 @@ def minimax_AlphaBetaPruning(tb : TicTacToeBoard, XfoundADraw=False, YfoundADraw
         return -1,cnt
     else:
         return 1,cnt
+
+
+
+# The cells of each of TicTacToeBoard.WinPatterns
+_WinLines = [tuple(np.arange(9)[p].tolist()) for p in TicTacToeBoard.WinPatterns]
+
+# The order in which minimax_Negamax() tries the moves: centre, corners, then edges
+_NegamaxMoveOrder = (4, 0,2,6,8, 1,3,5,7)
+
+# The empty cells where 'mark' would complete a 3-in-a-row on the board list 'brd'
+def _threatCells(brd, mark):
+    ret = []
+    for line in _WinLines:
+        cells = [brd[i] for i in line]
+        if(cells.count(mark) == 2 and 0 in cells):
+            empty = line[cells.index(0)]
+            if(empty not in ret):
+                ret.append(empty)
+    return ret
+
+
+# Same output as the minimax() function, but searches with negamax: alpha-beta
+#   ... with proper bounds, where every evaluation is from the point of view of
+#   ... the player to move, and with the moves ordered to prune more:
+#       If the player to move can complete a 3-in-a-row, that's a win right away.
+#       If the other player threatens to complete two, they can't both be blocked.
+#       If the other player threatens to complete one, only the block is searched.
+#       Otherwise the moves are tried in the order of _NegamaxMoveOrder.
+# Returns (Z, cnt) like minimax_AlphaBetaPruning()
+# The machine code runs the same search (see MachineCode.py with pruning='negamax').
+def minimax_Negamax(tb : TicTacToeBoard, cnt=0):
+    cW = tb.checkWin()
+    if(cW == tb.Xmark):
+        return 1,cnt
+    elif(cW == tb.Ymark):
+        return -1,cnt
+    
+    Z,cnt = _negamax(tb, -1, 1, cnt)
+    return (Z if(tb.nextTurn == tb.Xmark) else -Z), cnt
+
+# The recursion of minimax_Negamax(), for a position that isn't won
+def _negamax(tb : TicTacToeBoard, alpha, beta, cnt):
+    brd = tb.board.tolist()
+    me = tb.nextTurn
+    other = (tb.Ymark if(me == tb.Xmark) else tb.Xmark)
+    
+    if(len(_threatCells(brd, me)) > 0):
+        return 1,cnt
+    
+    blocks = _threatCells(brd, other)
+    if(len(blocks) >= 2):
+        return -1,cnt
+    elif(len(blocks) == 1):
+        nextMoves = blocks
+    else:
+        nextMoves = [mv for mv in _NegamaxMoveOrder if(brd[mv] == 0)]
+    
+    if(len(nextMoves) == 0):
+        return 0,cnt
+    
+    best = -1
+    for mv in nextMoves:
+        tb.move(mv)
+        Z,cnt = _negamax(tb, -beta, -alpha, cnt+1)
+        tb.undoLastMove()
         
+        best = max(best, -Z)
+        alpha = max(alpha, best)
+        if(alpha >= beta):
+            break
+    return best,cnt
+        
+#        Transposition Table (a cache of minimax evaluations)
+###############################################################################
+# Keys are the encodings of positions with symmetry, i.e. encode(tb)[0], so that
+#   ... all symmetric positions (and all move orders leading to them) share an entry.
+# The key doesn't include whose turn it is, since that is fixed by the position
+#   ... for every legal position.
+# Holds at most 'maxSize' entries; the least recently used entry is evicted first.
+# Can be shared between calls, engines and threads to re-use the evaluations
+#   ... (every access holds the table's lock).
+class TranspositionTable:
+    def __init__(self, maxSize=2**16):
+        if(maxSize < 1):
+            msg = "In call to TranspositionTable(), maxSize must be at least 1. " + \
+                    "Received '{}'".format(maxSize)
+            raise ValueError(msg)
+        self.maxSize = maxSize
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+    # Returns the stored evaluation for 'key', or None if it isn't stored
+    def lookup(self, key):
+        with self._lock:
+            Z = self.table.get(key)
+            if(Z is None):
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.table.move_to_end(key)
+            return Z
+    
+    def store(self, key, Z):
+        with self._lock:
+            self.table[key] = Z
+            self.table.move_to_end(key)
+            if(len(self.table) > self.maxSize):
+                self.table.popitem(last=False)
+            
+    def clear(self):
+        with self._lock:
+            self.table.clear()
+            self.hits = 0
+            self.misses = 0
+        
+    def stats(self):
+        with self._lock:
+            return {'size': len(self.table), 'maxSize': self.maxSize, 
+                    'hits': self.hits, 'misses': self.misses}
+    
+    def __len__(self):
+        return len(self.table)
+    
+    # The lock can't be pickled (e.g. for a ProcessPoolExecutor), so it's made anew
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+
+#       Module-Scope Variables (a.k.a globals)
+#########################################################
+_defaultTranspositionTable = None
+_defaultTranspositionTableLock = threading.Lock()
+#########################################################
+
+# Getter method for the module-scoped '_defaultTranspositionTable'
+# This table is used by minimax_Memoized() when no table is given.
+def getDefaultTranspositionTable():
+    global _defaultTranspositionTable
+    with _defaultTranspositionTableLock:
+        if(_defaultTranspositionTable is None):
+            _defaultTranspositionTable = TranspositionTable()
+    return _defaultTranspositionTable
+###############################################################################
+
+
+# Same output as the minimax() function, but every evaluated position is stored
+#   ... in a transposition table and never searched again.
+# Returns (Z, cnt) where cnt is the number of nodes visited, like minimax_AlphaBetaPruning()
+def minimax_Memoized(tb : TicTacToeBoard, table=None, cnt=0):
+    if(table is None):
+        table = getDefaultTranspositionTable()
+    
+    key = encode(tb, useSymmetry=True)[0]
+    Z = table.lookup(key)
+    if(Z is not None):
+        return Z,cnt
+    
+    cW = tb.checkWin()
+    if(cW == tb.Xmark):
+        Z = 1
+    elif(cW == tb.Ymark):
+        Z = -1
+    else:
+        bestScore = (1 if(tb.nextTurn == tb.Xmark) else -1)
+        vals = list()
+        for mv in tb.possibleNextMoves():
+            tb.move(mv)
+            Zmv,cnt = minimax_Memoized(tb, table=table, cnt=cnt+1)
+            tb.undoLastMove()
+            vals.append(Zmv)
+            if(Zmv == bestScore):
+                break
+        
+        if(len(vals) == 0):
+            Z = 0
+        elif(tb.nextTurn == tb.Xmark):
+            Z = max(vals)
+        else:
+            Z = min(vals)
+    
+    table.store(key, Z)
+    return Z,cnt
+
+
 # Return the minimax() evaluations for all moves of the given board
 # If pruning = True, uses alphabeta pruning for speedup
+# If pruning = 'negamax', uses minimax_Negamax() for more speedup
+# If memoize = True, uses minimax_Memoized() with the transposition table 'table'
+#       (or the default table if it is None); 'pruning' and 'tryNative' are then ignored
 # If tryNative = True, uses machine code library if available
 #       If forceNative = False, switches to python code if machine code isn't working
 #       If forceNative = True, errors out if machine code isn't working
 # Returns an array 'arr' such that for all positions 'i' in [0-8],
 #       arr[i] is the evaluation of the board after playing the next move at 'i'
 #       arr[i] is 8 if the next move can't be played at 'i'
-def minimaxEvalsForNextMoves(tb, pruning=True, tryNative=True, forceNative=False):
-    ret = np.zeros(shape=9, dtype=np.int8) + 8
-    for i in range(9):
-        if(i in tb.possibleNextMoves()):
+# If 'info' is a dict, details of the search are written to it (see Telemetry.py):
+#       'nodes', 'backend' and, if the machine code failed, 'fallback'
+#       ... and for memoized searches, 'cacheHits' and 'cacheMisses'
+def minimaxEvalsForNextMoves(tb, pruning=True, tryNative=True, forceNative=False, 
+                             memoize=False, table=None, info=None):
+    if(memoize is True):
+        if(table is None):
+            table = getDefaultTranspositionTable()
+        if(info is not None):
+            hits,misses = table.hits,table.misses
+        ret = np.zeros(shape=9, dtype=np.int8) + 8
+        cnt = 0
+        for i in tb.possibleNextMoves():
             tb.move(i)
-            
-            if(tryNative is True):   # Go for machine code implementation of minimax
-                try:
-                    ret[i] = run_minimax(tb, pruning=pruning)[0]
-                except (MachineCodeMissingError, MachineCodeLoadingError, MachineCodeRuntimeError) as e:
-                    if(forceNative):
-                        raise e
-                    else:
-                        tryNative = False
-            else:                    # Stick to python implementation of minimax
-                if(pruning):
-                    ret[i] = minimax_AlphaBetaPruning(tb)[0]
-                else:
-                    ret[i] = minimax(tb)
-                    
+            ret[i],cnt = minimax_Memoized(tb, table=table, cnt=cnt+1)
             tb.undoLastMove()
+        if(info is not None):
+            info['nodes'] = cnt
+            info['backend'] = 'memo'
+            info['cacheHits'] = table.hits - hits
+            info['cacheMisses'] = table.misses - misses
+        return ret
+    
+    if(tryNative is True):   # Go for machine code implementation of minimax
+        try:
+            ret,cnt = run_minimaxEvals(tb, pruning=pruning)
+            if(info is not None):
+                info['nodes'] = cnt
+                info['backend'] = 'native'
+            return ret
+        except (MachineCodeMissingError, MachineCodeLoadingError, MachineCodeRuntimeError) as e:
+            if(forceNative):
+                raise e
+            if(info is not None):
+                info['fallback'] = "{}: {}".format(type(e).__name__, e)
+    
+    # Stick to python implementation of minimax
+    # Each next move counts as one node, like in the machine code
+    ret = np.zeros(shape=9, dtype=np.int8) + 8
+    cnt = 0
+    for i in tb.possibleNextMoves():
+        tb.move(i)
+        if(pruning == 'negamax'):
+            ret[i],cnt = minimax_Negamax(tb, cnt+1)
+        elif(pruning):
+            ret[i],cnt = minimax_AlphaBetaPruning(tb, cnt=cnt+1)
+        else:
+            ret[i],cnt = minimax_Counted(tb, cnt+1)
+        tb.undoLastMove()
+    if(info is not None):
+        info['nodes'] = cnt
+        info['backend'] = 'python'
+    return ret
+    
+
 
+# Return the minimax() evaluations of many positions at once
+# The vectorized counterpart of minimaxEvalsForNextMoves(), with the same options
+#   boards    : array of shape (N,9), each row is a board vector
+#   nextTurns : array of shape (N,) with whose turn it is on each board, or a single mark for all
+# Returns an int8 array 'arr' of shape (N,), where arr[k] is the evaluation of boards[k]
+def minimaxEvalsBatch(boards, nextTurns, pruning=True, tryNative=True, forceNative=False):
+    if(tryNative is True):   # Go for machine code implementation of minimax
+        try:
+            return run_minimaxBatch(boards, nextTurns, TicTacToeBoard.Xmark, 
+                                    TicTacToeBoard.Ymark, pruning=pruning)[0]
+        except (MachineCodeMissingError, MachineCodeLoadingError, MachineCodeRuntimeError) as e:
+            if(forceNative):
+                raise e
+    
+    # Stick to python implementation of minimax
+    boards = np.asarray(boards, dtype=np.uint8)
+    nextTurns = np.broadcast_to(nextTurns, (boards.shape[0],))
+    ret = np.zeros(shape=boards.shape[0], dtype=np.int8)
+    for k in range(boards.shape[0]):
+        tb = makeBoardFromIllegalPosition(boards[k].copy())
+        tb.nextTurn = int(nextTurns[k])
+        if(pruning == 'negamax'):
+            ret[k] = minimax_Negamax(tb)[0]
+        elif(pruning):
+            ret[k] = minimax_AlphaBetaPruning(tb)[0]
+        else:
+            ret[k] = minimax(tb)
+    
     return ret
+
+
+
+
+#        Budgeted Search (iterative deepening)
+###############################################################################
+# A search with a budget stops early when it has visited 'maxNodes' nodes or when
+#   ... 'timeLimit' seconds have passed, whichever comes first (None for no limit).
+# Iterative deepening searches to a depth of 1 move, then 2 moves, and so on, so that
+#   ... the result of the deepest search that finished is always at hand.
+# Positions at the depth limit that aren't over get a heuristic evaluation, which
+#   ... is always strictly between -1 and 1, so a win found by the search
+#   ... always counts for more than any heuristic evaluation.
+
+# Raised inside the search when the budget is used up
+class SearchBudgetExceeded(Exception):
+    pass
+
+class SearchBudget:
+    # The clock is only read every 'checkEvery' nodes, since that is slower than counting
+    def __init__(self, maxNodes=None, timeLimit=None, checkEvery=256):
+        self.maxNodes = maxNodes
+        self.deadline = (time.perf_counter() + timeLimit if(timeLimit is not None) else None)
+        self.checkEvery = checkEvery
+        self.nodes = 0
+        
+    # Count one more node; raises SearchBudgetExceeded (without counting it) if
+    #   ... that would be over the budget
+    def spend(self):
+        if(self.maxNodes is not None and self.nodes >= self.maxNodes):
+            raise SearchBudgetExceeded()
+        self.nodes += 1
+        if(self.deadline is not None and self.nodes % self.checkEvery == 0 and
+           time.perf_counter() > self.deadline):
+            raise SearchBudgetExceeded()
+
+
+# Heuristic evaluation of a position that isn't over, from X's point of view like minimax()
+# Every line without any O counts for X: 1 for each X in it, or 3 if it has two of them.
+#   ... Lines without any X count the same for O. The difference is scaled into (-1,1).
+def heuristicEval(tb : TicTacToeBoard):
+    brd = tb.board.tolist()
+    score = 0
+    for line in _WinLines:
+        cells = [brd[i] for i in line]
+        nX = cells.count(tb.Xmark)
+        nY = cells.count(tb.Ymark)
+        if(nY == 0):
+            score += (3 if(nX == 2) else nX)
+        if(nX == 0):
+            score -= (3 if(nY == 2) else nY)
+    return score / 25
+
+
+# minimax() with alpha-beta pruning, but only 'depth' moves deep; the positions at 
+#   ... the depth limit get heuristicEval() instead.
+# 'state' is a list [budget, cutoff]: 'budget' (a SearchBudget) counts every node,
+#   ... and 'cutoff' is set to True if any position was cut off by the depth limit
+#   ... (if not, the evaluation is exact).
+def minimax_DepthLimited(tb : TicTacToeBoard, depth, state, alpha=-2, beta=2):
+    cW = tb.checkWin()
+    if(cW == tb.Xmark):
+        return 1
+    elif(cW == tb.Ymark):
+        return -1
+    
+    nextMoves = tb.possibleNextMoves()
+    if(len(nextMoves) == 0):
+        return 0
+    if(depth == 0):
+        state[1] = True
+        return heuristicEval(tb)
     
+    maximize = (tb.nextTurn == tb.Xmark)
+    best = (-2 if maximize else 2)
+    for mv in nextMoves:
+        state[0].spend()
+        tb.move(mv)
+        try:
+            Z = minimax_DepthLimited(tb, depth-1, state, alpha, beta)
+        finally:
+            tb.undoLastMove()
+        if(maximize):
+            best = max(best, Z)
+            alpha = max(alpha, Z)
+        else:
+            best = min(best, Z)
+            beta = min(beta, Z)
+        if(alpha >= beta):
+            break
+    return best
+
+
+# Return the evaluations for all moves of the given board, like minimaxEvalsForNextMoves(), 
+#   ... but searching with iterative deepening within a budget (see above).
+# 'maxDepth' also limits the depth (in moves, counting the next move)
+# The first depth (just the next move) is always searched in full, even over budget.
+# Returns (evals, depth, cnt, exact):
+#       evals : a float array such that evals[i] is the evaluation after playing at 'i'
+#               (exactly 1/0/-1 or a heuristic evaluation), or 8 if 'i' can't be played
+#       depth : the depth of the deepest search that finished
+#       cnt   : the number of nodes visited, in all the searches
+#       exact : True if the evaluations are exact, like minimaxEvalsForNextMoves()
+def minimaxEvalsIterativeDeepening(tb : TicTacToeBoard, maxNodes=None, timeLimit=None, maxDepth=None):
+    budget = SearchBudget(maxNodes, timeLimit)
+    nextMoves = [int(mv) for mv in tb.possibleNextMoves()]
+    ret = np.zeros(shape=9, dtype=np.float64) + 8
+    if(len(nextMoves) == 0):
+        return ret, 0, 0, True
+    maxDepth = (len(nextMoves) if(maxDepth is None) else min(maxDepth, len(nextMoves)))
+    
+    depth,exact = 0,False
+    while(depth < maxDepth and not exact):
+        state = [(budget if(depth > 0) else SearchBudget()), False]
+        evals = ret.copy()
+        try:
+            for mv in nextMoves:
+                state[0].spend()
+                tb.move(mv)
+                try:
+                    evals[mv] = minimax_DepthLimited(tb, depth, state)
+                finally:
+                    tb.undoLastMove()
+        except SearchBudgetExceeded:
+            break
+        if(depth == 0):
+            budget.nodes += state[0].nodes
+        ret = evals
+        depth += 1
+        exact = (state[1] is False)
+        
+        # Search the best moves first in the next depth, for more pruning
+        sign = (-1 if(tb.nextTurn == tb.Xmark) else 1)
+        nextMoves.sort(key=lambda mv: sign*ret[mv])
+    
+    return ret, depth, budget.nodes, exact
+
+
+# Return the exact evaluations for all moves of the given board, like 
+#   ... minimaxEvalsForNextMoves() in python with pruning, but stop with a 
+#   ... SearchBudgetExceeded as soon as 'budget' (a SearchBudget) is used up
+# The search is minimax_DepthLimited() deep enough to never reach its depth limit.
+# Returns (evals, cnt)
+def minimaxEvalsWithinBudget(tb : TicTacToeBoard, budget : SearchBudget):
+    nextMoves = tb.possibleNextMoves()
+    ret = np.zeros(shape=9, dtype=np.int8) + 8
+    state = [budget, False]
+    for mv in nextMoves:
+        budget.spend()
+        tb.move(mv)
+        try:
+            ret[mv] = minimax_DepthLimited(tb, len(nextMoves), state)
+        finally:
+            tb.undoLastMove()
+    return ret, budget.nodes
+###############################################################################
 
 
 # Run the minimax algorithm, but produce the results of all evaluations in the position tree
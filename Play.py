@@ -1,8 +1,6 @@
 
-import json
-
 from Board import TicTacToeBoard
-from TableBase import getAvailableTableBases
+from TableBase import getTableBase, getTableBaseNames
 from Engine import TableBaseEngine, MiniMaxEngine
 from Helper import extendRootPath
 
@@ -110,6 +108,7 @@ def exitMessage():
     
     
 def tryToLoadSettings(default):
+    import json
     path = _getPathToSettingsFile()
     try:
         with open(path, "r") as jfile:
@@ -120,6 +119,7 @@ def tryToLoadSettings(default):
         return ret
 
 def tryToSaveSettings(settings):
+    import json
     path = _getPathToSettingsFile()
     try:
         with open(path, "w") as jfile:
@@ -129,9 +129,8 @@ def tryToSaveSettings(settings):
     
 
 def makeTableBaseEngine():
-    atb = getAvailableTableBases()
-    tbname = list(atb.keys())[0]
-    tbase = atb[tbname]
+    tbname = getTableBaseNames()[0]
+    tbase = getTableBase(tbname)
     eng = TableBaseEngine(tbase)
     return eng
 
@@ -0,0 +1,140 @@
+import numpy as np
+
+from Board import TicTacToeBoard
+from Encode import lookUpSymTable
+from Helper import generateAllLegalPositions
+
+
+#              Ranking Concept
+#########################################################
+# Out of the 3**9 = 19683 integer encodings of boards, only 5478 are legal 
+#   ... positions (see Helper.isLegalPosition()) and only 765 of those are the 
+#   ... representatives of their symmetries (a.k.a canonical positions).
+# Ranking assigns each of them a dense index (a.k.a rank), in increasing order of encoding:
+#       legal rank      : 0..5477 for every legal position
+#       canonical rank  : 0..764  for every canonical position
+# Any legal position can be ranked canonically, by the rank of its representative.
+# Hence, tables over positions can be arrays of 5478 or 765 entries instead of 19683.
+#
+# All the rank/unrank fns are single array look-ups. They take an int or an array 
+#   ... of ints; for an array, illegal positions get the rank -1 instead of an error.
+NumLegalPositions = 5478
+NumCanonicalPositions = 765
+
+
+
+
+#       Module-Scope Variables (a.k.a globals)
+#########################################################
+# For any such variable:
+#       Functions within this module can access it by name
+#       Functions within this module can modify it by declaring this name as 'global'
+#       Importing this name should be avoided; hence functions outside this module
+#         ... cannot access/modify this variable.
+
+# Encodings of all legal/canonical positions, sorted. Index by rank to unrank.
+_LegalCodes = None
+_CanonicalCodes = None
+
+# Ranks indexed by encoding, -1 for illegal positions
+_LegalRankOf = None
+_CanonicalRankOf = None
+
+
+# Build all the tables above. Called once, when they are first needed.
+def _buildRankTables():
+    global _LegalCodes, _CanonicalCodes, _LegalRankOf, _CanonicalRankOf
+    
+    legal = sorted(tb.code for tb in generateAllLegalPositions())
+    reps = [lookUpSymTable(N)[0] for N in legal]
+    canonical = sorted(set(reps))
+    
+    legalCodes = np.array(legal, dtype=np.int32)
+    canonicalCodes = np.array(canonical, dtype=np.int32)
+    
+    legalRankOf = np.full(3**9, -1, dtype=np.int16)
+    legalRankOf[legalCodes] = np.arange(len(legal))
+    
+    canonicalRankOf = np.full(3**9, -1, dtype=np.int16)
+    canonicalRankOf[canonicalCodes] = np.arange(len(canonical))
+    canonicalRankOf[legalCodes] = canonicalRankOf[np.array(reps)]
+    
+    for arr in (legalCodes, canonicalCodes, legalRankOf, canonicalRankOf):
+        arr.flags.writeable = False
+    _LegalCodes,_CanonicalCodes = legalCodes,canonicalCodes
+    _LegalRankOf,_CanonicalRankOf = legalRankOf,canonicalRankOf
+    
+
+def _getLegalTables():
+    if(_LegalCodes is None):
+        _buildRankTables()
+    return _LegalCodes, _LegalRankOf
+
+def _getCanonicalTables():
+    if(_CanonicalCodes is None):
+        _buildRankTables()
+    return _CanonicalCodes, _CanonicalRankOf
+#########################################################
+
+
+# Look up 'table' at 'idx', an int or an array of ints
+# For an int, raises a ValueError (with the message 'msg') if it isn't valid
+#   ... or if the looked-up value is -1
+def _lookUp(table, idx, msg):
+    if(np.ndim(idx) > 0):
+        idx = np.asarray(idx)
+        if(idx.size > 0 and (idx.min() < 0 or idx.max() >= len(table))):
+            raise ValueError(msg.format('array'))
+        return table[idx]
+    
+    try:
+        if(idx < 0):
+            raise IndexError
+        ret = int(table[idx])
+    except (IndexError, TypeError, ValueError):
+        ret = -1
+    if(ret == -1):
+        raise ValueError(msg.format(idx))
+    return ret
+
+
+#       Legal ranks (0..5477)
+#########################################################
+# The legal rank of the position with encoding 'N'
+def legalRank(N):
+    msg = "In call to legalRank({}), the encoding is not of a legal position"
+    return _lookUp(_getLegalTables()[1], N, msg)
+
+# The encoding of the position with the legal rank 'r'
+def unrankLegal(r):
+    msg = "In call to unrankLegal({}), the rank must be in [0,5477]"
+    return _lookUp(_getLegalTables()[0], r, msg)
+#########################################################
+
+
+#       Canonical ranks (0..764)
+#########################################################
+# The canonical rank of the position with encoding 'N', i.e. the rank of 
+#   ... its representative among the canonical positions
+def canonicalRank(N):
+    msg = "In call to canonicalRank({}), the encoding is not of a legal position"
+    return _lookUp(_getCanonicalTables()[1], N, msg)
+
+# The encoding of the canonical position with the rank 'r'
+def unrankCanonical(r):
+    msg = "In call to unrankCanonical({}), the rank must be in [0,764]"
+    return _lookUp(_getCanonicalTables()[0], r, msg)
+
+# The canonical rank of the position on a T-Board
+def rankBoard(tb : TicTacToeBoard):
+    return canonicalRank(tb.code)
+#########################################################
+
+
+# Return read-only arrays of the encodings of all legal and all canonical positions
+#   ... such that the position with rank 'r' has the encoding arr[r]
+def getLegalCodes():
+    return _getLegalTables()[0]
+
+def getCanonicalCodes():
+    return _getCanonicalTables()[0]
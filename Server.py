@@ -0,0 +1,486 @@
+
+import os
+import time
+import json
+import asyncio
+import collections
+import numpy as np
+
+from Board import TicTacToeBitBoard
+from Helper import makeBoardFromPosition, isLegalPosition
+
+
+#              Server Concept
+#########################################################
+# An EngineServer answers best-move queries from many clients at once, over a
+#   ... localhost TCP socket or a Unix socket. It runs an asyncio event loop.
+# The protocol is JSON lines: each request and each response is one JSON object
+#   ... on its own line. A client may send many requests without waiting for the
+#   ... responses, which may come back in any order; each response carries the
+#   ... 'id' of its request.
+#
+# Requests:
+#       {"id": 7, "op": "listBestMoves", "board": [0,0,0, 0,1,0, 0,0,0], "engine": "tablebase"}
+#       {"id": 8, "op": "bestMove", "board": [...], "engine": "minimax", "separateEqualsBy": "random"}
+#       {"id": 9, "op": "stats"}
+#       {"id": 10, "op": "ping"}
+#   'board' is the board vector (0 for empty, 1 for X, 2 for O; see Board.py) and
+#   ... the engine defaults to "tablebase".
+# Responses:
+#       {"id": 7, "moves": [0, 2, 6, 8]}
+#       {"id": 8, "move": 2}
+#       {"id": 9, "stats": {...}}       (see EngineServer.getStats())
+#       {"id": 10, "pong": true}
+#       {"id": ..., "error": "..."}     (for any request that cannot be answered)
+#
+# Tablebase look-ups take microseconds, so they are answered right in the event loop.
+# Every other engine searches in a pool of worker processes. Queued searches are
+#   ... sent to the pool in batches of up to 'batchSize' positions, at most 'workers'
+#   ... batches at a time. When 'maxPending' searches are queued, new ones wait for
+#   ... room (so a flood of clients can't use up the server's memory). Likewise, the
+#   ... server stops reading from a client that has 'maxPerClient' requests in
+#   ... flight, until some of them are answered, so that a client which sends
+#   ... requests without reading the responses is slowed down by its own socket.
+# Workers load the tablebase memory-mapped (see TableBase.BinaryTableBase), so all of
+#   ... the processes on a system share its memory.
+# Ties between the best moves for 'bestMove' are resolved in the server itself,
+#   ... with its own RNG, so answers don't depend on which worker ran the search.
+
+
+
+
+#       Worker Processes
+#########################################################
+# Engines of each worker process, made on first use
+_WorkerEngines = None
+
+def _getWorkerEngine(name):
+    global _WorkerEngines
+    if(_WorkerEngines is None):
+        _WorkerEngines = {}
+    if(name not in _WorkerEngines):
+        _WorkerEngines[name] = makeServerEngine(name)
+    return _WorkerEngines[name]
+
+# Runs in a worker process: list the best moves of each of 'positions' with the engine 'name'
+# Returns a list with, for each position, either a list of moves or an error message
+def _listBestMovesBatch(name, positions):
+    eng = _getWorkerEngine(name)
+    ret = []
+    for vec in positions:
+        try:
+            tb = makeBoardFromPosition(np.array(vec, dtype=np.uint8))
+            ret.append([int(mv) for mv in eng.listBestMoves(TicTacToeBitBoard(copyFrom=tb))])
+        except Exception as e:
+            ret.append("{}: {}".format(type(e).__name__, e))
+    return ret
+#########################################################
+
+
+# Names of the engines that can be made by makeServerEngine()
+ServerEngineNames = ['tablebase', 'minimax', 'minimax-python']
+
+# Make a new engine of the kind 'name' (one of ServerEngineNames)
+def makeServerEngine(name):
+    if(name == 'tablebase'):
+        from Engine import TableBaseEngine
+        from TableBase import getTableBase, getTableBaseNames
+        return TableBaseEngine(getTableBase(getTableBaseNames()[0]))
+    elif(name == 'minimax'):
+        from Engine import MiniMaxEngine
+        return MiniMaxEngine(pruning=True, useMachineCode=True)
+    elif(name == 'minimax-python'):
+        from Engine import MiniMaxEngine
+        return MiniMaxEngine(pruning=True, useMachineCode=False)
+    else:
+        msg = "Unknown engine '{}'. Must be one of {}".format(name, ServerEngineNames)
+        raise ValueError(msg)
+
+
+# A special exception for requests that the server cannot answer
+class ServerRequestError(ValueError):
+    pass
+
+
+# Check and convert the 'board' of a request into a list of 9 ints.
+# Raises a ServerRequestError if it isn't a position where a move can be played.
+def _parsePosition(board):
+    if(not isinstance(board, list) or len(board) != 9 or
+       any((type(c) is not int) or c not in (0,1,2) for c in board)):
+        raise ServerRequestError("'board' must be a list of 9 integers, each one of 0, 1 or 2")
+    try:
+        tb = makeBoardFromPosition(np.array(board, dtype=np.uint8))
+    except ValueError:
+        raise ServerRequestError("'board' has a position that can't arise in a game")
+    if(not isLegalPosition(tb)):
+        raise ServerRequestError("'board' has a position that can't arise in a game")
+    if(tb.checkWin() != 0 or len(tb.moveHistory) == 9):
+        raise ServerRequestError("'board' has a position where the game is already over")
+    return board
+
+
+
+
+#        The Server
+###############################################################################
+class EngineServer:
+
+    def __init__(self, workers=None, batchSize=32, batchDelay=0.001, maxPending=1024,
+                 maxPerClient=64, latencyWindow=10000, randomSeed=None):
+        self.workers = (workers if(workers is not None) else (os.cpu_count() or 1))
+        self.batchSize = batchSize
+        self.batchDelay = batchDelay            # seconds to wait for a batch to fill up
+        self.maxPending = maxPending
+        self.maxPerClient = maxPerClient
+        self.rng = np.random.default_rng(seed=randomSeed)
+
+        self._inlineEngines = {}
+        self._pool = None
+        self._queue = None
+        self._batchSlots = None
+        self._batcherTask = None
+        self._batchTasks = set()
+        self._servers = []
+        self._clientTasks = set()
+
+        # Latencies (in ns) of the latest 'latencyWindow' requests of each op
+        self._latencies = collections.defaultdict(lambda: collections.deque(maxlen=latencyWindow))
+        self._counts = collections.Counter()
+        self._numBatches = 0
+        self._numBatchedPositions = 0
+        self._startTime = time.perf_counter()
+
+
+    # Start the worker processes and the batcher (called by the listen fns.)
+    async def start(self):
+        if(self._pool is not None):
+            return
+        from concurrent.futures import ProcessPoolExecutor
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._queue = asyncio.Queue(maxsize=self.maxPending)
+        self._batchSlots = asyncio.Semaphore(self.workers)
+        self._batcherTask = asyncio.ensure_future(self._runBatcher())
+
+    async def listenTCP(self, host='127.0.0.1', port=0):
+        await self.start()
+        server = await asyncio.start_server(self._handleClient, host, port, limit=1<<16)
+        self._servers.append(server)
+        return server
+
+    async def listenUnix(self, path):
+        await self.start()
+        server = await asyncio.start_unix_server(self._handleClient, path, limit=1<<16)
+        self._servers.append(server)
+        return server
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        for task in list(self._clientTasks):
+            task.cancel()
+        if(self._clientTasks):
+            await asyncio.gather(*self._clientTasks, return_exceptions=True)
+        if(self._batcherTask is not None):
+            self._batcherTask.cancel()
+            try:
+                await self._batcherTask
+            except asyncio.CancelledError:
+                pass
+            self._batcherTask = None
+        if(self._pool is not None):
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+    # Answer one request (a dict), returning the response (a dict)
+    async def handleRequest(self, req):
+        t0 = time.perf_counter_ns()
+        op = (req.get('op') if(isinstance(req, dict)) else None)
+        ret = {'id': (req.get('id') if(isinstance(req, dict)) else None)}
+        try:
+            if(op == 'listBestMoves'):
+                ret['moves'] = await self.listBestMoves(req.get('board'), req.get('engine', 'tablebase'))
+            elif(op == 'bestMove'):
+                moves = await self.listBestMoves(req.get('board'), req.get('engine', 'tablebase'))
+                ret['move'] = self._chooseAmongCandidates(moves, req.get('separateEqualsBy', 'random'))
+            elif(op == 'stats'):
+                ret['stats'] = self.getStats()
+            elif(op == 'ping'):
+                ret['pong'] = True
+            else:
+                raise ServerRequestError("Unknown op '{}'".format(op))
+        except ServerRequestError as e:
+            ret['error'] = str(e)
+            op = 'error'
+        except Exception as e:      # e.g. an engine that can't be made, or a failed look-up
+            ret['error'] = "{}: {}".format(type(e).__name__, e)
+            op = 'error'
+        self._counts[op] += 1
+        self._latencies[op].append(time.perf_counter_ns() - t0)
+        return ret
+
+
+    # The best moves in the position 'board' (a list of 9 ints) for the engine 'name'
+    async def listBestMoves(self, board, name='tablebase'):
+        if(name not in ServerEngineNames):
+            raise ServerRequestError("Unknown engine '{}'. Must be one of {}".format(
+                                        name, ServerEngineNames))
+        board = _parsePosition(board)
+
+        if(name == 'tablebase'):
+            if(name not in self._inlineEngines):
+                self._inlineEngines[name] = makeServerEngine(name)
+            tb = makeBoardFromPosition(np.array(board, dtype=np.uint8))
+            return [int(mv) for mv in self._inlineEngines[name].listBestMoves(tb)]
+
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((name, board, fut))
+        ret = await fut
+        if(isinstance(ret, str)):
+            raise ServerRequestError(ret)
+        return ret
+
+
+    def _chooseAmongCandidates(self, moves, separateEqualsBy):
+        if(separateEqualsBy == 'leftmost'):
+            return moves[0]
+        elif(separateEqualsBy == 'rightmost'):
+            return moves[-1]
+        elif(separateEqualsBy == 'random'):
+            return moves[self.rng.integers(len(moves))]
+        else:
+            raise ServerRequestError("'separateEqualsBy' must be one of " + \
+                                     "['random', 'leftmost', 'rightmost']")
+
+
+    # Statistics of the server since it was made, as a dict that can be sent as JSON
+    # Latencies (in microseconds) are over the latest requests of each op.
+    def getStats(self):
+        latency = {}
+        for op,times in self._latencies.items():
+            if(len(times) > 0):
+                p = np.percentile(np.array(times), (50, 90, 99, 100)) / 1000
+                latency[op] = {'p50': p[0], 'p90': p[1], 'p99': p[2], 'max': p[3]}
+        return {
+                'uptime'          : time.perf_counter() - self._startTime,
+                'requests'        : dict(self._counts),
+                'pending'         : (self._queue.qsize() if(self._queue is not None) else 0),
+                'batches'         : self._numBatches,
+                'meanBatchSize'   : (self._numBatchedPositions/self._numBatches
+                                        if(self._numBatches > 0) else 0.0),
+                'workers'         : self.workers,
+                'latencyMicros'   : latency
+               }
+
+
+    # Takes queued searches off the queue in batches and sends them to the workers
+    async def _runBatcher(self):
+        loop = asyncio.get_running_loop()
+        while(True):
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.batchDelay
+            while(len(items) < self.batchSize):
+                try:
+                    if(self._queue.empty()):
+                        timeout = deadline - loop.time()
+                        if(timeout <= 0):
+                            break
+                        items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    else:
+                        items.append(self._queue.get_nowait())
+                except asyncio.TimeoutError:
+                    break
+
+            byEngine = collections.defaultdict(list)
+            for item in items:
+                byEngine[item[0]].append(item)
+            for name,batch in byEngine.items():
+                await self._batchSlots.acquire()
+                task = asyncio.ensure_future(self._runBatch(name, batch))
+                self._batchTasks.add(task)
+                task.add_done_callback(self._batchTasks.discard)
+
+    async def _runBatch(self, name, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            self._numBatches += 1
+            self._numBatchedPositions += len(batch)
+            try:
+                results = await loop.run_in_executor(self._pool, _listBestMovesBatch,
+                                                     name, [board for _,board,_ in batch])
+            except Exception as e:
+                results = ["{}: {}".format(type(e).__name__, e)] * len(batch)
+            for (_,_,fut),res in zip(batch, results):
+                if(not fut.done()):
+                    fut.set_result(res)
+        finally:
+            self._batchSlots.release()
+
+
+    # Read requests from a client line by line and answer each of them in its own task
+    # A line is only read when the client has fewer than 'maxPerClient' requests in flight.
+    # Ends quietly when cancelled by close(), since nothing awaits it
+    async def _handleClient(self, reader, writer):
+        self._clientTasks.add(asyncio.current_task())
+        tasks = set()
+        slots = asyncio.Semaphore(self.maxPerClient)
+        
+        def onDone(task):
+            tasks.discard(task)
+            slots.release()
+        
+        try:
+            while(True):
+                try:
+                    await slots.acquire()
+                    line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                except asyncio.CancelledError:
+                    for task in tasks:
+                        task.cancel()
+                    tasks = set()
+                    break
+                if(not line):
+                    break
+                if(not line.strip()):
+                    slots.release()
+                    continue
+                task = asyncio.ensure_future(self._answerLine(line, writer))
+                tasks.add(task)
+                task.add_done_callback(onDone)
+            if(tasks):
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self._clientTasks.discard(asyncio.current_task())
+            writer.close()
+
+    async def _answerLine(self, line, writer):
+        try:
+            req = json.loads(line)
+        except ValueError:
+            resp = {'id': None, 'error': 'Request is not valid JSON'}
+        else:
+            resp = await self.handleRequest(req)
+        writer.write((json.dumps(resp) + '\n').encode())
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+###############################################################################
+
+
+
+
+#        A simple client
+###############################################################################
+# Sends one request at a time and waits for its response.
+# Make one client per concurrent game, or send many requests with sendMany().
+class EngineClient:
+
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self._nextId = 0
+
+    async def connectTCP(self, host='127.0.0.1', port=8765):
+        self.reader,self.writer = await asyncio.open_connection(host, port)
+
+    async def connectUnix(self, path):
+        self.reader,self.writer = await asyncio.open_unix_connection(path)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    # Send all of 'reqs' (dicts, which get their 'id' set) before reading any response
+    # Returns the responses in the order of the requests
+    async def sendMany(self, reqs):
+        ids = []
+        for req in reqs:
+            req = dict(req, id=self._nextId)
+            ids.append(self._nextId)
+            self._nextId += 1
+            self.writer.write((json.dumps(req) + '\n').encode())
+        await self.writer.drain()
+        resps = {}
+        while(len(resps) < len(ids)):
+            line = await self.reader.readline()
+            if(not line):
+                raise ConnectionError("The server closed the connection")
+            resp = json.loads(line)
+            resps[resp['id']] = resp
+        return [resps[i] for i in ids]
+
+    async def send(self, req):
+        return (await self.sendMany([req]))[0]
+
+    async def listBestMoves(self, board, engine='tablebase'):
+        return _checkResponse(await self.send({'op': 'listBestMoves', 'board': list(board),
+                                               'engine': engine}))['moves']
+
+    async def bestMove(self, board, engine='tablebase', separateEqualsBy='random'):
+        return _checkResponse(await self.send({'op': 'bestMove', 'board': list(board), 'engine': engine,
+                                               'separateEqualsBy': separateEqualsBy}))['move']
+
+    async def stats(self):
+        return _checkResponse(await self.send({'op': 'stats'}))['stats']
+
+
+def _checkResponse(resp):
+    if('error' in resp):
+        raise ServerRequestError(resp['error'])
+    return resp
+###############################################################################
+
+
+
+
+# Start a server with, for example:
+#       python Server.py --tcp 127.0.0.1:8765 --workers 4
+#       python Server.py --unix /tmp/tictactoe.sock
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve TicTacToe engines over a socket")
+    parser.add_argument('--tcp', metavar='HOST:PORT', default=None,
+                        help="listen on a TCP socket (default: 127.0.0.1:8765 if --unix isn't given)")
+    parser.add_argument('--unix', metavar='PATH', default=None,
+                        help="listen on a Unix socket")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes for searches (default: all CPUs)")
+    parser.add_argument('--batch-size', type=int, default=32,
+                        help="most searches sent to a worker at once (default: 32)")
+    parser.add_argument('--batch-delay-ms', type=float, default=1.0,
+                        help="longest wait for a batch of searches to fill up (default: 1.0)")
+    parser.add_argument('--max-per-client', type=int, default=64,
+                        help="requests of a single client in flight, before the server " +
+                             "stops reading from it (default: 64)")
+    parser.add_argument('--max-pending', type=int, default=1024,
+                        help="most searches queued before new ones have to wait (default: 1024)")
+    args = parser.parse_args()
+
+    if(args.tcp is None and args.unix is None):
+        args.tcp = '127.0.0.1:8765'
+
+    async def main():
+        server = EngineServer(workers=args.workers, batchSize=args.batch_size,
+                              batchDelay=args.batch_delay_ms/1000, maxPending=args.max_pending,
+                              maxPerClient=args.max_per_client)
+        if(args.tcp is not None):
+            host,_,port = args.tcp.rpartition(':')
+            await server.listenTCP(host or '127.0.0.1', int(port))
+            print("Listening on {}".format(args.tcp))
+        if(args.unix is not None):
+            await server.listenUnix(args.unix)
+            print("Listening on {}".format(args.unix))
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,272 @@
+
+import time
+import array
+import numpy as np
+
+from Board import TicTacToeBitBoard
+from Engine import MiniMaxEngine, TableBaseEngine, RandomEngine
+
+
+#              Simulator Concept
+#########################################################
+# Engines play matches against each other without any user input, in order to
+#   ... load-test the engines and to gather statistics over many games.
+# A match is a number of games between two engines (any TicTacToeEngine).
+# By default they swap sides after every game, with engine 1 playing 'X' in
+#   ... the even-numbered games (counting from 0).
+# Results are always from the point of view of engine 1: 1/0/-1 for win/draw/loss.
+# If a seed is given, the RNGs of both engines are replaced with independent
+#   ... RNGs spawned from np.random.SeedSequence(seed), so that a match can be replayed.
+
+
+
+
+#        Result of a match between two engines
+###############################################################################
+class MatchResult:
+
+    def __init__(self, results, seconds, moveTimes, numMoves):
+        self.results = results              # int8 array with the result of each game
+        self.seconds = seconds              # wall-clock time of the whole match
+        self.moveTimes = moveTimes          # [ns per move of engine 1, ns per move of engine 2]
+        self.numMoves = numMoves            # total number of moves played in the match
+
+        self.numGames = len(results)
+        self.wins = int(np.count_nonzero(results==1))
+        self.draws = int(np.count_nonzero(results==0))
+        self.losses = int(np.count_nonzero(results==-1))
+
+    def gamesPerSecond(self):
+        return (self.numGames/self.seconds if(self.seconds > 0) else float('inf'))
+
+    # Percentiles of the time taken (in microseconds) by an engine (1 or 2) to make a move
+    # If 'engine' is None, the moves of both engines are counted together
+    # Returns None if move times were not recorded.
+    def latencyPercentiles(self, percentiles=(50, 90, 99, 100), engine=None):
+        if(self.moveTimes is None):
+            return None
+        if(engine is None):
+            times = np.concatenate(self.moveTimes)
+        elif(engine in (1,2)):
+            times = self.moveTimes[engine-1]
+        else:
+            msg = "In call to MatchResult.latencyPercentiles(), 'engine' must be " + \
+                    "one of [None, 1, 2]. Received '{}'".format(engine)
+            raise ValueError(msg)
+        if(len(times) == 0):
+            return {p:0.0 for p in percentiles}
+        vals = np.percentile(times, percentiles) / 1000
+        return dict(zip(percentiles, vals.tolist()))
+
+    def summary(self, name1='engine 1', name2='engine 2'):
+        ret = "{} games between {} and {} in {:.3f}s ({:.1f} games/s, {} moves)\n".format(
+                self.numGames, name1, name2, self.seconds, self.gamesPerSecond(), self.numMoves)
+        ret += "{} wins: {}, draws: {}, {} wins: {}\n".format(
+                name1, self.wins, self.draws, name2, self.losses)
+        if(self.moveTimes is not None):
+            for eng,name in ((1,name1), (2,name2)):
+                pcts = self.latencyPercentiles(engine=eng)
+                ret += "{} move latency (us): ".format(name)
+                ret += ", ".join("p{}={:.1f}".format(p,v) for p,v in pcts.items()) + "\n"
+        return ret
+###############################################################################
+
+
+
+
+# Play one game between engX (who plays 'X') and engO from the empty board
+# Moves are chosen with engine.bestMove(tb, separateEqualsBy)
+# If 'timesX' and 'timesO' are given (array.array('q') or lists), the time taken
+#   ... by each move in nanoseconds is appended to them.
+# Returns (result, moves) where result is 1/0/-1 for a win for X, draw, or a win for O
+def playGame(engX, engO, boardClass=TicTacToeBitBoard, separateEqualsBy='random',
+             timesX=None, timesO=None):
+    tb = boardClass()
+    while(True):
+        if(tb.nextTurn == tb.Xmark):
+            eng,times = engX,timesX
+        else:
+            eng,times = engO,timesO
+
+        if(times is None):
+            mv = eng.bestMove(tb, separateEqualsBy)
+        else:
+            t0 = time.perf_counter_ns()
+            mv = eng.bestMove(tb, separateEqualsBy)
+            times.append(time.perf_counter_ns() - t0)
+
+        tb.move(int(mv))
+
+        winner = tb.checkWin()
+        if(winner != 0):
+            return (1 if(winner==tb.Xmark) else -1), len(tb.moveHistory)
+        if(len(tb.moveHistory) == 9):
+            return 0, 9
+
+
+# Play 'numGames' games between engine1 and engine2 (see Simulator Concept above)
+# Both arguments may be the same engine, for self-play.
+# Set recordLatencies=False to not keep the time of every move (8 bytes per move).
+# Returns a MatchResult
+def runMatch(engine1, engine2, numGames, seed=None, swapSides=True,
+             boardClass=TicTacToeBitBoard, separateEqualsBy='random', recordLatencies=True):
+    if(numGames < 0):
+        msg = "In call to runMatch(), numGames must not be negative. " + \
+                "Received '{}'".format(numGames)
+        raise ValueError(msg)
+
+    if(seed is not None):
+        rng1,rng2 = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(2)]
+        engine1.rng = rng1
+        if(engine2 is not engine1):
+            engine2.rng = rng2
+
+    results = np.zeros(numGames, dtype=np.int8)
+    if(recordLatencies):
+        times1,times2 = array.array('q'),array.array('q')
+    else:
+        times1,times2 = None,None
+    numMoves = 0
+
+    t0 = time.perf_counter()
+    for g in range(numGames):
+        if(swapSides is False or g%2 == 0):
+            res,moves = playGame(engine1, engine2, boardClass, separateEqualsBy, times1, times2)
+        else:
+            res,moves = playGame(engine2, engine1, boardClass, separateEqualsBy, times2, times1)
+            res = -res
+        results[g] = res
+        numMoves += moves
+    seconds = time.perf_counter() - t0
+
+    if(recordLatencies):
+        moveTimes = [np.frombuffer(times1, dtype=np.int64), np.frombuffer(times2, dtype=np.int64)]
+    else:
+        moveTimes = None
+    return MatchResult(results, seconds, moveTimes, numMoves)
+
+
+# Play 'numGames' games between two BatchPolicies (see BatchBoard.py), in batches
+#   ... of up to 'batchSize' games played at once, with the same rules as runMatch()
+# Moves are chosen for many games at once, so the time of each single move is 
+#   ... unknown, and the returned MatchResult has no move times.
+def runBatchMatch(policy1, policy2, numGames, seed=None, swapSides=True, 
+                  separateEqualsBy='random', batchSize=1<<16):
+    from BatchBoard import TicTacToeBoardBatch
+    if(numGames < 0):
+        msg = "In call to runBatchMatch(), numGames must not be negative. " + \
+                "Received '{}'".format(numGames)
+        raise ValueError(msg)
+    if(batchSize < 1):
+        msg = "In call to runBatchMatch(), batchSize must be at least 1. " + \
+                "Received '{}'".format(batchSize)
+        raise ValueError(msg)
+
+    if(seed is not None):
+        rng1,rng2 = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(2)]
+        policy1.rng = rng1
+        if(policy2 is not policy1):
+            policy2.rng = rng2
+
+    results = np.zeros(numGames, dtype=np.int8)
+    numMoves = 0
+
+    t0 = time.perf_counter()
+    for start in range(0, numGames, batchSize):
+        batch = TicTacToeBoardBatch(min(batchSize, numGames-start))
+        # Whether policy 1 plays 'X' in each game of the batch
+        firstIsX = ((np.arange(start, start+len(batch)) % 2 == 0) if(swapSides) 
+                        else np.ones(len(batch), dtype=bool))
+        while(not batch.isOver()):
+            games = batch.activeGames()
+            firstMoves = (firstIsX[games] == (batch.nextTurn == batch.Xmark))
+            moves = np.empty(len(games), dtype=np.intp)
+            moves[firstMoves] = policy1.chooseMoves(batch, games[firstMoves], separateEqualsBy)
+            moves[~firstMoves] = policy2.chooseMoves(batch, games[~firstMoves], separateEqualsBy)
+            batch.move(moves, games)
+            numMoves += len(games)
+        res = batch.results()
+        res[~firstIsX] *= -1
+        results[start:start+len(batch)] = res
+    seconds = time.perf_counter() - t0
+
+    return MatchResult(results, seconds, None, numMoves)
+
+
+# Names of the engines that can be made by makeEngine()
+EngineNames = ['random', 'minimax', 'minimax-python', 'minimax-memo', 'tablebase']
+
+# Make a new engine of the kind 'name' (one of EngineNames)
+def makeEngine(name, randomSeed=None, rng=None):
+    if(name == 'random'):
+        return RandomEngine(randomSeed, rng)
+    elif(name == 'minimax'):
+        return MiniMaxEngine(randomSeed, rng, pruning=True, useMachineCode=True)
+    elif(name == 'minimax-python'):
+        return MiniMaxEngine(randomSeed, rng, pruning=True, useMachineCode=False)
+    elif(name == 'minimax-memo'):
+        return MiniMaxEngine(randomSeed, rng, memoize=True)
+    elif(name == 'tablebase'):
+        from TableBase import getTableBase, getTableBaseNames
+        return TableBaseEngine(getTableBase(getTableBaseNames()[0]), randomSeed, rng)
+    else:
+        msg = "In call to makeEngine(), 'name' must be one of {}. ".format(EngineNames) + \
+                "Received '{}'".format(name)
+        raise ValueError(msg)
+
+
+# Names of the policies that can be made by makeBatchPolicy()
+BatchPolicyNames = ['random', 'tablebase']
+
+# Make a new BatchPolicy of the kind 'name' (one of BatchPolicyNames)
+def makeBatchPolicy(name, randomSeed=None, rng=None):
+    from BatchBoard import RandomBatchPolicy, TableBaseBatchPolicy
+    if(name == 'random'):
+        return RandomBatchPolicy(randomSeed, rng)
+    elif(name == 'tablebase'):
+        from TableBase import getTableBase, getTableBaseNames
+        return TableBaseBatchPolicy(getTableBase(getTableBaseNames()[0]), randomSeed, rng)
+    else:
+        msg = "In call to makeBatchPolicy(), 'name' must be one of {}. ".format(BatchPolicyNames) + \
+                "Received '{}'".format(name)
+        raise ValueError(msg)
+
+
+# Run a match between two engines with, for example:
+#       python Simulate.py tablebase random --games 10000 --seed 1
+# Play many games at once (only for the engines in BatchPolicyNames) with:
+#       python Simulate.py tablebase random --games 1000000 --batch 65536
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Play TicTacToe engines against each other")
+    parser.add_argument('engine1', choices=EngineNames)
+    parser.add_argument('engine2', choices=EngineNames)
+    parser.add_argument('--games', type=int, default=1000,
+                        help="number of games to play (default: 1000)")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="seed for the RNGs of the engines (default: unseeded)")
+    parser.add_argument('--no-swap', action='store_true',
+                        help="engine 1 plays 'X' in every game, instead of every other game")
+    parser.add_argument('--no-latencies', action='store_true',
+                        help="don't record the time taken by every move")
+    parser.add_argument('--batch', type=int, default=None, metavar='SIZE',
+                        help="play up to SIZE games at once with the batched policies " + 
+                             "(engines: {})".format(', '.join(BatchPolicyNames)))
+    args = parser.parse_args()
+
+    if(args.batch is None):
+        eng1 = makeEngine(args.engine1)
+        eng2 = makeEngine(args.engine2)
+        res = runMatch(eng1, eng2, args.games, seed=args.seed, swapSides=not args.no_swap,
+                       recordLatencies=not args.no_latencies)
+    else:
+        if(args.batch < 1):
+            parser.error("--batch must be at least 1 (received {})".format(args.batch))
+        for name in (args.engine1, args.engine2):
+            if(name not in BatchPolicyNames):
+                parser.error("--batch can only be used with the engines {}".format(BatchPolicyNames))
+        pol1 = makeBatchPolicy(args.engine1)
+        pol2 = makeBatchPolicy(args.engine2)
+        res = runBatchMatch(pol1, pol2, args.games, seed=args.seed, swapSides=not args.no_swap,
+                            batchSize=args.batch)
+    print(res.summary(args.engine1, args.engine2), end='')
@@ -0,0 +1,123 @@
+
+import numpy as np
+
+from Board import TicTacToeBoard
+
+
+#              State Table Concept
+#########################################################
+# There are only 3**9 = 19683 board vectors, so the facts about a position that
+#   ... don't depend on how it was reached are tabulated once for all of them,
+#   ... indexed by the integer encoding of the board (i.e. tb.code, see Encode.py).
+# _StateTable is a numpy array of shape (3**9,) and dtype np.uint16 such that, for
+#   ... the encoding 'N' of a board:
+#       bits 0-8    : bit 'i' is set if the cell at 'i' is empty (EmptyMaskBits)
+#       bits 9-10   : the winner, i.e. Xmark/Ymark or 0 for none (WinnerShift)
+#       bit  11     : set if the game is over, i.e. someone won or the board is full (TerminalBit)
+# The winner is found like TicTacToeBoard.checkWin() does, so even on an illegal
+#   ... board with many 3-in-a-rows it is the mark of the first one in WinPatterns.
+# The table takes 40kB and is built on its first use (in a few milliseconds).
+# Views of each field as its own array are also available (see the getters below).
+
+
+
+
+#       Module-Scope Constants
+#########################################################
+NumCodes = 3**9
+
+EmptyMaskBits = (1<<9) - 1
+WinnerShift = 9
+TerminalBit = 1<<11
+#########################################################
+
+
+
+
+#       Module-Scope Variables (a.k.a globals)
+#########################################################
+_StateTable = None
+_WinnerArray = None
+_EmptyMaskArray = None
+_LegalMoveMaskArray = None
+_TerminalArray = None
+#########################################################
+
+
+def _buildStateTable():
+    codes = np.arange(NumCodes)
+    vecs = (codes[:,None] // 3**np.arange(9)) % 3
+
+    winner = np.zeros(NumCodes, dtype=np.uint16)
+    for idxs in TicTacToeBoard.WinPatterns:
+        for mark in (TicTacToeBoard.Xmark, TicTacToeBoard.Ymark):
+            found = (vecs[:,idxs] == mark).all(axis=1) & (winner == 0)
+            winner[found] = mark
+
+    empty = ((vecs == 0) << np.arange(9)).sum(axis=1).astype(np.uint16)
+    terminal = (winner != 0) | (empty == 0)
+
+    ret = empty | (winner << WinnerShift) | (terminal.astype(np.uint16) * TerminalBit)
+    ret = ret.astype(np.uint16)
+    ret.flags.writeable = False
+    return ret
+
+
+# Getter method for the module-scoped '_StateTable' (see State Table Concept above)
+def getStateTable():
+    global _StateTable
+    if(_StateTable is None):
+        _StateTable = _buildStateTable()
+    return _StateTable
+
+
+# Getter method for the module-scoped '_WinnerArray'
+# _WinnerArray[N] (np.uint8) is the winner of the board with the encoding 'N', or 0
+def getWinnerArray():
+    global _WinnerArray
+    if(_WinnerArray is None):
+        _WinnerArray = (getStateTable() >> WinnerShift & 3).astype(np.uint8)
+        _WinnerArray.flags.writeable = False
+    return _WinnerArray
+
+# Getter method for the module-scoped '_EmptyMaskArray'
+# _EmptyMaskArray[N] (np.uint16) has bit 'i' set if the cell at 'i' is empty
+def getEmptyMaskArray():
+    global _EmptyMaskArray
+    if(_EmptyMaskArray is None):
+        _EmptyMaskArray = getStateTable() & EmptyMaskBits
+        _EmptyMaskArray.flags.writeable = False
+    return _EmptyMaskArray
+
+# Getter method for the module-scoped '_LegalMoveMaskArray'
+# Same as _EmptyMaskArray, but 0 for the positions that are already won, since
+#   ... no more moves can be played in them in a game
+def getLegalMoveMaskArray():
+    global _LegalMoveMaskArray
+    if(_LegalMoveMaskArray is None):
+        _LegalMoveMaskArray = np.where(getWinnerArray() == 0, getEmptyMaskArray(), 0).astype(np.uint16)
+        _LegalMoveMaskArray.flags.writeable = False
+    return _LegalMoveMaskArray
+
+# Getter method for the module-scoped '_TerminalArray'
+# _TerminalArray[N] (bool) is True if the game is over in the board with the encoding 'N'
+def getTerminalArray():
+    global _TerminalArray
+    if(_TerminalArray is None):
+        _TerminalArray = (getStateTable() & TerminalBit) != 0
+        _TerminalArray.flags.writeable = False
+    return _TerminalArray
+
+
+# Look-ups of a single position, from its encoding 'N' (e.g. tb.code)
+#######################################################
+def winnerOf(N):
+    return int(getStateTable()[N]) >> WinnerShift & 3
+
+def isTerminal(N):
+    return bool(getStateTable()[N] & TerminalBit)
+
+def legalMoveMask(N):
+    e = int(getStateTable()[N])
+    return (0 if(e >> WinnerShift & 3) else e & EmptyMaskBits)
+#######################################################
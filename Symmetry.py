@@ -1,8 +1,7 @@
 
+import numpy as np
 
 from Board import TicTacToeBoard
-from FlipRotate import fliplr, rotate180, rotateLeft, rotateRight
-from FlipRotate import fliplr_Vec, rotate180_Vec, rotateLeft_Vec, rotateRight_Vec
 
 
 
@@ -38,6 +37,14 @@ _newIndex = [
            ]
 
 
+# _gatherIndex[op][j], with (0<=op<8) and (0<=j<9), tells the old index of the ...
+#   ... cell that ends up at 'j' after its board is modified by the operation indexed 'op'
+# Hence, for a board-vector 'vec', vec[_gatherIndex[op]] is the transformed vector
+#   ... and vec[..., _gatherIndex] has all 8 transformed vectors in one array.
+_gatherIndex = np.argsort(np.array(_newIndex), axis=1)
+_gatherIndex.flags.writeable = False
+
+
 # Getter method for the module-scoped '_inverseOperation'
 def inverseOperation(opIdx):
     try:
@@ -75,49 +82,19 @@ def oldIndex(idx, opIdx):
 # Applies any of the operators of the D8 group to the input T-Board.
 # Returns a new T-Board.
 def transformBoard(tb : TicTacToeBoard, opIdx : int):
-    if(opIdx==0):
-        return TicTacToeBoard(copyFrom=tb)
-    elif(opIdx==1):
-        return  rotateRight(tb)
-    elif(opIdx==2):
-        return rotate180(tb)
-    elif(opIdx==3):
-        return rotateLeft(tb)
-    elif(opIdx==4):
-        return fliplr(tb)
-    elif(opIdx==5):
-        return rotateRight(fliplr(tb))
-    elif(opIdx==6):
-        return rotate180(fliplr(tb))
-    elif(opIdx==7):
-        return rotateLeft(fliplr(tb))
-    else:
-        msg = "Invalid Operation Index in call to transformBoard({})".format(opIdx)
-        raise ValueError(msg)
+    ret = TicTacToeBoard(copyFrom=tb)
+    ret.board = transformVec(tb.board, opIdx)
+    return ret
     
     
 # Applies any of the operators of the D8 group to the input.
-# Returns a new board-vector.
+# Also works on an array of many board-vectors, of shape (...,9)
+# Returns a new board-vector (or array of them).
 def transformVec(vec, opIdx : int):
-    if(opIdx==0):
-        return vec.copy()
-    elif(opIdx==1):
-        return  rotateRight_Vec(vec)
-    elif(opIdx==2):
-        return rotate180_Vec(vec)
-    elif(opIdx==3):
-        return rotateLeft_Vec(vec)
-    elif(opIdx==4):
-        return fliplr_Vec(vec)
-    elif(opIdx==5):
-        return rotateRight_Vec(fliplr_Vec(vec))
-    elif(opIdx==6):
-        return rotate180_Vec(fliplr_Vec(vec))
-    elif(opIdx==7):
-        return rotateLeft_Vec(fliplr_Vec(vec))
-    else:
+    if(opIdx not in range(8)):
         msg = "Invalid Operation Index in call to transformVec({})".format(opIdx)
         raise ValueError(msg)
+    return np.asarray(vec)[..., _gatherIndex[opIdx]]
     
         
 # Return all symmetric variants of the input T-Board.
@@ -128,7 +105,13 @@ def allBoardVariants(tb : TicTacToeBoard):
 # Return all symmetric variants of the input board-vector
 # Returns a list of board-vectors after applying each operation in order of its op-index.
 def allVectorVariants(vec):
-    return  [transformVec(vec, op) for op in range(8)]
+    return list(np.asarray(vec)[_gatherIndex])
+
+# Return all symmetric variants of an array of board-vectors in a single array.
+# For 'vecs' of shape (...,9), returns an array 'ret' of shape (8,...,9) such that
+#   ... ret[op] is transformVec(vecs, op)
+def allVectorVariantsArray(vecs):
+    return np.moveaxis(np.asarray(vecs)[..., _gatherIndex], -2, 0)
 
 
 # Return all unique symmetric variants of the input T-Board.
@@ -1,15 +1,20 @@
 
 import  os
-import json
+import time
+import itertools
 import numpy as np
-import tqdm
 
-from Board import TicTacToeBoard
-from MiniMax import minimaxAllContinuations
-from Encode import encode
+from Board import TicTacToeBoard, TicTacToeBitBoard
+from Encode import encode, decode
+from Rank import getCanonicalCodes, canonicalRank
 from Helper import extendRootPath
 
 
+# NOTE: json, tqdm, concurrent.futures, GameGraph and MiniMax (with its machine code) are 
+#   ... imported inside the fns that need them, since importing them takes longer
+#   ... than everything else needed to just look up a tablebase.
+
+
 #              TableBase Concept
 #########################################################
 # We can pre-compute what are the best moves for every game position and store
@@ -38,13 +43,67 @@ def _getDataPathToDefaultTableBases():
     
     if(_dataPathToDefaultTableBases is None):
         # Set it as a dict with paths to all the tablebases
+        # Each tablebase is loaded from the first of its paths that exists
         _dataPathToDefaultTableBases = {
-                    'minimax-1' : extendRootPath('data', 'TableBase_MiniMax-1.json')
+                    'minimax-1' : [
+                                    extendRootPath('data', 'TableBase_MiniMax-1.npy'),
+                                    extendRootPath('data', 'TableBase_MiniMax-1.json')
+                                  ]
                     }
     
     return _dataPathToDefaultTableBases
 
 
+#              Binary TableBase Format
+#########################################################
+# A BinaryTableBase stores the same information as a TableBase in a dense numpy 
+#   ... array of np.uint16, indexed by the encoding of board positions.
+# For each position 'p', the entry e = array[p] has these bits:
+#       bit 15      : set if the position is in the tablebase (e == 0 otherwise)
+#       bits 9-10   : the evaluation of the position plus 1 (i.e. 0/1/2 for loss/draw/win)
+#       bits 0-8    : the best moves; bit 'i' is set if a move at 'i' is one of them
+_EntryPresentBit = 1<<15
+_EntryValueShift = 9
+_EntryMovesMask = (1<<9) - 1
+
+# _MovesOfMask[m] is the list of best moves stored in the bits of 'm'
+_MovesOfMask = tuple([i for i in range(9) if(m>>i)&1] for m in range(1<<9))
+
+
+# Pack the list 'l' of a TableBase entry into an entry of a BinaryTableBase
+def _packEntry(l):
+    mask = 0
+    for mv in l[1:]:
+        mask |= 1<<int(mv)
+    return _EntryPresentBit | ((int(l[0])+1) << _EntryValueShift) | mask
+
+# Unpack an entry of a BinaryTableBase into a list like the one of a TableBase entry
+def _unpackEntry(e):
+    return [((e >> _EntryValueShift) & 3) - 1] + _MovesOfMask[e & _EntryMovesMask]
+
+
+# Convert a TableBase's dict (a.k.a table) into a BinaryTableBase's array
+def tableToArray(table):
+    ret = np.zeros(3**9, dtype=np.uint16)
+    for N,l in table.items():
+        ret[int(N)] = _packEntry(l)
+    return ret
+
+# Convert a BinaryTableBase's array into a TableBase's dict (a.k.a table)
+def arrayToTable(arr):
+    return {int(N):_unpackEntry(int(arr[N])) for N in np.nonzero(arr)[0]}
+
+# Convert a tablebase saved as a JSON file into a binary (.npy) one
+def convertJsonToBinary(jsonPath, binaryPath):
+    tbase = TableBase()
+    tbase.load(jsonPath)
+    btbase = BinaryTableBase()
+    btbase.setTable(tbase.getTable())
+    btbase.save(binaryPath)
+    return btbase
+#########################################################
+
+
 # A special exception used in TableBase.lookup() method
 class TableBaseLookupError(LookupError):
     pass
@@ -71,23 +130,81 @@ class TableBase:
             raise TableBaseLookupError(msg)
             
     def save(self, fpath):
+        import json
         with open(fpath, "w") as jfile:
             json.dump(self.table, jfile, sort_keys=True)
     
     def load(self, fpath):
+        import json
         with open(fpath, "r") as jfile:
             stringKeyTable = json.load(jfile)
             integerKeyTable = {int(i):stringKeyTable[i] for i in stringKeyTable.keys()}
             self.table = integerKeyTable
 
 
-def calcTableBase_MiniMax():
+# A TableBase stored in the binary format (see above).
+# load() memory-maps the file by default, so it takes microseconds and 
+#   ... processes on the same system share the memory for the array.
+# lookup() returns the same list as TableBase.lookup(), but in O(1) without any dict hashing.
+class BinaryTableBase(TableBase):
+    
+    # Also accepts the dict of a TableBase, which is converted into an array
+    def setTable(self, newTable):
+        if(isinstance(newTable, dict)):
+            newTable = tableToArray(newTable)
+        self.table = newTable
+        
+    # Returns (val, mask) for the position with the encoding 'idx', where 'mask'
+    #   ... has bit 'i' set for each best move 'i'
+    def lookupEntry(self, idx):
+        if(self.table is None):
+            msg = 'No table set in the TableBase object. Use setTable() or load() methods to add a table.'
+            raise RuntimeError(msg)
+        try:
+            if(idx < 0):
+                raise IndexError
+            e = self.table.item(idx)
+        except (IndexError,TypeError,ValueError):
+            e = 0
+        if(e == 0):
+            msg = 'In call to TableBase.lookup({}), the index is either not a valid integer' + \
+                    " or wasn't found in this tablebase"
+            raise TableBaseLookupError(msg.format(idx))
+        return ((e >> _EntryValueShift) & 3) - 1, e & _EntryMovesMask
+        
+    def lookup(self, idx):
+        val,mask = self.lookupEntry(idx)
+        return [val] + _MovesOfMask[mask]
+    
+    def save(self, fpath):
+        np.save(fpath, self.table, allow_pickle=False)
+        
+    def load(self, fpath, mmap=True):
+        self.table = np.load(fpath, mmap_mode=('r' if mmap else None), allow_pickle=False)
+
+
+# Shows a progress bar (with tqdm) unless progress=False
+def calcTableBase_MiniMax(progress=True):
     TBase = dict()
     tb = TicTacToeBoard()
     
-    pbar = tqdm.tqdm(total = 294_778)
+    if(progress):
+        import tqdm
+        pbar = tqdm.tqdm(total = 294_778)
+    else:
+        pbar = None
+    _addContinuationsToTableBase(tb, TBase, pbar)
+    return TBase
+
+
+# Add the entries for the position on 'tb' and all the positions that can follow 
+#   ... it to 'TBase', using minimaxAllContinuations()
+# Returns the minimax vector evaluation of the position on 'tb'
+def _addContinuationsToTableBase(tb, TBase, pbar=None):
+    from MiniMax import minimaxAllContinuations
     for tb,vec in minimaxAllContinuations(tb, tb.nextTurn, tb.getOtherMark()):
-        pbar.update()
+        if(pbar is not None):
+            pbar.update()
         
         N = encode(tb, useSymmetry=True)[0]
         if(N == encode(tb, useSymmetry=False)):
@@ -106,23 +223,230 @@ def calcTableBase_MiniMax():
             
             if(N not in TBase):
                 TBase[int(N)] = [val]+[int(i) for i in moves]
+    return vec
+
+
+# Run in a worker process by calcTableBase_Parallel()
+# Calculates the entries of the TableBase for the position after the moves in
+#   ... 'opening' and all positions that can follow it
+# Returns a tuple (opening, codes, entries, val, seconds, pid) where:
+#       codes, entries : arrays with the encodings and the packed entries (see
+#                           ... Binary TableBase Format) of the calculated positions
+#       val            : the evaluation of the position after 'opening'
+#       seconds, pid   : the time taken and the id of the worker process
+def _calcTableBase_SubTree(opening):
+    t0 = time.perf_counter()
+    
+    tb = TicTacToeBitBoard()
+    for mv in opening:
+        tb.move(mv)
+    TBase = dict()
+    vec = _addContinuationsToTableBase(tb, TBase)
+    
+    codes = np.array(sorted(TBase.keys()), dtype=np.int32)
+    entries = np.array([_packEntry(TBase[N]) for N in codes], dtype=np.uint16)
+    val = int(np.max(vec[vec != 8]))
+    return opening, codes, entries, val, time.perf_counter()-t0, os.getpid()
+
+
+# Calculates the same TableBase as calcTableBase_MiniMax(), with the work split
+#   ... across 'workers' processes (all CPUs if None).
+# The game tree is split into the subtrees after every opening of 'splitDepth' 
+#   ... moves (1 to 4), e.g. 9 subtrees for splitDepth=1 and 72 for splitDepth=2.
+# The entries for the positions in the openings themselves are calculated here
+#   ... from the evaluations of the subtrees.
+# Returns (TBase, timings) where timings is a list of (opening, seconds, pid) for each subtree
+def calcTableBase_Parallel(workers=None, splitDepth=1):
+    if(splitDepth not in range(1,5)):
+        msg = "In call to calcTableBase_Parallel(), splitDepth must be in [1,4]. " + \
+                "Received '{}'".format(splitDepth)
+        raise ValueError(msg)
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    openings = list(itertools.permutations(range(9), splitDepth))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_calcTableBase_SubTree, openings))
+    
+    # Merge in the order of the openings, so the result doesn't depend on the workers
+    TBase = dict()
+    vals = dict()
+    timings = []
+    for opening,codes,entries,val,secs,pid in results:
+        vals[opening] = val
+        timings.append((opening, secs, pid))
+        for N,e in zip(codes.tolist(), entries.tolist()):
+            if(N not in TBase):
+                TBase[N] = _unpackEntry(e)
+    
+    # No one can win within 4 moves, so every opening has all its moves
+    for depth in range(splitDepth-1, -1, -1):
+        for opening in itertools.permutations(range(9), depth):
+            tb = TicTacToeBitBoard()
+            for mv in opening:
+                tb.move(mv)
+            scores = {int(mv):-vals[opening+(int(mv),)] for mv in tb.possibleNextMoves()}
+            val = max(scores.values())
+            vals[opening] = val
+            
+            N = encode(tb, useSymmetry=True)[0]
+            if(N == tb.code and N not in TBase):
+                TBase[N] = [val] + [mv for mv in sorted(scores) if(scores[mv]==val)]
+    
+    return dict(sorted(TBase.items())), timings
+
+
+# Calculates the same TableBase as calcTableBase_MiniMax(), but by retrograde analysis:
+#   Every canonical position (see Rank.py) is evaluated exactly once, layer by 
+#   ... layer from the full boards back to the empty board. The evaluation of a 
+#   ... position is the best of the (negated) evaluations of the positions after 
+#   ... each of its moves, which are all in the layer after it.
+# Evaluations are stored for the player to move (1/0/-1 for win/draw/loss).
+def calcTableBase_Retrograde():
+    TBase = dict()
+    
+    codes = getCanonicalCodes()
+    vals = np.zeros(len(codes), dtype=np.int8)
+    boards = [decode(int(N)) for N in codes]
+    
+    layers = [[] for _ in range(10)]
+    for r,tb in enumerate(boards):
+        layers[len(tb.moveHistory)].append(r)
+        
+    for layer in reversed(layers):
+        for r in layer:
+            tb = boards[r]
+            if(tb.checkWin() != 0):      # The player to move has already lost
+                vals[r] = -1
+                continue
+            nextMoves = tb.possibleNextMoves()
+            if(len(nextMoves) == 0):    # A draw with a full board
+                vals[r] = 0
+                continue
+            
+            N = tb.code
+            scores = [-vals[canonicalRank(N + tb.nextTurn*3**int(mv))] for mv in nextMoves]
+            val = max(scores)
+            vals[r] = val
+            TBase[int(N)] = [int(val)] + [int(mv) for mv,sc in zip(nextMoves,scores) if(sc==val)]
+    
     return TBase
 
 
-# Out of the default table bases in _dataPthtoDefaultTableBases,
-#   ... load the ones that are available on the current system.
-def getAvailableTableBases():
+# Calculates the same TableBase as calcTableBase_Retrograde(), with array operations
+#   ... over the graph of all legal positions (see GameGraph.py), which solves all
+#   ... of them a layer at a time.
+def calcTableBase_GameGraph():
+    from GameGraph import solveAllPositions, getBestMoveMasks, getDepths
+    from Rank import legalRank
+
+    codes = getCanonicalCodes()
+    ranks = legalRank(codes)
+    masks = getBestMoveMasks()[ranks]
+    # Evaluations for the player to move, instead of for X
+    vals = solveAllPositions()[ranks] * np.where(getDepths()[ranks] % 2 == 0, 1, -1)
+
+    TBase = dict()
+    for N,val,mask in zip(codes.tolist(), vals.tolist(), masks.tolist()):
+        if(mask != 0):          # Positions where the game is over aren't stored
+            TBase[N] = [val] + [mv for mv in range(9) if((mask>>mv)&1)]
+    return TBase
+
+
+# Tablebases that can be calculated when their file isn't available
+_TableBaseCalculators = {
+                         'minimax-1' : calcTableBase_GameGraph
+                        }
+
+
+# Names of the default tablebases, in order of preference
+def getTableBaseNames():
+    return list(_getDataPathToDefaultTableBases().keys())
+
+
+# Load (only) the default tablebase called 'name', from the first of its files that exists.
+# If none of its files exist, but it can be calculated quickly (see 
+#   ... _TableBaseCalculators), then it is calculated instead.
+# Each tablebase is loaded once and then re-used.
+# Raises a FileNotFoundError if the tablebase is not available on the current system.
+def getTableBase(name):
     global _AvailabeTableBases
     if(_AvailabeTableBases is None):
-        tbPaths = _getDataPathToDefaultTableBases()
         _AvailabeTableBases = {}
-        for tbName in tbPaths.keys():
-            try:
-                tb = TableBase()
-                tb.load(tbPaths[tbName])
-                _AvailabeTableBases[tbName] = tb
-            except FileNotFoundError:
-                continue
-     
-    return _AvailabeTableBases
-    
\ No newline at end of file
+    if(name in _AvailabeTableBases):
+        return _AvailabeTableBases[name]
+    
+    tbPaths = _getDataPathToDefaultTableBases()
+    if(name not in tbPaths):
+        raise ValueError("Unknown tablebase '{}' in call to getTableBase()".format(name))
+    
+    for path in tbPaths[name]:
+        try:
+            tb = (BinaryTableBase() if(path.endswith('.npy')) else TableBase())
+            tb.load(path)
+            _AvailabeTableBases[name] = tb
+            return tb
+        except FileNotFoundError:
+            continue
+    if(name in _TableBaseCalculators):
+        tb = BinaryTableBase()
+        tb.setTable(_TableBaseCalculators[name]())
+        _AvailabeTableBases[name] = tb
+        return tb
+    
+    msg = "None of the files of the tablebase '{}' were found: {}".format(name, tbPaths[name])
+    raise FileNotFoundError(msg)
+
+
+# Out of the default table bases in _dataPthtoDefaultTableBases,
+#   ... load the ones that are available on the current system.
+# Use getTableBase() instead to load just one of them.
+def getAvailableTableBases():
+    ret = {}
+    for tbName in getTableBaseNames():
+        try:
+            ret[tbName] = getTableBase(tbName)
+        except FileNotFoundError:
+            continue
+    return ret
+    
+    
+# Convert a JSON tablebase into the binary format with:
+#       python TableBase.py --convert <tablebase.json> <tablebase.npy>
+# Calculate a tablebase with the minimax algorithm on many processes with:
+#       python TableBase.py --generate <tablebase.json|tablebase.npy> --workers 4
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Tools for TicTacToe tablebases")
+    parser.add_argument('--convert', nargs=2, metavar=('JSON', 'NPY'),
+                        help="convert the JSON tablebase into the binary format")
+    parser.add_argument('--generate', metavar='PATH',
+                        help="calculate the tablebase with minimax and save it " + 
+                             "(in the binary format if PATH ends with .npy)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes for --generate (default: all CPUs)")
+    parser.add_argument('--split-depth', type=int, default=1,
+                        help="split the game tree after this many moves for --generate (1-4)")
+    args = parser.parse_args()
+    
+    if(args.convert is not None):
+        btbase = convertJsonToBinary(*args.convert)
+        print("Converted {} positions into {}".format(
+                np.count_nonzero(btbase.getTable()), args.convert[1]))
+    
+    if(args.generate is not None):
+        t0 = time.perf_counter()
+        table,timings = calcTableBase_Parallel(workers=args.workers, splitDepth=args.split_depth)
+        wallTime = time.perf_counter() - t0
+        
+        tbase = (BinaryTableBase() if(args.generate.endswith('.npy')) else TableBase())
+        tbase.setTable(table)
+        tbase.save(args.generate)
+        
+        perWorker = dict()
+        for opening,secs,pid in timings:
+            cnt,total = perWorker.get(pid, (0,0.0))
+            perWorker[pid] = (cnt+1, total+secs)
+        for pid in sorted(perWorker):
+            print("Worker {:>7d}: {:3d} subtrees in {:7.2f}s".format(pid, *perWorker[pid]))
+        print("Saved {} positions into {} in {:.2f}s".format(len(table), args.generate, wallTime))
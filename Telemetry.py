@@ -0,0 +1,208 @@
+
+import bisect
+import threading
+
+
+#              Telemetry Concept
+#########################################################
+# An EngineStats collector can be attached to any TicTacToeEngine with
+#   ... engine.enableStats(). Every call to the engine's listBestMoves() (and so
+#   ... every bestMove()) is then recorded in it. Engines without a collector only
+#   ... check that 'engine.stats' is None, so they pay next to nothing.
+# Each call is recorded from a dict 'info' filled in by the search, with any of:
+#       'nodes'           : number of positions searched
+#       'backend'         : 'native', 'python', 'memo', 'tablebase' or 'random'
+#       'fallback'        : why the machine code couldn't be used, if the search
+#                           ... fell back to python
+#       'cacheHits'       : transposition table hits   (memoized searches)
+#       'cacheMisses'     : transposition table misses (memoized searches)
+#       'tablebaseHits'   : positions found in the tablebase
+#       'tablebaseMisses' : positions not found in the tablebase
+# Collectors keep counters (totals since they were made or reset) and histograms
+#   ... of the wall time and the nodes of each call, and can dump all of them
+#   ... in the Prometheus text format (see formatPrometheus()).
+# A collector may be shared by many engines and threads.
+
+
+
+
+#       Module-Scope Constants
+#########################################################
+# Upper bounds of the histogram buckets for the wall time of a call (in seconds)
+DefaultLatencyBuckets = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                         1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the histogram buckets for the nodes searched in a call
+DefaultNodeBuckets = (0, 1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# The counters of every collector, with their help text for Prometheus
+_CounterHelp = {
+                'calls'           : "Calls to listBestMoves()",
+                'nodes'           : "Positions searched",
+                'fallbacks'       : "Searches that fell back from machine code to python",
+                'cacheHits'       : "Transposition table hits",
+                'cacheMisses'     : "Transposition table misses",
+                'tablebaseHits'   : "Positions found in the tablebase",
+                'tablebaseMisses' : "Positions not found in the tablebase",
+                'errors'          : "Calls that raised an exception"
+               }
+#########################################################
+
+
+
+
+# A histogram with fixed buckets, like the Prometheus histogram type
+# counts[i] is the number of observations 'v' with buckets[i-1] < v <= buckets[i],
+#   ... and counts[-1] the number of those over the last bucket.
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0]*(len(self.buckets)+1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, v):
+        self.counts[bisect.bisect_left(self.buckets, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    # Returns a list of (upper bound, cumulative count) with float('inf') for the last bucket
+    def cumulativeCounts(self):
+        ret = []
+        total = 0
+        for le,c in zip(self.buckets + (float('inf'),), self.counts):
+            total += c
+            ret.append((le, total))
+        return ret
+
+    # Estimate the q-th quantile (0 <= q <= 1) as the upper bound of its bucket
+    def quantile(self, q):
+        if(self.count == 0):
+            return 0.0
+        for le,total in self.cumulativeCounts():
+            if(total >= q*self.count):
+                return le
+        return float('inf')
+
+    def snapshot(self):
+        return {'buckets': [[le,c] for le,c in self.cumulativeCounts()],
+                'sum': self.sum, 'count': self.count}
+
+
+# Collects the telemetry of one or more engines (see Telemetry Concept above)
+class EngineStats:
+    def __init__(self, name='engine', latencyBuckets=DefaultLatencyBuckets,
+                 nodeBuckets=DefaultNodeBuckets):
+        self.name = name
+        self.latencyBuckets = latencyBuckets
+        self.nodeBuckets = nodeBuckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {key:0 for key in _CounterHelp}
+            self.backends = {}
+            self.latency = Histogram(self.latencyBuckets)
+            self.nodes = Histogram(self.nodeBuckets)
+            self.lastFallback = None
+
+    # Record one call that took 'seconds', with the 'info' filled in by the search
+    def recordCall(self, seconds, info, error=False):
+        with self._lock:
+            c = self.counters
+            c['calls'] += 1
+            if(error):
+                c['errors'] += 1
+            self.latency.observe(seconds)
+
+            nodes = info.get('nodes')
+            if(nodes is not None):
+                c['nodes'] += nodes
+                self.nodes.observe(nodes)
+            backend = info.get('backend')
+            if(backend is not None):
+                self.backends[backend] = self.backends.get(backend, 0) + 1
+            if(info.get('fallback') is not None):
+                c['fallbacks'] += 1
+                self.lastFallback = info['fallback']
+            for key in ('cacheHits', 'cacheMisses', 'tablebaseHits', 'tablebaseMisses'):
+                c[key] += info.get(key, 0)
+
+    # All of the stats as a dict (that can be saved as JSON)
+    def snapshot(self):
+        with self._lock:
+            return {
+                    'name'         : self.name,
+                    'counters'     : dict(self.counters),
+                    'backends'     : dict(self.backends),
+                    'latency'      : self.latency.snapshot(),
+                    'nodes'        : self.nodes.snapshot(),
+                    'lastFallback' : self.lastFallback
+                   }
+
+    def toPrometheus(self, prefix='tictactoe_engine'):
+        return formatPrometheus([self], prefix)
+
+    # The lock can't be pickled (e.g. for a ProcessPoolExecutor), so it's made anew
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def _formatLabels(labels):
+    return '{' + ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                          for k,v in labels) + '}'
+
+def _formatNumber(v):
+    if(v == float('inf')):
+        return '+Inf'
+    return repr(v) if(isinstance(v, float)) else str(v)
+
+# Snake case of a counter's name, for the names of Prometheus metrics
+def _snakeCase(name):
+    return ''.join(('_' + ch.lower() if ch.isupper() else ch) for ch in name)
+
+
+# Dump the stats of many collectors in the Prometheus text exposition format
+# Each collector's metrics get the label engine="<its name>".
+def formatPrometheus(collectors, prefix='tictactoe_engine'):
+    snaps = [col.snapshot() for col in collectors]
+    lines = []
+
+    for key,help in _CounterHelp.items():
+        metric = '{}_{}_total'.format(prefix, _snakeCase(key))
+        lines.append('# HELP {} {}'.format(metric, help))
+        lines.append('# TYPE {} counter'.format(metric))
+        for snap in snaps:
+            lines.append('{}{} {}'.format(metric, _formatLabels([('engine', snap['name'])]),
+                                          snap['counters'][key]))
+
+    metric = '{}_backend_calls_total'.format(prefix)
+    lines.append('# HELP {} Calls answered by each backend'.format(metric))
+    lines.append('# TYPE {} counter'.format(metric))
+    for snap in snaps:
+        for backend,n in sorted(snap['backends'].items()):
+            lines.append('{}{} {}'.format(metric, _formatLabels([('engine', snap['name']),
+                                                                 ('backend', backend)]), n))
+
+    for hname,unit,help in (('latency', '_seconds', "Wall time of calls to listBestMoves()"),
+                            ('nodes', '', "Positions searched in each call")):
+        metric = '{}_{}{}'.format(prefix, hname, unit)
+        lines.append('# HELP {} {}'.format(metric, help))
+        lines.append('# TYPE {} histogram'.format(metric))
+        for snap in snaps:
+            h = snap[hname]
+            for le,c in h['buckets']:
+                labels = _formatLabels([('engine', snap['name']), ('le', _formatNumber(float(le)))])
+                lines.append('{}_bucket{} {}'.format(metric, labels, c))
+            labels = _formatLabels([('engine', snap['name'])])
+            lines.append('{}_sum{} {}'.format(metric, labels, _formatNumber(h['sum'])))
+            lines.append('{}_count{} {}'.format(metric, labels, h['count']))
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,3 @@
+# Benchmarks of the project. Run all of them (from the project's root directory) with:
+#       python -m bench
+# See bench/benchSuite.py for the suite, and bench/__main__.py for its options.
@@ -0,0 +1,83 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run 'python -m bench' from the project's root directory. " + \
+            "Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+import sys
+sys.path.insert(0, os.getcwd())
+#########################################################################
+
+
+import argparse
+
+from bench.benchSuite import runSuite, compareWithBaseline, saveResults, loadResults
+from bench.benchSuite import getBenchmarkNames, formatSeconds, _defaultThreshold
+
+
+_defaultBaselinePath = os.path.join('bench', 'baseline.json')
+
+
+# Run the benchmarks, save the results and compare them with the baseline:
+#       python -m bench                          (all, compared with bench/baseline.json)
+#       python -m bench --filter minimax --skip-slow
+#       python -m bench --output results.json --baseline old-results.json --threshold 0.1
+#       python -m bench --save-baseline          (store the results as the new baseline)
+# Exits with 1 if any benchmark regressed against the baseline.
+def main():
+    parser = argparse.ArgumentParser(prog='python -m bench', description="TicTacToe benchmark suite")
+    parser.add_argument('--filter', action='append', default=None, metavar='TEXT',
+                        help="only run benchmarks whose names contain TEXT (may be repeated)")
+    parser.add_argument('--skip-slow', action='store_true',
+                        help="leave out the benchmarks that take many seconds")
+    parser.add_argument('--list', action='store_true', help="list the benchmarks and exit")
+    parser.add_argument('--output', default=None, metavar='PATH',
+                        help="save the results as JSON to PATH")
+    parser.add_argument('--baseline', default=_defaultBaselinePath, metavar='PATH',
+                        help="compare with the results in PATH (default: {})".format(_defaultBaselinePath))
+    parser.add_argument('--threshold', type=float, default=_defaultThreshold,
+                        help="fraction of slow-down counted as a regression (default: {})".format(
+                                _defaultThreshold))
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="save the results as the baseline instead of comparing with it")
+    parser.add_argument('--min-time', type=float, default=0.1,
+                        help="seconds that each timed loop should take at least (default: 0.1)")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="number of timed loops of each benchmark (default: 5)")
+    args = parser.parse_args()
+
+    if(args.list):
+        print("\n".join(getBenchmarkNames()))
+        return 0
+
+    results = runSuite(args.filter, args.skip_slow, args.min_time, args.repeat)
+    if(args.output is not None):
+        saveResults(results, args.output)
+    if(args.save_baseline):
+        saveResults(results, args.baseline)
+        print("\nSaved the baseline to {}".format(args.baseline))
+        return 0
+
+    try:
+        baseline = loadResults(args.baseline)
+    except FileNotFoundError:
+        print("\nNo baseline at {}; nothing to compare with".format(args.baseline))
+        return 0
+
+    print("\nCompared with {} (from {} on {}):".format(args.baseline, 
+            baseline['meta'].get('timestamp'), baseline['meta'].get('platform')))
+    regressed = 0
+    for name,old,new,ratio,isRegression in compareWithBaseline(results, baseline, args.threshold):
+        print("{:36s} {:>12s} -> {:>12s}  {:6.2f}x{}".format(name, formatSeconds(old), 
+                formatSeconds(new), ratio, ("  REGRESSION" if isRegression else "")))
+        regressed += isRegression
+    if(regressed):
+        print("\n{} benchmark(s) regressed".format(regressed))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run benchmarks from the project's root directory or" + \
+            "the /bench directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+import sys
+sys.path.insert(0, os.getcwd())
+#########################################################################
+
+
+import time
+
+from Board import TicTacToeBoard, TicTacToeBitBoard
+from MiniMax import minimax_AlphaBetaPruning
+from Helper import generateAllPossibleContinuations
+
+
+# Time the minimax search with pruning from the empty board
+# Returns (nodes searched, seconds taken)
+def bMiniMaxPruning(boardClass):
+    tb = boardClass()
+    t0 = time.perf_counter()
+    _,cnt = minimax_AlphaBetaPruning(tb)
+    return cnt, time.perf_counter()-t0
+
+
+# Time a walk over the full game tree after the first move at 'firstMove'
+# Every node is visited by move(), checkWin() and undoLastMove()
+# Returns (nodes visited, seconds taken)
+def bTreeWalk(boardClass, firstMove=4):
+    tb = boardClass()
+    tb.move(firstMove)
+    cnt = 0
+    t0 = time.perf_counter()
+    for nxt in generateAllPossibleContinuations(tb):
+        nxt.checkWin()
+        cnt += 1
+    return cnt, time.perf_counter()-t0
+
+
+def runBenchmarks():
+    for bname,bfn in [('minimax_AlphaBetaPruning', bMiniMaxPruning),
+                      ('generateAllPossibleContinuations', bTreeWalk)]:
+        rates = {}
+        for boardClass in (TicTacToeBoard, TicTacToeBitBoard):
+            cnt,secs = bfn(boardClass)
+            rates[boardClass] = cnt/secs
+            print("{:34s} {:18s} {:8d} nodes in {:7.3f}s = {:10.0f} nodes/s".format(
+                    bname, boardClass.__name__, cnt, secs, cnt/secs))
+        print("{:34s} speedup of TicTacToeBitBoard: {:.1f}X\n".format(
+                bname, rates[TicTacToeBitBoard]/rates[TicTacToeBoard]))
+
+
+if __name__ == '__main__':
+    runBenchmarks()
@@ -0,0 +1,78 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run benchmarks from the project's root directory or" + \
+            "the /bench directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+import sys
+import subprocess
+
+
+# Modules that must not be imported just by importing the entry module, 
+#   ... since they are only needed for minimax search or generating tablebases
+_deferredModules = ('tqdm', 'json', 'concurrent.futures', 'MiniMax', 'MachineCode')
+
+# Time budget (in milliseconds) for importing the entry module, on top of numpy
+_defaultBudgetMs = 40
+
+
+# Import 'module' in a fresh python process with 'python -X importtime'
+# Returns a dict mapping each imported module to its cumulative import time in microseconds
+def measureImportTime(module='Play'):
+    cmd = [sys.executable, '-X', 'importtime', '-c', 'import {}'.format(module)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    
+    ret = {}
+    for line in proc.stderr.splitlines():
+        if(not line.startswith('import time:') or 'cumulative' in line):
+            continue
+        selfTime,cumulative,name = line[len('import time:'):].split('|')
+        ret[name.strip()] = int(cumulative)
+    return ret
+
+
+# Check that importing 'module' stays within the time budget and that it
+#   ... doesn't import any of the deferred modules.
+# Returns True if there is no regression.
+def runBenchmark(module='Play', budgetMs=_defaultBudgetMs, repeat=5):
+    # The best of a few runs, since the first runs also warm up the disk cache
+    runs = [measureImportTime(module) for _ in range(repeat)]
+    best = min(runs, key=lambda times: times[module])
+    
+    totalMs = best[module]/1000
+    numpyMs = best.get('numpy', 0)/1000
+    ownMs = totalMs - numpyMs
+    print("import {}: {:.1f} ms in total, {:.1f} ms for numpy, {:.1f} ms for the rest (budget: {} ms)".format(
+            module, totalMs, numpyMs, ownMs, budgetMs))
+    
+    # The slowest imports, leaving out the ones inside numpy
+    slowest = sorted((t,name) for name,t in best.items() 
+                        if(name != module and not name.startswith('numpy.')))[::-1][:10]
+    for t,name in slowest:
+        print("  {:8.1f} ms  {}".format(t/1000, name))
+    
+    ok = True
+    imported = [name for name in _deferredModules if(name in best)]
+    if(len(imported) > 0):
+        print("REGRESSION: importing {} also imports {}".format(module, imported))
+        ok = False
+    if(ownMs > budgetMs):
+        print("REGRESSION: importing {} took {:.1f} ms over the budget".format(module, ownMs-budgetMs))
+        ok = False
+    return ok
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Import-time regression benchmark")
+    parser.add_argument('--module', default='Play')
+    parser.add_argument('--budget-ms', type=float, default=_defaultBudgetMs)
+    args = parser.parse_args()
+    sys.exit(0 if runBenchmark(args.module, args.budget_ms) else 1)
@@ -0,0 +1,348 @@
+
+import os
+import sys
+import time
+import json
+import platform
+import datetime
+import subprocess
+import numpy as np
+
+
+#              Benchmark Suite Concept
+#########################################################
+# Every hot path of the project has a benchmark, registered in _Benchmarks below.
+# A benchmark is a function that does its setup and returns a callable with no
+#   ... arguments, which is the code to time.
+# Each callable is called in a loop of 'loops' calls, where 'loops' is chosen so
+#   ... that the loop takes at least 'minTime' seconds, and the loop is repeated
+#   ... 'repeat' times. The time per call of the fastest loop is the result, since
+#   ... the slower loops were only slowed down by other things running.
+# Benchmarks marked 'slow' run a single call, once.
+# Benchmarks marked 'selfTimed' return callables that measure themselves and return
+#   ... the time in seconds (e.g. import times measured in a fresh process).
+#
+# Results are saved as JSON:
+#       {
+#        "meta"    : {python, numpy, platform, cpu, git commit, machine code backend, ...},
+#        "results" : {name: {"seconds": s, "median": s, "loops": n, "repeat": r}, ...}
+#       }
+# where "seconds" is the best time per call and "median" the median over the repeats.
+# A comparison with a baseline (results saved earlier) finds every benchmark that
+#   ... became slower by more than its threshold (a fraction, e.g. 0.5 for 50%).
+
+
+
+
+#       Module-Scope Variables (a.k.a globals)
+#########################################################
+# List of (name, makeFn, options) for each benchmark, in the order that they run
+_Benchmarks = []
+
+# Default regression threshold, as a fraction of the baseline's time
+_defaultThreshold = 0.5
+#########################################################
+
+
+# Decorator to register a benchmark
+# options:  slow       : run a single call once
+#           selfTimed  : the callable returns its own time in seconds
+#           threshold  : the regression threshold for this benchmark
+def benchmark(name, **options):
+    def register(makeFn):
+        _Benchmarks.append((name, makeFn, options))
+        return makeFn
+    return register
+
+def getBenchmarkNames():
+    return [name for name,_,_ in _Benchmarks]
+
+
+# Time the callable 'fn' (see Benchmark Suite Concept above)
+# Returns a dict with "seconds", "median", "loops" and "repeat"
+def timeCallable(fn, minTime=0.1, repeat=5, slow=False, selfTimed=False):
+    if(slow):
+        repeat = 1
+    if(selfTimed):
+        times = [fn() for _ in range(repeat)]
+        return {'seconds': min(times), 'median': float(np.median(times)),
+                'loops': 1, 'repeat': repeat}
+
+    loops = 1
+    if(not slow):
+        # Grow the loop until it takes long enough, like timeit's autorange()
+        while(True):
+            t0 = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            if(time.perf_counter() - t0 >= minTime):
+                break
+            loops *= 2
+
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        times.append((time.perf_counter() - t0)/loops)
+    return {'seconds': min(times), 'median': float(np.median(times)),
+            'loops': loops, 'repeat': repeat}
+
+
+# Environment of the benchmarks, saved along with the results
+def getMetadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    from MachineCode import getBackendInfo
+    backend = getBackendInfo()
+    return {
+            'timestamp'      : datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python'         : platform.python_version(),
+            'implementation' : platform.python_implementation(),
+            'numpy'          : np.__version__,
+            'platform'       : platform.platform(),
+            'machine'        : platform.machine(),
+            'processor'      : platform.processor(),
+            'cpuCount'       : os.cpu_count(),
+            'gitCommit'      : commit,
+            'backend'        : backend['backend'],
+            'backendVersion' : backend['version']
+           }
+
+
+# Run the benchmarks whose names contain any of 'filters' (all if None)
+# Leaves out the slow ones if skipSlow=True. Prints each result if verbose=True.
+# Returns the dict that is saved as JSON (see Benchmark Suite Concept above)
+def runSuite(filters=None, skipSlow=False, minTime=0.1, repeat=5, verbose=True):
+    results = {}
+    for name,makeFn,options in _Benchmarks:
+        if(filters and not any(f in name for f in filters)):
+            continue
+        if(skipSlow and options.get('slow', False)):
+            continue
+        fn = makeFn()
+        res = timeCallable(fn, minTime, repeat, options.get('slow', False),
+                           options.get('selfTimed', False))
+        results[name] = res
+        if(verbose):
+            print("{:36s} {:>12s} per call  ({} x {} calls)".format(
+                    name, formatSeconds(res['seconds']), res['repeat'], res['loops']))
+            sys.stdout.flush()
+    return {'meta': getMetadata(), 'results': results}
+
+
+def formatSeconds(secs):
+    for unit,scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if(secs >= scale):
+            return "{:.3f} {}".format(secs/scale, unit)
+    return "{:.1f} ns".format(secs/1e-9)
+
+
+# Compare the results of runSuite() with a baseline (results of an earlier run)
+# 'threshold' is the default regression threshold, used for benchmarks that don't set their own
+# Returns a list of (name, baselineSeconds, seconds, ratio, regressed) for each benchmark in both
+def compareWithBaseline(results, baseline, threshold=_defaultThreshold):
+    thresholds = {name:options.get('threshold', threshold) for name,_,options in _Benchmarks}
+    ret = []
+    for name,res in results['results'].items():
+        if(name not in baseline['results']):
+            continue
+        old = baseline['results'][name]['seconds']
+        ratio = (res['seconds']/old if(old > 0) else float('inf'))
+        ret.append((name, old, res['seconds'], ratio, ratio > 1 + thresholds.get(name, threshold)))
+    return ret
+
+
+def saveResults(results, fpath):
+    with open(fpath, 'w') as jfile:
+        json.dump(results, jfile, indent=2, sort_keys=True)
+
+def loadResults(fpath):
+    with open(fpath, 'r') as jfile:
+        return json.load(jfile)
+
+
+
+
+#                   The Benchmarks
+###############################################################################
+# Positions used by many benchmarks: the empty board, and one after a few moves
+def _positions(boardClass):
+    empty = boardClass()
+    mid = boardClass()
+    for mv in (4, 0, 8, 2):
+        mid.move(mv)
+    return empty, mid
+
+
+def _makeCheckWin(boardClass):
+    tb = _positions(boardClass)[1]
+    return tb.checkWin
+
+def _makeMoveUndo(boardClass):
+    tb = _positions(boardClass)[1]
+    def fn():
+        tb.move(1)
+        tb.undoLastMove()
+    return fn
+
+@benchmark('board.checkWin')
+def bBoardCheckWin():
+    from Board import TicTacToeBoard
+    return _makeCheckWin(TicTacToeBoard)
+
+@benchmark('bitboard.checkWin')
+def bBitBoardCheckWin():
+    from Board import TicTacToeBitBoard
+    return _makeCheckWin(TicTacToeBitBoard)
+
+@benchmark('board.moveUndo')
+def bBoardMoveUndo():
+    from Board import TicTacToeBoard
+    return _makeMoveUndo(TicTacToeBoard)
+
+@benchmark('bitboard.moveUndo')
+def bBitBoardMoveUndo():
+    from Board import TicTacToeBitBoard
+    return _makeMoveUndo(TicTacToeBitBoard)
+
+# The walk over the game tree of bench/benchBoard.py
+@benchmark('bitboard.treeWalk')
+def bBitBoardTreeWalk():
+    from Board import TicTacToeBitBoard
+    from bench.benchBoard import bTreeWalk
+    return lambda: bTreeWalk(TicTacToeBitBoard)
+
+
+@benchmark('encode.plain')
+def bEncodePlain():
+    from Board import TicTacToeBoard
+    from Encode import encode
+    tb = _positions(TicTacToeBoard)[1]
+    return lambda: encode(tb, useSymmetry=False)
+
+@benchmark('encode.symmetry')
+def bEncodeSymmetry():
+    from Board import TicTacToeBoard
+    from Encode import encode
+    tb = _positions(TicTacToeBoard)[1]
+    return lambda: encode(tb, useSymmetry=True)
+
+@benchmark('encode.lookUpSymTable')
+def bLookUpSymTable():
+    from Encode import lookUpSymTable
+    lookUpSymTable(0)
+    return lambda: lookUpSymTable(12345)
+
+
+# minimax() without pruning is too slow in python from the empty board
+@benchmark('minimax.python')
+def bMiniMaxPython():
+    from Board import TicTacToeBitBoard
+    from MiniMax import minimax
+    tb = TicTacToeBitBoard()
+    tb.move(4)
+    tb.move(0)
+    return lambda: minimax(tb)
+
+@benchmark('minimax.pruning')
+def bMiniMaxPruning():
+    from Board import TicTacToeBitBoard
+    from MiniMax import minimax_AlphaBetaPruning
+    tb = TicTacToeBitBoard()
+    return lambda: minimax_AlphaBetaPruning(tb)
+
+@benchmark('minimax.negamax')
+def bMiniMaxNegamax():
+    from Board import TicTacToeBitBoard
+    from MiniMax import minimax_Negamax
+    tb = TicTacToeBitBoard()
+    return lambda: minimax_Negamax(tb)
+
+@benchmark('minimax.native')
+def bMiniMaxNative():
+    from Board import TicTacToeBoard
+    from MachineCode import run_minimax
+    tb = TicTacToeBoard()
+    return lambda: run_minimax(tb, pruning=False)
+
+@benchmark('minimax.nativePruning')
+def bMiniMaxNativePruning():
+    from Board import TicTacToeBoard
+    from MachineCode import run_minimax
+    tb = TicTacToeBoard()
+    return lambda: run_minimax(tb, pruning=True)
+
+@benchmark('minimax.nativeNegamax')
+def bMiniMaxNativeNegamax():
+    from Board import TicTacToeBoard
+    from MachineCode import run_minimax
+    tb = TicTacToeBoard()
+    return lambda: run_minimax(tb, pruning='negamax')
+
+
+@benchmark('engine.minimax.bestMove')
+def bMiniMaxEngine():
+    from Board import TicTacToeBoard
+    from Engine import MiniMaxEngine
+    eng = MiniMaxEngine(randomSeed=0)
+    tb = TicTacToeBoard()
+    return lambda: eng.bestMove(tb)
+
+@benchmark('engine.tablebase.bestMove')
+def bTableBaseEngine():
+    from Board import TicTacToeBoard
+    from Engine import TableBaseEngine
+    from TableBase import getTableBase
+    eng = TableBaseEngine(getTableBase('minimax-1'), randomSeed=0)
+    tb = _positions(TicTacToeBoard)[1]
+    return lambda: eng.bestMove(tb)
+
+
+@benchmark('tablebase.loadJson')
+def bTableBaseLoadJson():
+    from TableBase import TableBase
+    from Helper import extendRootPath
+    fpath = extendRootPath('data', 'TableBase_MiniMax-1.json')
+    return lambda: TableBase().load(fpath)
+
+@benchmark('tablebase.loadBinary')
+def bTableBaseLoadBinary():
+    from TableBase import BinaryTableBase
+    from Helper import extendRootPath
+    fpath = extendRootPath('data', 'TableBase_MiniMax-1.npy')
+    return lambda: BinaryTableBase().load(fpath)
+
+@benchmark('tablebase.calcRetrograde')
+def bCalcTableBaseRetrograde():
+    from TableBase import calcTableBase_Retrograde
+    return calcTableBase_Retrograde
+
+@benchmark('tablebase.calcGameGraph')
+def bCalcTableBaseGameGraph():
+    from TableBase import calcTableBase_GameGraph
+    return calcTableBase_GameGraph
+
+@benchmark('tablebase.calcMiniMax', slow=True)
+def bCalcTableBaseMiniMax():
+    from TableBase import calcTableBase_MiniMax
+    return lambda: calcTableBase_MiniMax(progress=False)
+
+
+@benchmark('simulate.batchGames')
+def bBatchGames():
+    from Simulate import runBatchMatch, makeBatchPolicy
+    pol1,pol2 = makeBatchPolicy('tablebase'),makeBatchPolicy('random')
+    return lambda: runBatchMatch(pol1, pol2, 1<<14, seed=0)
+
+
+# Import time of Play.py in a fresh process (see bench/benchImportTime.py)
+# Imports vary a lot more from run to run than the other benchmarks.
+@benchmark('import.Play', selfTimed=True, threshold=1.0)
+def bImportPlay():
+    from bench.benchImportTime import measureImportTime
+    return lambda: measureImportTime('Play')['Play'] / 1e6
+###############################################################################
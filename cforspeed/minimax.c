@@ -2,6 +2,10 @@
 #include <stdlib.h>
 #include <stdio.h>
 
+// Bump this whenever the functions called from python change.
+// MachineCode.py refuses to load a library whose version doesn't match this file.
+#define MINIMAX_LIB_VERSION 5
+
 #define Xwins   (1)
 #define Draw    (0)
 #define Ywins   (-1)
@@ -15,20 +19,26 @@ typedef struct {
 } Tboard;
 
 
-int move(Tboard *tb, int pos) {
+void move(Tboard *tb, int pos) {
 	tb->B[pos] = tb->nextTurn;
 	tb->nextTurn = ((tb->nextTurn == tb->Xmark) ? (tb->Ymark) : (tb->Xmark));
 }
 
-int undoMove(Tboard *tb, int pos) {
+void undoMove(Tboard *tb, int pos) {
 	tb->B[pos] = 0;
 	tb->nextTurn = ((tb->nextTurn == tb->Xmark) ? (tb->Ymark) : (tb->Xmark));
 }
 
 
-// Can be called from python module. Arguments passed must be of python type: "bytes"
-// The first argument must be a T-board, construct it using "bytes(tb.board)" where tb is a python TicTacToeBoard object
-int checkWin(int* B) {
+// Can be called from python module. Returns MINIMAX_LIB_VERSION of the compiled library
+int minimax_LibVersion(void) {
+	return MINIMAX_LIB_VERSION;
+}
+
+
+// Can be called from python module. The argument must be an array of 9 C ints (ctypes.c_int * 9)
+// Returns 1 if either player has a 3-in-a-row, otherwise returns 0
+int checkWin(const int* B) {
 	
 	// First Row
 	if(B[0] != 0   &&  B[1]==B[0]  &&  B[2]==B[0])
@@ -66,7 +76,7 @@ int checkWin(int* B) {
 }
 	
 	
-int minimax_AlphaBetaPruning(Tboard *tb, int XgotDraw, int YgotDraw, int *cnt) {
+int minimax_AlphaBetaPruning(Tboard *tb, int XgotDraw, int YgotDraw, unsigned long long *cnt) {
 	(*cnt)++;
 	
 	int atLeastOneMove = 0;
@@ -128,7 +138,7 @@ int minimax_AlphaBetaPruning(Tboard *tb, int XgotDraw, int YgotDraw, int *cnt) {
 		
 }
 
-int minimax(Tboard *tb, int *cnt) {
+int minimax(Tboard *tb, unsigned long long *cnt) {
 	(*cnt)++;
 	
 	int foundDraw = 0;
@@ -186,63 +196,206 @@ int minimax(Tboard *tb, int *cnt) {
 		
 }
 
-// Called from python module. Arguments passed must be of python types: "bytes", "int", "int", "int", "bytes"
-// The first argument must be a T-board, construct it using "bytes(tb.board)" where tb is a python TicTacToeBoard object
-int run_Minimax(unsigned char* brd, int nextTurn, int Xmark,  int Ymark, unsigned char *count) {
+
+// The cells of each 3-in-a-row, in the same order as checkWin()
+static const int winLines[8][3] = {
+	{0,1,2}, {3,4,5}, {6,7,8},
+	{0,3,6}, {1,4,7}, {2,5,8},
+	{0,4,8}, {2,4,6}
+};
+
+// The order in which negamax() tries the moves: centre, corners, then edges
+static const int moveOrder[9] = {4, 0,2,6,8, 1,3,5,7};
+
+// Writes to cells[] each empty cell where 'mark' would complete a 3-in-a-row
+// Returns the number of such cells (each cell is counted once)
+int threatCells(const int *B, int mark, int *cells) {
+	int n = 0;
+	for(int l=0; l<8; l++) {
+		const int *line = winLines[l];
+		int marks = 0, empty = -1;
+		for(int j=0; j<3; j++) {
+			if(B[line[j]] == mark)
+				marks++;
+			else if(B[line[j]] == 0)
+				empty = line[j];
+		}
+		if(marks == 2 && empty >= 0) {
+			int seen = 0;
+			for(int k=0; k<n; k++)
+				seen |= (cells[k] == empty);
+			if(!seen)
+				cells[n++] = empty;
+		}
+	}
+	return n;
+}
+
+// Negamax with alpha-beta bounds and move ordering
+// Returns the evaluation for the player to move: 1/0/-1 for a win/draw/loss
+// The position must not be won already.
+//    If the player to move can complete a 3-in-a-row, that's a win right away.
+//    If the other player threatens to complete two, they can't both be blocked.
+//    If the other player threatens to complete one, only the block is searched.
+//    Otherwise the moves are tried in the order of moveOrder[].
+int negamax(Tboard *tb, int alpha, int beta, unsigned long long *cnt) {
+	(*cnt)++;
 	
-	Tboard *tb = (Tboard *) malloc(sizeof(Tboard));
+	int me = tb->nextTurn;
+	int other = ((me == tb->Xmark) ? (tb->Ymark) : (tb->Xmark));
+	int cells[9];
 	
-	tb->Xmark     =  Xmark;
-	tb->Ymark     =  Ymark;
-	tb->nextTurn  =  nextTurn;
+	if(threatCells(tb->B, me, cells) > 0)
+		return 1;
 	
-	tb->B = (int *) calloc(9,sizeof(int));
-	for(int i=0; i<9; i++)
-		tb->B[i] = (int) brd[i];
+	int moves[9];
+	int n = 0;
+	int nBlocks = threatCells(tb->B, other, cells);
+	if(nBlocks >= 2)
+		return -1;
+	else if(nBlocks == 1)
+		moves[n++] = cells[0];
+	else {
+		for(int i=0; i<9; i++)
+			if(tb->B[moveOrder[i]] == 0)
+				moves[n++] = moveOrder[i];
+	}
 	
-	int *cnt = (int *) malloc(sizeof(int));
-	*cnt = 0;
+	if(n == 0)
+		return Draw;
 	
-	int ret = minimax(tb, cnt);
+	int best = -1;
+	for(int k=0; k<n; k++) {
+		move(tb, moves[k]);
+		int Z = -negamax(tb, -beta, -alpha, cnt);
+		undoMove(tb, moves[k]);
+		
+		if(Z > best)
+			best = Z;
+		if(best > alpha)
+			alpha = best;
+		if(alpha >= beta)
+			break;
+	}
+	return best;
+}
+
+
+// Search modes of searchRoot(); 'pruning' in the functions called from python is one of these
+#define MODE_MINIMAX  0
+#define MODE_PRUNING  1
+#define MODE_NEGAMAX  2
+
+// Evaluate the position in tb with minimax (w/ or w/o pruning) or negamax (see above)
+// Unlike minimax(), also handles a position that is already won
+int searchRoot(Tboard *tb, int pruning, unsigned long long *cnt) {
+	if(checkWin(tb->B)) {
+		(*cnt)++;
+		// Only the player who made the last move can have a 3-in-a-row
+		return (  ((tb->nextTurn) == (tb->Xmark)) ? (Ywins) : (Xwins)  );
+	}
+	if(pruning == MODE_NEGAMAX) {
+		int Z = negamax(tb, Ywins, Xwins, cnt);
+		return (  ((tb->nextTurn) == (tb->Xmark)) ? (Z) : (-Z)  );
+	}
+	if(pruning)
+		return minimax_AlphaBetaPruning(tb, 0, 0, cnt);
+	else
+		return minimax(tb, cnt);
+}
+
+
+// Called from python module. The arguments must be of ctypes types:
+//      (c_ubyte * 9), c_int, c_int, c_int, POINTER(c_uint64)
+// The first argument is the board vector of a python TicTacToeBoard object (one byte per cell)
+// The number of nodes searched is written to *count
+int run_Minimax(const unsigned char* brd, int nextTurn, int Xmark,  int Ymark, unsigned long long *count) {
 	
-	(*count) = (unsigned char) (*cnt/256);
-	count++;
-	(*count) = (unsigned char) (*cnt%256);
+	int B[9];
+	for(int i=0; i<9; i++)
+		B[i] = (int) brd[i];
 	
-	free(tb->B);
-	free(tb);
-	free(cnt);
+	Tboard tb = {B, Xmark, Ymark, nextTurn};
 	
-	return ret;
+	*count = 0;
+	return searchRoot(&tb, MODE_MINIMAX, count);
 }
 
-// Called from python module. Arguments passed must be of python types: "bytes", "int", "int", "int", "bytes"
-// The first argument must be a T-board, construct it using "bytes(tb.board)" where tb is a python TicTacToeBoard object
-int run_Minimax_Pruning(unsigned char* brd, int nextTurn, int Xmark,  int Ymark, unsigned char *count) {
+// Called from python module. Same arguments as run_Minimax()
+int run_Minimax_Pruning(const unsigned char* brd, int nextTurn, int Xmark,  int Ymark, unsigned long long *count) {
 	
-	Tboard *tb = (Tboard *) malloc(sizeof(Tboard));
+	int B[9];
+	for(int i=0; i<9; i++)
+		B[i] = (int) brd[i];
 	
-	tb->Xmark     =  Xmark;
-	tb->Ymark     =  Ymark;
-	tb->nextTurn  =  nextTurn;
+	Tboard tb = {B, Xmark, Ymark, nextTurn};
 	
-	tb->B = (int *) calloc(9,sizeof(int));
-	for(int i=0; i<9; i++)
-		tb->B[i] = (int) brd[i];
+	*count = 0;
+	return searchRoot(&tb, MODE_PRUNING, count);
+}
+
+// Called from python module. Same arguments as run_Minimax(), but searches with negamax()
+int run_Negamax(const unsigned char* brd, int nextTurn, int Xmark,  int Ymark, unsigned long long *count) {
 	
-	int *cnt = (int *) malloc(sizeof(int));
-	*cnt = 0;
+	int B[9];
+	for(int i=0; i<9; i++)
+		B[i] = (int) brd[i];
 	
-	int ret = minimax_AlphaBetaPruning(tb, 0, 0, cnt);
+	Tboard tb = {B, Xmark, Ymark, nextTurn};
 	
-	(*count) = (unsigned char) (*cnt/256);
-	count++;
-	(*count) = (unsigned char) (*cnt%256);
+	*count = 0;
+	return searchRoot(&tb, MODE_NEGAMAX, count);
+}
+
+// Called from python module. Evaluates every next move of the board in one call.
+// The arguments must be of ctypes types:
+//      (c_ubyte * 9), c_int, c_int, c_int, c_int, (c_byte * 9), POINTER(c_uint64)
+// 'pruning' is the search mode: MODE_MINIMAX, MODE_PRUNING or MODE_NEGAMAX
+// All the buffers are owned by the caller and nothing is allocated here.
+// For all positions 'i' in [0-8], writes to scores[i]:
+//      the evaluation of the board after playing the next move at 'i'
+//      8 if the next move can't be played at 'i'
+// The total number of nodes searched is written to *count
+void run_MinimaxEvals(const unsigned char* brd, int nextTurn, int Xmark,  int Ymark, int pruning, 
+                      signed char *scores, unsigned long long *count) {
+	
+	int B[9];
+	for(int i=0; i<9; i++)
+		B[i] = (int) brd[i];
 	
-	free(tb->B);
-	free(tb);
-	free(cnt);
+	Tboard tb = {B, Xmark, Ymark, nextTurn};
 	
-	return ret;
+	*count = 0;
+	for(int mv=0; mv<9; mv++) {
+		if(B[mv] != 0) {
+			scores[mv] = 8;
+			continue;
+		}
+		move(&tb, mv);
+		scores[mv] = (signed char) searchRoot(&tb, pruning, count);
+		undoMove(&tb, mv);
+	}
 }
 
+// Called from python module. Evaluates 'n' boards in one call.
+// The arguments must be of ctypes types (the arrays can be C-contiguous numpy arrays):
+//      (c_ubyte * 9n), (c_int * n), c_int, c_int, c_int, c_int, (c_byte * n), (c_uint64 * n)
+// 'pruning' is the search mode, as in run_MinimaxEvals()
+// Board 'k' is stored in boards[9k : 9k+9] and its next turn is nextTurns[k]
+// For each board 'k', writes to evals[k] its evaluation (same as run_Minimax())
+//      ... and to counts[k] the number of nodes searched
+void run_MinimaxBatch(const unsigned char* boards, const int *nextTurns, int n, int Xmark, int Ymark, 
+                      int pruning, signed char *evals, unsigned long long *counts) {
+	
+	int B[9];
+	Tboard tb = {B, Xmark, Ymark, 0};
+	
+	for(int k=0; k<n; k++) {
+		for(int i=0; i<9; i++)
+			B[i] = (int) boards[9*k + i];
+		tb.nextTurn = nextTurns[k];
+		
+		counts[k] = 0;
+		evals[k] = (signed char) searchRoot(&tb, pruning, &counts[k]);
+	}
+}
@@ -0,0 +1,91 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run tests from the project's root directory or" + \
+            "the /test directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+import numpy as np
+
+from Board import TicTacToeBitBoard
+from BatchBoard import TicTacToeBoardBatch, BatchPolicy, RandomBatchPolicy, TableBaseBatchPolicy
+from Engine import TableBaseEngine
+from TableBase import getTableBase
+from Simulate import runBatchMatch
+
+
+# Check that the batch agrees with T-Boards on codes, wins and legal moves
+def tBatchMatchesBoard():
+    batch = TicTacToeBoardBatch(2000)
+    pol = RandomBatchPolicy(randomSeed=0)
+    while(not batch.isOver()):
+        batch.move(pol.chooseMoves(batch))
+        legal = batch.legalMoveMask()
+        wins = batch.checkWin()
+        for g in range(0, len(batch), 7):
+            tb = batch.getBoard(g, TicTacToeBitBoard)
+            if(tb.code != batch.codes[g] or tb.checkWin() != wins[g] or wins[g] != batch.winner[g]):
+                return False
+            moves = (tb.possibleNextMoves() if(not batch.done[g]) else [])
+            if(list(np.flatnonzero(legal[g])) != list(moves)):
+                return False
+    return True
+
+
+# Check that the tablebase policy only picks the moves that TableBaseEngine lists as best
+def tTableBaseBatchPolicy():
+    tbase = getTableBase('minimax-1')
+    eng = TableBaseEngine(tbase)
+    batch = TicTacToeBoardBatch(500)
+    pol = TableBaseBatchPolicy(tbase, randomSeed=0)
+    rnd = RandomBatchPolicy(randomSeed=1)
+    while(not batch.isOver()):
+        games = batch.activeGames()
+        masks = pol.candidateMasks(batch, games)
+        for g,m in zip(games[::5], masks[::5]):
+            best = eng.listBestMoves(batch.getBoard(g))
+            if(m != sum(1<<int(mv) for mv in best)):
+                return False
+        # Play random moves too, to reach positions a perfect player never would
+        batch.move(rnd.chooseMoves(batch) if(batch.numMoves%2) else pol.chooseMoves(batch))
+    return (batch.results() >= 0).all()
+
+
+# Check a batched match: perfect play never loses, and seeded matches are replayed exactly
+def tRunBatchMatch():
+    tbase = getTableBase('minimax-1')
+    res1 = runBatchMatch(TableBaseBatchPolicy(tbase), RandomBatchPolicy(), 5000, seed=3, batchSize=1000)
+    res2 = runBatchMatch(TableBaseBatchPolicy(tbase), RandomBatchPolicy(), 5000, seed=3, batchSize=1000)
+    res3 = runBatchMatch(TableBaseBatchPolicy(tbase), TableBaseBatchPolicy(tbase), 300, 
+                         seed=3, swapSides=False)
+    return (res1.losses == 0 and np.array_equal(res1.results, res2.results) 
+            and res3.draws == 300 and res3.numMoves == 2700)
+
+
+# Check that a policy without candidateMasks() fails with a message naming it
+def tPolicyWithoutCandidateMasks():
+    class IncompletePolicy(BatchPolicy):
+        pass
+    try:
+        IncompletePolicy(randomSeed=0).chooseMoves(TicTacToeBoardBatch(4))
+        return False
+    except NotImplementedError as e:
+        return "IncompletePolicy" in str(e)
+
+
+# Check that runBatchMatch() rejects batch sizes below 1 with a ValueError
+def tRunBatchMatchBadBatchSize():
+    for batchSize in (0, -1):
+        try:
+            runBatchMatch(RandomBatchPolicy(), RandomBatchPolicy(), 10, batchSize=batchSize)
+            return False
+        except ValueError as e:
+            if("batchSize" not in str(e)):
+                return False
+    return True
@@ -0,0 +1,121 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run tests from the project's root directory or" + \
+            "the /test directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+import numpy as np
+
+from Board import TicTacToeBoard, TicTacToeBitBoard
+from Helper import generateAllPossibleContinuations
+from Encode import _encodeVectorAsInteger, encode
+from Symmetry import transformVec
+
+
+# Check that the bitboard agrees with the numpy board on every position
+#   ... in the game tree after the moves in 'opening'
+def tBitBoardMatchesBoard(opening=(4,0)):
+    tb = TicTacToeBitBoard()
+    for mv in opening:
+        tb.move(mv)
+    for nxt in generateAllPossibleContinuations(tb):
+        gtruth = TicTacToeBoard(copyFrom=nxt)
+        if(gtruth.checkWin() != nxt.checkWin() or 
+           (gtruth.possibleNextMoves() != nxt.possibleNextMoves()).any() or
+           gtruth != nxt):
+            print("Failed for position:")
+            nxt.show()
+            return False
+    return True
+
+
+# Check that copying between the two kinds of boards keeps the position
+def tBitBoardCopyFrom():
+    tb = TicTacToeBoard()
+    for mv in (2,4,6,8):
+        tb.move(mv)
+    bb = TicTacToeBitBoard(copyFrom=tb)
+    if(bb != tb or bb.moveHistory != tb.moveHistory):
+        return False
+    bb.undoLastMove()
+    tb.undoLastMove()
+    if(bb != tb or (bb.board != tb.board).any()):
+        return False
+    return TicTacToeBitBoard(copyFrom=bb) == bb
+
+
+# Check that the encodings kept up-to-date by move()/undoLastMove() are the
+#   ... same as the ones calculated from scratch from the board vector
+def tIncrementalCodes(opening=(1,5)):
+    for boardClass in (TicTacToeBoard, TicTacToeBitBoard):
+        tb = boardClass(trackSymmetries=True)
+        for mv in opening:
+            tb.move(mv)
+        for nxt in generateAllPossibleContinuations(tb):
+            vec = nxt.board
+            symCodes = [_encodeVectorAsInteger(transformVec(vec, op)) for op in range(8)]
+            if(nxt.code != _encodeVectorAsInteger(vec) or nxt.symCodes != symCodes or
+               nxt.canonicalCode() != encode(nxt, useSymmetry=True)[0]):
+                print("Failed for {} with position:".format(boardClass.__name__))
+                nxt.show()
+                return False
+        if(tb.code != _encodeVectorAsInteger(tb.board)):
+            return False
+    return True
+
+
+# Check that the board vector can't be changed in-place behind the encodings' back,
+#   ... neither through 'board' nor through a vector that was assigned to it
+def tBoardReadOnly():
+    import pickle
+    for boardClass in (TicTacToeBoard, TicTacToeBitBoard):
+        tb = boardClass()
+        tb.move(4)
+        try:
+            tb.board[0] = tb.Xmark
+            return False
+        except ValueError:
+            pass
+        vec = np.zeros(9, dtype=np.uint8)
+        tb.board = vec
+        vec[0] = tb.Xmark
+        if(tb.code != 0 or len(tb.possibleNextMoves()) != 9):
+            return False
+        # A copy made by pickling must still see its own moves through 'board'
+        other = pickle.loads(pickle.dumps(tb))
+        mark = other.nextTurn
+        other.move(8)
+        if(other.board[8] != mark or other.code != mark*3**8):
+            return False
+    return True
+
+
+# Check that T-Boards can be copied from board-like objects without 'trackSymmetries',
+#   ... and that T-Boards pickled before 'board' became a property can still be loaded
+def tCopyFromBoardLike():
+    import pickle
+    from types import SimpleNamespace
+    plain = SimpleNamespace(board=np.array([1,0,0,0,2,0,0,0,0], dtype=np.uint8),
+                            nextTurn=TicTacToeBoard.Xmark, moveHistory=[0,4])
+    for boardClass in (TicTacToeBoard, TicTacToeBitBoard):
+        tb = boardClass(copyFrom=plain)
+        if(tb.code != _encodeVectorAsInteger(plain.board) or tb.trackSymmetries or
+           tb.moveHistory != plain.moveHistory):
+            return False
+
+    # The state of a T-Board as pickled by the old class
+    old = object.__new__(TicTacToeBoard)
+    old.__dict__.update(board=plain.board.copy(), nextTurn=plain.nextTurn, moveHistory=[0,4])
+    loaded = pickle.loads(pickle.dumps(old))
+    if(loaded.code != tb.code or (loaded.board != plain.board).any()):
+        return False
+    loaded.move(8)
+    return (loaded.board[8] == loaded.Xmark and 
+            TicTacToeBitBoard(copyFrom=loaded).code == loaded.code)
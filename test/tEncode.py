@@ -0,0 +1,63 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run tests from the project's root directory or" + \
+            "the /test directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+import numpy as np
+
+import Encode
+from Helper import extendRootPath
+
+
+# Check that the calculated symmetry table is the same as the saved one, bit-for-bit
+def tCalcSymmetryTable():
+    saved = np.load(extendRootPath('data', 'SymTable.npy'), allow_pickle=False)
+    Encode.calcSymmetryTable()
+    calc = Encode.getSymmetryTable()
+    return (calc.dtype == saved.dtype) and (calc.shape == saved.shape) and (calc == saved).all()
+
+
+# Check that the compact SymTable file has the same table as the original one
+#   ... and that it can be memory-mapped
+def tCompactSymmetryTable():
+    saved = np.load(extendRootPath('data', 'SymTable.npy'), allow_pickle=False)
+    Encode.useMemoryMap(True)
+    try:
+        Encode.loadSymmetryTable()
+        compact = Encode.getSymmetryTable()
+        ok = isinstance(compact, np.memmap) and (compact.dtype == np.uint16)
+        ok = ok and (compact == saved).all() and (compact.flags.writeable is False)
+        ok = ok and Encode.lookUpSymTable(243) == tuple(int(i) for i in saved[243])
+    finally:
+        Encode.useMemoryMap(False)
+    return bool(ok)
+
+
+# Check that saving the symmetry table by default writes both files, so that the
+#   ... compact file that loadSymmetryTable() prefers is never stale
+def tSaveSymmetryTable():
+    import tempfile
+    paths = (Encode._dataPathToSymTable, Encode._dataPathToCompactSymTable)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        Encode._dataPathToSymTable = os.path.join(tmpdir, 'SymTable.npy')
+        Encode._dataPathToCompactSymTable = os.path.join(tmpdir, 'SymTable-uint16.npy')
+        try:
+            Encode.calcSymmetryTable()
+            calc = Encode.getSymmetryTable().copy()
+            Encode.saveSymmetryTable()
+            full = np.load(Encode._dataPathToSymTable, allow_pickle=False)
+            Encode.loadSymmetryTable()
+            loaded = Encode.getSymmetryTable()
+            ok = (full == calc).all() and (loaded == calc).all() and loaded.dtype == np.uint16
+        finally:
+            Encode._dataPathToSymTable,Encode._dataPathToCompactSymTable = paths
+            Encode.loadSymmetryTable()
+    return bool(ok)
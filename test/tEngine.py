@@ -0,0 +1,107 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run tests from the project's root directory or" + \
+            "the /test directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+import asyncio
+
+from Board import TicTacToeBoard
+from Engine import MiniMaxEngine, TableBaseEngine, RandomEngine
+from TableBase import getTableBase
+
+
+# Check that the async methods give the same moves as the sync ones for the same seed
+def tAsyncMatchesSync():
+    tbase = getTableBase('minimax-1')
+    makers = [lambda: MiniMaxEngine(randomSeed=5),
+              lambda: MiniMaxEngine(randomSeed=5, useMachineCode=False),
+              lambda: TableBaseEngine(tbase, randomSeed=5),
+              lambda: RandomEngine(randomSeed=5)]
+
+    async def playAsync(eng):
+        tb = TicTacToeBoard()
+        while(tb.checkWin() == 0 and len(tb.moveHistory) < 9):
+            tb.move(await eng.bestMoveAsync(tb))
+        return tb.moveHistory
+
+    def playSync(eng):
+        tb = TicTacToeBoard()
+        while(tb.checkWin() == 0 and len(tb.moveHistory) < 9):
+            tb.move(eng.bestMove(tb))
+        return tb.moveHistory
+
+    for make in makers:
+        if([int(mv) for mv in asyncio.run(playAsync(make()))] != 
+           [int(mv) for mv in playSync(make())]):
+            return False
+    return True
+
+
+# Check that a slow search times out, and can be cancelled, without blocking the event loop
+def tAsyncTimeoutAndCancel():
+    eng = MiniMaxEngine(useMachineCode=False)
+    tb = TicTacToeBoard()
+
+    async def run():
+        try:
+            await eng.listBestMovesAsync(tb, timeout=0.01)
+            timedOut = False
+        except asyncio.TimeoutError:
+            timedOut = True
+        task = asyncio.ensure_future(eng.bestMoveAsync(tb))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+            cancelled = False
+        except asyncio.CancelledError:
+            cancelled = True
+        return timedOut, cancelled
+
+    return asyncio.run(run()) == (True, True)
+
+
+# Check that a python search given a timeout stops by itself in the executor at about 
+#   ... the deadline, and that with enough time it finds the same moves as listBestMoves()
+def tAsyncTimeoutStopsSearch():
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    # A search with a deadline always prunes, and takes some 30ms from the empty board
+    eng = MiniMaxEngine(useMachineCode=False, pruning=False)
+    tb = TicTacToeBoard()
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    async def run():
+        try:
+            await eng.listBestMovesAsync(tb, executor, timeout=0.002)
+            return False
+        except asyncio.TimeoutError:
+            return True
+
+    timedOut = asyncio.run(run())
+    t0 = time.perf_counter()
+    executor.shutdown(wait=True)            # waits for the search in the worker thread
+    if(not timedOut or time.perf_counter() - t0 > 1.0):
+        return False
+
+    try:
+        eng.listBestMovesWithin(tb, 0.002)
+        return False
+    except TimeoutError:
+        pass
+
+    tb.move(4); tb.move(0)
+    if(list(eng.listBestMovesWithin(tb, 60.0)) != list(eng.listBestMoves(tb))):
+        return False
+    budgeted = MiniMaxEngine(timeLimit=60.0)
+    t0 = time.perf_counter()
+    budgeted.listBestMovesWithin(TicTacToeBoard(), 0.05)
+    return time.perf_counter() - t0 < 1.0
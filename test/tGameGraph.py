@@ -0,0 +1,78 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run tests from the project's root directory or" + \
+            "the /test directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+import numpy as np
+
+from Encode import decode
+from Rank import getLegalCodes, legalRank, NumLegalPositions
+from GameGraph import (getSuccessorTable, getParentTable, getParents, getDepths, getLayers,
+                       solveAllPositions, reachabilityStats, playRandomGames)
+from MiniMax import minimax_AlphaBetaPruning
+from TableBase import calcTableBase_Retrograde, calcTableBase_GameGraph
+
+
+# Check the successor table, parent lists and layers against moves played on T-Boards
+def tGraphStructure():
+    succ = getSuccessorTable()
+    codes = getLegalCodes()
+    if(succ.shape != (NumLegalPositions, 9) or succ.dtype != np.int16):
+        return False
+    for r in range(0, NumLegalPositions, 11):
+        tb = decode(int(codes[r]))
+        over = (tb.checkWin() != 0)
+        for mv in range(9):
+            if(over or tb.board[mv] != 0):
+                if(succ[r,mv] != -1):
+                    return False
+                continue
+            tb.move(mv)
+            if(succ[r,mv] != legalRank(tb.code)):
+                return False
+            tb.undoLastMove()
+    
+    # Every edge is in the parent lists of its child, and nowhere else
+    ptr,parents,moves = getParentTable()
+    if(ptr[-1] != np.count_nonzero(succ >= 0) or len(getParents(legalRank(0))[0]) != 0):
+        return False
+    for c in range(0, NumLegalPositions, 13):
+        ps,mvs = getParents(c)
+        if(not (succ[ps, mvs] == c).all() or len(ps) != np.count_nonzero(succ == c)):
+            return False
+    
+    layers = getLayers()
+    return (sum(len(l) for l in layers) == NumLegalPositions and 
+            all((getDepths()[l] == d).all() for d,l in enumerate(layers)))
+
+
+# Check the solution of the game and the known numbers of games
+def tSolveAndCount():
+    vals = solveAllPositions()
+    codes = getLegalCodes()
+    for r in range(0, NumLegalPositions, 17):
+        tb = decode(int(codes[r]))
+        if(vals[r] != minimax_AlphaBetaPruning(tb)[0]):
+            return False
+    
+    stats = reachabilityStats()
+    if(sum(stats['games']) != 255168 or sum(stats['xWinGames']) != 131184 or 
+       sum(stats['yWinGames']) != 77904 or stats['positions'] != [len(l) for l in getLayers()]):
+        return False
+    
+    # Random games always end in a position where the game is over
+    ends = playRandomGames(1000, np.random.default_rng(0))
+    return bool((getSuccessorTable()[ends] == -1).all())
+
+
+# Check that the tablebase from the game graph is the same as the one by retrograde analysis
+def tTableBaseGameGraph():
+    return calcTableBase_GameGraph() == calcTableBase_Retrograde()
@@ -0,0 +1,163 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run tests from the project's root directory or" + \
+            "the /test directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+import numpy as np
+
+from Board import TicTacToeBitBoard
+from MiniMax import minimax_AlphaBetaPruning, minimax_Negamax, minimaxEvalsForNextMoves, minimaxEvalsBatch
+from MachineCode import run_minimax, run_minimaxEvals, NativeSearchBuffer
+from Helper import generateAllLegalContinuations, generateAllLegalPositions
+
+
+
+# Check that the machine code gives the same evaluations as the python code
+#   ... on every position in the game tree after 'opening'
+def tRunMinimax(opening=(4,0)):
+    tb = TicTacToeBitBoard()
+    for mv in opening:
+        tb.move(mv)
+    for nxt in generateAllLegalContinuations(tb):
+        gtruth = minimax_AlphaBetaPruning(nxt)[0]
+        for pruning in (True, False):
+            Z,cnt = run_minimax(nxt, pruning=pruning)
+            if(Z != gtruth or cnt < 1):
+                print("Failed with pruning={} for position:".format(pruning))
+                nxt.show()
+                return False
+    return True
+
+
+# Check that the node count doesn't wrap around at 2 bytes
+def tRunMinimaxCount():
+    Z,cnt = run_minimax(TicTacToeBitBoard(), pruning=False)
+    return (Z == 0) and (cnt > 65535)
+
+
+# Check that evaluating all next moves in one call to machine code gives
+#   ... the same scores as the python code
+def tRunMinimaxEvals(opening=(4,0)):
+    buf = NativeSearchBuffer()
+    tb = TicTacToeBitBoard()
+    for mv in opening:
+        tb.move(mv)
+    for nxt in generateAllLegalContinuations(tb):
+        if(nxt.checkWin() != 0):
+            continue
+        gtruth = minimaxEvalsForNextMoves(nxt, tryNative=False)
+        for pruning in (True, False):
+            scores,cnt = run_minimaxEvals(nxt, pruning=pruning, buf=buf)
+            if((scores != gtruth).any()):
+                print("Failed with pruning={} for position:".format(pruning))
+                nxt.show()
+                return False
+    return True
+
+
+# Check that evaluating a batch of positions in machine code gives the 
+#   ... same evaluations as the python code
+def tMinimaxEvalsBatch(opening=(4,0)):
+    tb = TicTacToeBitBoard()
+    for mv in opening:
+        tb.move(mv)
+    positions = list(TicTacToeBitBoard(copyFrom=nxt) for nxt in generateAllLegalContinuations(tb))
+    boards = np.array([p.board for p in positions])
+    nextTurns = np.array([p.nextTurn for p in positions])
+    
+    gtruth = minimaxEvalsBatch(boards, nextTurns, tryNative=False)
+    for pruning in (True, False):
+        evals = minimaxEvalsBatch(boards, nextTurns, pruning=pruning, forceNative=True)
+        if((evals != gtruth).any()):
+            print("Failed with pruning={}".format(pruning))
+            return False
+    return True
+
+
+# Check that the machine code's negamax gives the same evaluations as the python 
+#   ... negamax on every legal position, and searches fewer nodes than with pruning=True
+def tRunNegamax():
+    for tb in generateAllLegalPositions():
+        tb = TicTacToeBitBoard(copyFrom=tb)
+        Z,cnt = run_minimax(tb, pruning='negamax')
+        if(Z != minimax_Negamax(tb)[0] or cnt < 1):
+            print("Failed for position:")
+            tb.show()
+            return False
+    tb = TicTacToeBitBoard()
+    if(run_minimax(tb, pruning='negamax')[1] * 10 > run_minimax(tb, pruning=True)[1]):
+        return False
+    evals,cnt = run_minimaxEvals(tb, pruning='negamax')
+    return np.array_equal(evals, run_minimaxEvals(tb, pruning=True)[0])
+
+
+# Check that threads doing their first native search at the same time build the 
+#   ... library only once, and that a failure from an OSError (here, while moving 
+#   ... the built file into place) isn't remembered by later attempts
+def tConcurrentFirstBuild(numThreads=4):
+    import os
+    import tempfile
+    import threading
+    import MachineCode
+    
+    saved = {name: getattr(MachineCode, name) for name in ('_minimax_DLL', '_minimax_DLL_FileName', 
+                        '_minimax_DLL_Error', '_getMinimax_BuildFileName')}
+    origReplace = os.replace
+    builds = []
+    origBuild = MachineCode.buildMinimaxLibrary
+    def countedBuild(force=False):
+        builds.append(1)
+        return origBuild(force)
+    
+    with tempfile.TemporaryDirectory() as tdir:
+        fname = os.path.join(tdir, os.path.basename(saved['_getMinimax_BuildFileName']()))
+        def reset():
+            MachineCode._minimax_DLL = None
+            MachineCode._minimax_DLL_FileName = None
+            MachineCode._minimax_DLL_Error = None
+        try:
+            MachineCode._getMinimax_BuildFileName = lambda: fname
+            MachineCode.buildMinimaxLibrary = countedBuild
+            
+            # A failed replace must not disable the machine code for good
+            reset()
+            def failingReplace(src, dst):
+                raise PermissionError("The file is in use")
+            os.replace = failingReplace
+            try:
+                MachineCode._get_Minimax_CDLL()
+                return False
+            except MachineCode.MachineCodeMissingError:
+                pass
+            finally:
+                os.replace = origReplace
+            if(MachineCode._minimax_DLL_Error is not None):
+                return False
+            
+            builds.clear()
+            results = []
+            def load():
+                try:
+                    results.append(MachineCode._get_Minimax_CDLL() is not None)
+                except Exception:
+                    results.append(False)
+            threads = [threading.Thread(target=load) for _ in range(numThreads)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            leftovers = [f for f in os.listdir(tdir) if f.endswith('.tmp')]
+            return all(results) and len(results) == numThreads and len(builds) == 1 and not leftovers
+        finally:
+            os.replace = origReplace
+            MachineCode.buildMinimaxLibrary = origBuild
+            for name,val in saved.items():
+                setattr(MachineCode, name, val)
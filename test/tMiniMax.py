@@ -0,0 +1,134 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run tests from the project's root directory or" + \
+            "the /test directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+import time
+import numpy as np
+
+from Board import TicTacToeBitBoard
+from MiniMax import minimax_AlphaBetaPruning, minimax_Memoized, TranspositionTable
+from MiniMax import minimaxEvalsForNextMoves, minimaxEvalsIterativeDeepening, minimax_Negamax
+from TableBase import calcTableBase_Retrograde
+from Encode import encode
+from Engine import MiniMaxEngine
+from Helper import generateAllLegalContinuations, generateAllLegalPositions
+
+
+# Check that the memoized minimax gives the same evaluations as minimax with 
+#   ... pruning on every position in the game tree after 'opening'.
+# Uses a small table, so that entries also get evicted.
+def tMinimaxMemoized(opening=(4,), maxSize=100):
+    table = TranspositionTable(maxSize=maxSize)
+    tb = TicTacToeBitBoard()
+    for mv in opening:
+        tb.move(mv)
+    for nxt in generateAllLegalContinuations(tb):
+        gtruth = minimax_AlphaBetaPruning(nxt)[0]
+        if(minimax_Memoized(nxt, table=table)[0] != gtruth):
+            print("Failed for position:")
+            nxt.show()
+            return False
+    return len(table) <= maxSize and table.hits > 0
+
+
+# Check that the memoized minimax searches only a few thousand nodes from the empty board
+def tMinimaxMemoizedCount():
+    table = TranspositionTable()
+    Z,cnt = minimax_Memoized(TicTacToeBitBoard(), table=table)
+    return Z == 0 and cnt < 5000 and table.misses < 1000
+
+
+# Check that a small table shared by many threads neither raises nor loses count 
+#   ... of its look-ups, while entries are evicted all the time
+def tTranspositionTableThreads(numThreads=8, numOps=20000):
+    import sys
+    import threading
+    table = TranspositionTable(maxSize=16)
+    errors = []
+
+    def hammer(seed):
+        rng = np.random.default_rng(seed)
+        try:
+            for key in rng.integers(64, size=numOps):
+                if(table.lookup(int(key)) is None):
+                    table.store(int(key), 0)
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=hammer, args=(i,)) for i in range(numThreads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    return (not errors and len(table) <= 16 and
+            table.hits + table.misses == numThreads*numOps)
+
+
+# Check that iterative deepening without a budget gives the exact evaluations
+#   ... on every 'step'-th position in the game tree
+def tIterativeDeepeningExact(step=13):
+    for i,nxt in enumerate(generateAllLegalContinuations(TicTacToeBitBoard())):
+        if(i%step != 0 or nxt.checkWin() != 0 or len(nxt.moveHistory) == 9):
+            continue
+        evals,depth,cnt,exact = minimaxEvalsIterativeDeepening(nxt)
+        gtruth = minimaxEvalsForNextMoves(nxt, tryNative=False)
+        if(not exact or not np.array_equal(evals, gtruth)):
+            print("Failed for position:")
+            nxt.show()
+            return False
+    return True
+
+
+# Check that budgeted searches stay within their budget, and still find wins in one move
+def tBudgetedSearch():
+    tb = TicTacToeBitBoard()
+    for maxNodes in (1, 100, 1000):
+        evals,depth,cnt,exact = minimaxEvalsIterativeDeepening(tb, maxNodes=maxNodes)
+        if(depth < 1 or exact or cnt > max(maxNodes, 9) or (evals == 8).any()):
+            return False
+    
+    t0 = time.perf_counter()
+    depth = minimaxEvalsIterativeDeepening(tb, timeLimit=0.02)[1]
+    if(time.perf_counter() - t0 > 0.2 or depth < 1):
+        return False
+    
+    # X to move can win at 2 (or lose to O at 8 otherwise)
+    for mv in (0, 6, 1, 7):
+        tb.move(mv)
+    eng = MiniMaxEngine(maxNodes=5, randomSeed=0)
+    mv,depth = eng.bestMoveWithDepth(tb)
+    return mv == 2 and depth == 1 and eng.lastSearch['depth'] == 1
+
+
+# Check negamax against the evaluations of the retrograde tablebase on every legal 
+#   ... position (and against minimax with pruning on the positions that are over)
+# Also checks that it searches fewer nodes than minimax with pruning from the empty board.
+def tNegamax():
+    TBase = calcTableBase_Retrograde()
+    for tb in generateAllLegalPositions():
+        tb = TicTacToeBitBoard(copyFrom=tb)
+        N = encode(tb, useSymmetry=True)[0]
+        if(N in TBase):
+            gtruth = (TBase[N][0] if(tb.nextTurn == tb.Xmark) else -TBase[N][0])
+        else:
+            gtruth = minimax_AlphaBetaPruning(tb)[0]
+        if(minimax_Negamax(tb)[0] != gtruth):
+            print("Failed for position:")
+            tb.show()
+            return False
+    tb = TicTacToeBitBoard()
+    return minimax_Negamax(tb)[1] * 10 < minimax_AlphaBetaPruning(tb)[1]
@@ -0,0 +1,47 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run tests from the project's root directory or" + \
+            "the /test directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+import numpy as np
+
+from Board import TicTacToeBitBoard
+import Rank
+from Encode import encode
+from Helper import generateAllLegalContinuations
+
+
+# Check that ranking and unranking are inverses of each other
+def tRankRoundTrip():
+    legal = Rank.getLegalCodes()
+    canonical = Rank.getCanonicalCodes()
+    if(len(legal) != Rank.NumLegalPositions or len(canonical) != Rank.NumCanonicalPositions):
+        return False
+    if((Rank.legalRank(legal) != np.arange(len(legal))).any()):
+        return False
+    if((Rank.canonicalRank(canonical) != np.arange(len(canonical))).any()):
+        return False
+    return all(Rank.unrankCanonical(Rank.canonicalRank(N)) == N for N in canonical)
+
+
+# Check that every position reached in a game ranks as its representative
+def tRankAllGames():
+    tb = TicTacToeBitBoard()
+    seen = set()
+    for nxt in generateAllLegalContinuations(tb):
+        seen.add(nxt.code)
+        N = encode(nxt, useSymmetry=True)[0]
+        if(Rank.unrankCanonical(Rank.rankBoard(nxt)) != N):
+            print("Failed for position:")
+            nxt.show()
+            return False
+    # Every legal position (other than the empty board) is reached in some game
+    return len(seen) + 1 == Rank.NumLegalPositions
@@ -0,0 +1,135 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run tests from the project's root directory or" + \
+            "the /test directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+import asyncio
+import tempfile
+import numpy as np
+
+from Board import TicTacToeBoard
+from Engine import MiniMaxEngine
+from Helper import generateAllLegalContinuations, makeBoardFromPosition
+from Server import EngineServer, EngineClient, ServerRequestError
+
+
+# Some positions where a move can be played, as lists for requests
+def _somePositions(step=97):
+    ret = [[0]*9]
+    for i,nxt in enumerate(generateAllLegalContinuations(TicTacToeBoard())):
+        if(i%step == 0 and nxt.checkWin() == 0 and len(nxt.moveHistory) < 9):
+            ret.append([int(c) for c in nxt.board])
+    return ret
+
+
+# Check that the server's answers over TCP match the engine's, for many clients at once
+def tServerMatchesEngine():
+    positions = _somePositions()
+    eng = MiniMaxEngine()
+    expected = [[int(mv) for mv in eng.listBestMoves(makeBoardFromPosition(np.array(vec)))]
+                for vec in positions]
+
+    async def run():
+        server = EngineServer(workers=1, batchSize=8)
+        srv = await server.listenTCP('127.0.0.1', 0)
+        port = srv.sockets[0].getsockname()[1]
+        clients = [EngineClient() for _ in range(4)]
+        try:
+            for c in clients:
+                await c.connectTCP('127.0.0.1', port)
+            ret = []
+            for engine in ('tablebase', 'minimax'):
+                reqs = [{'op':'listBestMoves', 'board':vec, 'engine':engine} for vec in positions]
+                resps = await asyncio.gather(*[c.sendMany(reqs[i::4]) for i,c in enumerate(clients)])
+                moves = [None]*len(reqs)
+                for i,rs in enumerate(resps):
+                    moves[i::4] = [r.get('moves') for r in rs]
+                ret.append(moves)
+            stats = await clients[0].stats()
+            return ret, stats
+        finally:
+            for c in clients:
+                await c.close()
+            await server.close()
+
+    (tbMoves, mmMoves), stats = asyncio.run(run())
+    # The tablebase may list the best moves in another order
+    return (mmMoves == expected and [sorted(m) for m in tbMoves] == expected and 
+            stats['requests']['listBestMoves'] == 2*len(positions) and stats['batches'] > 0)
+
+
+# Check bestMove and the errors over a Unix socket
+def tServerUnixErrors():
+    async def run():
+        server = EngineServer(workers=1)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'engine.sock')
+            await server.listenUnix(path)
+            c = EngineClient()
+            try:
+                await c.connectUnix(path)
+                mv = await c.bestMove([1,1,0, 2,2,0, 0,0,0], engine='minimax')
+                errs = await c.sendMany([{'op':'bestMove', 'board':[1,1,1, 2,2,0, 0,0,0]},
+                                         {'op':'listBestMoves', 'board':[1]*9},
+                                         {'op':'listBestMoves', 'board':[0]*9, 'engine':'nope'},
+                                         {'op':'nope'}])
+                try:
+                    await c.listBestMoves([2,0,0, 0,0,0, 0,0,0])
+                    raised = False
+                except ServerRequestError:
+                    raised = True
+                return mv, errs, raised
+            finally:
+                await c.close()
+                await server.close()
+
+    mv, errs, raised = asyncio.run(run())
+    return mv == 2 and all('error' in e for e in errs) and raised
+
+
+# Check that a client never has more than 'maxPerClient' requests in flight, and that
+#   ... a request that fails unexpectedly still gets an error response
+def tServerBackpressureAndFailures():
+    from Engine import TableBaseEngine
+    from TableBase import TableBase
+
+    async def run():
+        server = EngineServer(workers=1, maxPerClient=4)
+        inFlight = [0, 0]           # [now, most ever]
+        handleRequest = server.handleRequest
+        async def slowHandleRequest(req):
+            inFlight[0] += 1
+            inFlight[1] = max(inFlight)
+            await asyncio.sleep(0.001)
+            try:
+                return await handleRequest(req)
+            finally:
+                inFlight[0] -= 1
+        server.handleRequest = slowHandleRequest
+
+        srv = await server.listenTCP('127.0.0.1', 0)
+        c = EngineClient()
+        try:
+            await c.connectTCP('127.0.0.1', srv.sockets[0].getsockname()[1])
+            resps = await asyncio.wait_for(c.sendMany([{'op':'ping'}]*50), 10)
+            emptyTable = TableBase()
+            emptyTable.setTable({})
+            server._inlineEngines['tablebase'] = TableBaseEngine(emptyTable)
+            errs = await asyncio.wait_for(c.sendMany([{'op':'listBestMoves', 'board':[0]*9}]*3), 10)
+            return resps, errs, inFlight[1], server.getStats()
+        finally:
+            await c.close()
+            await server.close()
+
+    resps, errs, mostInFlight, stats = asyncio.run(run())
+    return (all(r.get('pong') for r in resps) and mostInFlight <= 4 and
+            all('TableBaseLookupError' in e.get('error', '') for e in errs) and
+            stats['requests']['error'] == 3)
@@ -0,0 +1,34 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run tests from the project's root directory or" + \
+            "the /test directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+import numpy as np
+
+from Simulate import runMatch, makeEngine
+
+
+# Check that perfect engines never lose, neither to each other nor to a random engine
+def tPerfectEnginesNeverLose():
+    res = runMatch(makeEngine('tablebase'), makeEngine('random'), 500, seed=0)
+    if(res.losses != 0 or res.wins + res.draws != 500):
+        return False
+    res = runMatch(makeEngine('minimax'), makeEngine('tablebase'), 50, seed=0)
+    return res.draws == 50 and len(res.moveTimes[0]) + len(res.moveTimes[1]) == res.numMoves
+
+
+# Check that a seeded match is replayed exactly
+def tSeededMatch():
+    res1 = runMatch(makeEngine('random'), makeEngine('tablebase'), 200, seed=7)
+    res2 = runMatch(makeEngine('random'), makeEngine('tablebase'), 200, seed=7)
+    res3 = runMatch(makeEngine('random'), makeEngine('tablebase'), 200, seed=8)
+    return (np.array_equal(res1.results, res2.results) and res1.numMoves == res2.numMoves
+            and not np.array_equal(res1.results, res3.results))
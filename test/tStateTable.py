@@ -0,0 +1,60 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run tests from the project's root directory or" + \
+            "the /test directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+import numpy as np
+
+from Board import TicTacToeBoard, TicTacToeBitBoard
+from Encode import _decodeVectorFromInteger
+from Helper import makeBoardFromIllegalPosition
+from StateTable import (getStateTable, getWinnerArray, getEmptyMaskArray, getLegalMoveMaskArray,
+                        getTerminalArray, winnerOf, isTerminal, legalMoveMask, NumCodes)
+
+
+# The winner of a board vector by checking each of the WinPatterns in order
+def _slowWinner(vec):
+    for idxs in TicTacToeBoard.WinPatterns:
+        for mark in (TicTacToeBoard.Xmark, TicTacToeBoard.Ymark):
+            if((vec[idxs] == mark).all()):
+                return mark
+    return 0
+
+
+# Check every entry of the table against the board vector of its encoding
+def tStateTableEntries():
+    if(getStateTable().dtype != np.uint16 or getStateTable().shape != (NumCodes,)):
+        return False
+    winners = getWinnerArray()
+    masks = getEmptyMaskArray()
+    for N in range(NumCodes):
+        vec = _decodeVectorFromInteger(N)
+        winner = _slowWinner(vec)
+        empty = sum(1<<i for i in range(9) if vec[i] == 0)
+        if(winners[N] != winner or masks[N] != empty or winnerOf(N) != winner):
+            return False
+        if(isTerminal(N) != (winner != 0 or empty == 0) or getTerminalArray()[N] != isTerminal(N)):
+            return False
+        if(legalMoveMask(N) != (0 if winner else empty) or getLegalMoveMaskArray()[N] != legalMoveMask(N)):
+            return False
+    return True
+
+
+# Check that both kinds of T-Boards agree with each other on every board vector
+def tBoardsUseStateTable():
+    for N in range(0, NumCodes, 7):
+        tb = makeBoardFromIllegalPosition(_decodeVectorFromInteger(N))
+        bb = TicTacToeBitBoard(copyFrom=tb)
+        if(tb.code != N or tb.checkWin() != bb.checkWin()):
+            return False
+        if(not np.array_equal(tb.possibleNextMoves(), bb.possibleNextMoves())):
+            return False
+    return True
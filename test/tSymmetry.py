@@ -15,7 +15,9 @@ if("Board.py" not in os.listdir(".")):
 import numpy as np
 
 from Board import TicTacToeBoard
-from Symmetry import transformBoard, newIndex, oldIndex
+from Symmetry import transformBoard, transformVec, newIndex, oldIndex
+from Symmetry import allVectorVariants, allVectorVariantsArray
+from FlipRotate import fliplr_Vec, rotate180_Vec, rotateLeft_Vec, rotateRight_Vec
 
 
 # Check whether the values in newIndex[[]] are correct
@@ -50,3 +52,40 @@ def tOldIndex():
                 return False
     return True
 
+
+
+# Check that transformVec() gives the same result as composing the fns in FlipRotate
+def tTransformVec():
+    rng = np.random.default_rng(seed=0)
+    compositions = [
+                    lambda v: v.copy(),
+                    rotateRight_Vec,
+                    rotate180_Vec,
+                    rotateLeft_Vec,
+                    fliplr_Vec,
+                    lambda v: rotateRight_Vec(fliplr_Vec(v)),
+                    lambda v: rotate180_Vec(fliplr_Vec(v)),
+                    lambda v: rotateLeft_Vec(fliplr_Vec(v))
+                   ]
+    for _ in range(100):
+        vec = rng.integers(3, size=9).astype(np.uint8)
+        for op in range(8):
+            if((transformVec(vec, op) != compositions[op](vec)).any()):
+                print("Failed for operation {} on: {}".format(op, vec))
+                return False
+    return True
+
+
+# Check that the variants of a batch of vectors match the variants of each vector
+def tAllVectorVariantsArray():
+    rng = np.random.default_rng(seed=0)
+    vecs = rng.integers(3, size=(50,9)).astype(np.uint8)
+    variants = allVectorVariantsArray(vecs)
+    if(variants.shape != (8,50,9)):
+        return False
+    for k in range(50):
+        for op,v in enumerate(allVectorVariants(vecs[k])):
+            if((variants[op,k] != v).any()):
+                print("Failed for operation {} on: {}".format(op, vecs[k]))
+                return False
+    return True
@@ -0,0 +1,58 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run tests from the project's root directory or" + \
+            "the /test directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+from TableBase import TableBase, BinaryTableBase, TableBaseLookupError, arrayToTable
+from TableBase import calcTableBase_Retrograde, calcTableBase_Parallel
+from Helper import extendRootPath
+
+
+def _loadJsonTableBase():
+    tbase = TableBase()
+    tbase.load(extendRootPath('data', 'TableBase_MiniMax-1.json'))
+    return tbase
+
+
+# Check that the shipped binary tablebase has the same entries as the JSON one
+def tBinaryTableBase():
+    table = _loadJsonTableBase().getTable()
+    btbase = BinaryTableBase()
+    btbase.load(extendRootPath('data', 'TableBase_MiniMax-1.npy'))
+    
+    for N,l in table.items():
+        if(btbase.lookup(N) != l):
+            print("Failed for position {}".format(N))
+            return False
+    
+    # Positions missing from the JSON tablebase must be missing here too
+    for N in range(3**9):
+        if(N in table):
+            continue
+        try:
+            btbase.lookup(N)
+        except TableBaseLookupError:
+            continue
+        print("Found position {} that is not in the JSON tablebase".format(N))
+        return False
+    
+    return arrayToTable(btbase.getTable()) == table
+
+
+# Check that the retrograde analysis calculates the same tablebase as the saved one
+def tCalcTableBaseRetrograde():
+    return calcTableBase_Retrograde() == _loadJsonTableBase().getTable()
+
+
+# Check that the tablebase calculated on many processes is the same as the saved one
+def tCalcTableBaseParallel(workers=2, splitDepth=2):
+    table,timings = calcTableBase_Parallel(workers=workers, splitDepth=splitDepth)
+    return table == _loadJsonTableBase().getTable() and len(timings) == 72
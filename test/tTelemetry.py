@@ -0,0 +1,99 @@
+#       Boilerplate for path-relative Imports
+#########################################################################
+import os
+cdir = os.getcwd()
+if("Board.py" not in os.listdir(".")):
+    os.chdir("./..")
+if("Board.py" not in os.listdir(".")):
+    msg = "Must run tests from the project's root directory or" + \
+            "the /test directory. Now ran from: {}".format(cdir)
+    raise RuntimeError(msg)
+#########################################################################
+
+
+import numpy as np
+
+from Board import TicTacToeBoard
+from Engine import MiniMaxEngine, TableBaseEngine
+from MiniMax import minimaxEvalsForNextMoves, TranspositionTable
+from TableBase import TableBase, getTableBase
+from Telemetry import EngineStats
+
+
+# Check that every python search counts the same nodes as the machine code with 
+#   ... the same pruning, and gives the same evaluations
+def tNodeCounts():
+    tb = TicTacToeBoard()
+    for mv in (4, 0):
+        tb.move(mv)
+    for pruning in (False, True, 'negamax'):
+        infoNative,infoPython = {},{}
+        native = minimaxEvalsForNextMoves(tb, pruning=pruning, info=infoNative)
+        python = minimaxEvalsForNextMoves(tb, pruning=pruning, tryNative=False, info=infoPython)
+        if(not np.array_equal(native, python) or infoPython['backend'] != 'python'):
+            return False
+        if(infoNative['backend'] != 'native' or infoPython['nodes'] != infoNative['nodes']):
+            return False
+    
+    table = TranspositionTable()
+    info1,info2 = {},{}
+    minimaxEvalsForNextMoves(tb, memoize=True, table=table, info=info1)
+    minimaxEvalsForNextMoves(tb, memoize=True, table=table, info=info2)
+    return (info1['cacheMisses'] > 0 and info2['cacheMisses'] == 0 
+                and info2['cacheHits'] == 7 and info2['nodes'] == 7)
+
+
+# Check the stats recorded by engines, and their Prometheus export
+def tEngineStats():
+    eng = MiniMaxEngine(randomSeed=0)
+    if(eng.stats is not None):
+        return False
+    tb = TicTacToeBoard()
+    eng.bestMove(tb)
+    
+    stats = eng.enableStats(name='minimax')
+    eng.bestMove(tb)
+    eng.bestMove(tb)
+    tbeng = TableBaseEngine(getTableBase('minimax-1'), randomSeed=0)
+    tbeng.enableStats(stats)
+    tbeng.bestMove(tb)
+    
+    snap = stats.snapshot()
+    c = snap['counters']
+    if(c['calls'] != 3 or c['tablebaseHits'] != 1 or c['nodes'] <= 0 or c['errors'] != 0):
+        return False
+    if(snap['latency']['count'] != 3 or snap['latency']['buckets'][-1][1] != 3):
+        return False
+    if(sum(snap['backends'].values()) != 3 or snap['backends']['tablebase'] != 1):
+        return False
+    
+    # A failed lookup (in an empty tablebase) is counted as a miss and an error
+    emptyTable = TableBase()
+    emptyTable.setTable({})
+    emptyEng = TableBaseEngine(emptyTable, randomSeed=0)
+    emptyEng.enableStats(stats)
+    try:
+        emptyEng.listBestMoves(tb)
+        return False
+    except Exception:
+        pass
+    c = stats.snapshot()['counters']
+    if(c['tablebaseMisses'] != 1 or c['errors'] != 1 or c['calls'] != 4):
+        return False
+    
+    text = stats.toPrometheus()
+    return ('tictactoe_engine_calls_total{engine="minimax"} 4' in text 
+                and 'tictactoe_engine_latency_seconds_bucket{engine="minimax",le="+Inf"} 4' in text
+                and 'tictactoe_engine_backend_calls_total{engine="minimax",backend="tablebase"} 2' in text
+                and '# TYPE tictactoe_engine_nodes histogram' in text)
+
+
+# Check that a collector can be pickled (for engines sent to a process pool)
+def tPickleStats():
+    import pickle
+    stats = EngineStats('s')
+    stats.recordCall(0.001, {'nodes': 10, 'backend': 'native'})
+    copy = pickle.loads(pickle.dumps(stats))
+    copy.recordCall(0.002, {'nodes': 5, 'fallback': 'missing'})
+    c = copy.snapshot()['counters']
+    return c['calls'] == 2 and c['nodes'] == 15 and c['fallbacks'] == 1 and stats.counters['calls'] == 1